@@ -0,0 +1,473 @@
+"""
+Single long-running bot daemon: ordering, redeem, monitoring and reports in one process.
+
+Instead of a cold interpreter per scheduled task (re-importing py_clob_client / web3 /
+openpyxl, re-reading .env, re-deriving CLOB API creds, reopening connections), the
+daemon imports each module once and keeps its clients warm: the CLOB client, the RPC
+pool, HTTP sessions, the positions / activity caches, the time-series store and the
+Telegram and job queues. An internal scheduler runs the tasks, so no Windows Task
+Scheduler or cron is needed (run it under systemd on Linux):
+
+- summary   daily summary at DAEMON_SUMMARY_TIMES (default 07:00,19:00 GMT+7)
+- excel     previous month's report on the 1st at 07:00 GMT+7
+- monitor   balance / PnL sample and alerts every MONITOR_INTERVAL seconds
+- jobs      job_queue workers (redeem jobs scheduled by the ordering run, cleanup, reports)
+- redeem    sweep of every redeemable market every REDEEM_INTERVAL seconds (needs web3)
+- orders    order placement on every listed market every 3h01m (places real orders)
+- reconcile settled rounds merged into the PnL curve (export_data/pnl.py) every
+            DAEMON_RECONCILE_INTERVAL seconds
+
+A task that is still running when it comes due again is skipped, not stacked. The
+daemon listens on a local control socket (a Unix socket next to this file, or
+127.0.0.1:DAEMON_PORT where Unix sockets aren't available) for one JSON command per
+connection, used by the `ctl` subcommand.
+
+Usage:
+    python bot_daemon.py                                 # summary,excel,monitor,jobs,reconcile
+    python bot_daemon.py --tasks summary,excel,monitor,jobs,reconcile,redeem,orders
+    python bot_daemon.py --dry-run                       # print instead of sending
+    python bot_daemon.py ctl status
+    python bot_daemon.py ctl run summary
+    python bot_daemon.py ctl pause orders
+    python bot_daemon.py ctl stop
+"""
+
+import os
+import sys
+import json
+import time
+import heapq
+import signal
+import socket
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+load_dotenv()
+
+DAEMON_TZ = ZoneInfo('Asia/Bangkok')
+DAEMON_SOCKET = os.getenv('DAEMON_SOCKET', os.path.join(PROJECT_ROOT, 'bot_daemon.sock'))
+DAEMON_PORT = int(os.getenv('DAEMON_PORT', '8765'))
+DAEMON_TASKS = os.getenv('DAEMON_TASKS', 'summary,excel,monitor,jobs,reconcile')
+SUMMARY_TIMES = os.getenv('DAEMON_SUMMARY_TIMES', '07:00,19:00')
+EXCEL_TIME = '07:00'
+REDEEM_INTERVAL = int(os.getenv('REDEEM_INTERVAL', '3600'))
+RECONCILE_INTERVAL = int(os.getenv('DAEMON_RECONCILE_INTERVAL', '900'))
+# Re-fetched on every reconcile: rounds settle up to SETTLE_SECONDS after they end
+RECONCILE_LOOKBACK = 6 * 60 * 60
+# A round's orders go up when its market is listed, so fills can land before it starts
+RECONCILE_FILL_LEAD = 24 * 60 * 60
+TASK_WORKERS = 4
+CONTROL_TIMEOUT = 10
+
+
+# --- schedules ---
+class Every:
+    """Every `seconds`, first run `first` seconds after start."""
+
+    def __init__(self, seconds, first=0.0):
+        self.seconds = seconds
+        self.first = first
+
+    def first_run(self, now):
+        return now + self.first
+
+    def next_after(self, t):
+        return t + self.seconds
+
+    def __str__(self):
+        return f"every {self.seconds}s"
+
+
+class DailyAt:
+    """At fixed local times ('HH:MM') every day, or only on one day of the month."""
+
+    def __init__(self, times, tz=DAEMON_TZ, day=None):
+        self.times = sorted(tuple(int(x) for x in t.strip().split(':')) for t in times)
+        self.tz = tz
+        self.day = day
+
+    def first_run(self, now):
+        return self.next_after(now)
+
+    def next_after(self, t):
+        local = datetime.fromtimestamp(t, self.tz)
+        for days in range(0, 63):
+            date = (local + timedelta(days=days)).date()
+            if self.day is not None and date.day != self.day:
+                continue
+            for hour, minute in self.times:
+                candidate = datetime(date.year, date.month, date.day, hour, minute, tzinfo=self.tz)
+                if candidate.timestamp() > t:
+                    return candidate.timestamp()
+        raise ValueError(f"No next run for {self}")
+
+    def __str__(self):
+        times = ','.join(f"{h:02d}:{m:02d}" for h, m in self.times)
+        return f"{'day %d ' % self.day if self.day else 'daily '}{times}"
+
+
+class Task:
+    def __init__(self, name, fn, schedule):
+        self.name = name
+        self.fn = fn
+        self.schedule = schedule
+        self.paused = False
+        self.running = False
+        self.next_run = None
+        self.runs = 0
+        self.last_run = None
+        self.last_duration = None
+        self.last_error = None
+
+    def status(self) -> dict:
+        def ts(t):
+            return None if t is None else datetime.fromtimestamp(t, DAEMON_TZ).strftime('%Y-%m-%d %H:%M:%S')
+        return {'schedule': str(self.schedule), 'paused': self.paused, 'running': self.running,
+                'next_run': ts(self.next_run), 'last_run': ts(self.last_run), 'runs': self.runs,
+                'last_duration': None if self.last_duration is None else round(self.last_duration, 2),
+                'last_error': self.last_error}
+
+
+class BotDaemon:
+    """Internal scheduler plus the warm clients shared by every task."""
+
+    def __init__(self, tasks, dry_run=False, workers=TASK_WORKERS):
+        self.dry_run = dry_run
+        self.started = time.time()
+        self.tasks = {}
+        self._heap = []
+        self._cond = threading.Condition()
+        # Guards Task.running: the scheduler and control-socket threads both dispatch
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='task')
+        self._clob_client = None
+        self._monitor_store = None
+        self._alerts_sent = {}
+        self.services = []
+        for name in tasks:
+            self._setup(name)
+
+    # --- task definitions ---
+    def _setup(self, name):
+        if name == 'summary':
+            self.add_task('summary', self._summary, DailyAt(SUMMARY_TIMES.split(',')))
+        elif name == 'excel':
+            self.add_task('excel', self._excel, DailyAt([EXCEL_TIME], day=1))
+        elif name == 'monitor':
+            from notification.monitor import MONITOR_INTERVAL
+            self.add_task('monitor', self._monitor, Every(MONITOR_INTERVAL))
+        elif name == 'redeem':
+            self.add_task('redeem', self._redeem, Every(REDEEM_INTERVAL, first=60))
+        elif name == 'orders':
+            if self.dry_run:
+                raise ValueError("orders has no dry-run mode; leave it out with --dry-run")
+            from order_all_markets_repeat import RUN_INTERVAL
+            self.add_task('orders', self._orders, Every(RUN_INTERVAL))
+        elif name == 'reconcile':
+            self.add_task('reconcile', self._reconcile, Every(RECONCILE_INTERVAL, first=120))
+        elif name == 'jobs':
+            self.services.append('jobs')
+        else:
+            raise ValueError(f"Unknown task '{name}'. Available: summary, excel, monitor, jobs, reconcile, redeem, orders")
+
+    def add_task(self, name, fn, schedule):
+        task = self.tasks[name] = Task(name, fn, schedule)
+        task.next_run = schedule.first_run(time.time())
+        with self._cond:
+            heapq.heappush(self._heap, (task.next_run, name))
+            self._cond.notify()
+
+    def _summary(self):
+        from notification.send_reports import send_daily_summary
+        send_daily_summary(self.dry_run)
+
+    def _excel(self):
+        from notification.send_reports import send_monthly_report
+        send_monthly_report(datetime.now(DAEMON_TZ), dry_run=self.dry_run)
+
+    def _monitor(self):
+        from notification.monitor import tick, MONITOR_INTERVAL
+        from notification.timeseries import TimeSeriesStore
+        from notification.fetch_notification_data import POLYMARKET_ADDRESS
+        from notification.telegram_queue import get_queue
+        if self._monitor_store is None:
+            self._monitor_store = TimeSeriesStore()
+        queue = None if self.dry_run else get_queue()
+        tick(self._monitor_store, POLYMARKET_ADDRESS, MONITOR_INTERVAL * 0.8, self._alerts_sent, queue, self.dry_run)
+
+    def _redeem(self):
+        from redeem_all import run_once
+        run_once(dry_run=self.dry_run)
+
+    def _reconcile(self):
+        from export_data.pnl import fetch_round_pnl, load_tracker, update_pnl, ROUND_SECONDS
+        from export_data.fill_template import ACTIVITY_WINDOW_SECONDS
+        now = int(time.time())
+        from_ts = now - RECONCILE_LOOKBACK
+        tracker = load_tracker()
+        if tracker.points and tracker.points[-1][0]:
+            # Catch up from the last committed round after the daemon was down
+            from_ts = min(from_ts, int(tracker.points[-1][0]))
+        from_ts -= from_ts % ROUND_SECONDS
+        # Fetch from a fixed window boundary (settled windows are cached) far enough back that
+        # every round starting at from_ts or later has all its fills; a round cut by the fetch
+        # start would replace its committed PnL with a partial one, so only those are passed on
+        fetch_from = from_ts - RECONCILE_FILL_LEAD
+        fetch_from -= fetch_from % ACTIVITY_WINDOW_SECONDS
+        entries = [e for e in fetch_round_pnl(fetch_from, now)
+                   if e['start_time'] is not None and e['start_time'] >= from_ts]
+        tracker = update_pnl(entries)
+        summary = tracker.summary()
+        logging.info(f"Reconciled {len(entries)} rounds: {summary['rounds']} settled, PnL {summary['pnl']}, "
+                     f"max drawdown {summary['max_drawdown']}")
+
+    def _orders(self):
+        from order_all_markets_repeat import place_all_markets
+        from order import prepare_client
+        if self._clob_client is None:
+            # Deriving API creds is the slow part of a cold start; keep the client for later runs
+            self._clob_client = prepare_client()
+        try:
+            place_all_markets(self._clob_client)
+        except Exception:
+            self._clob_client = None
+            raise
+
+    # --- scheduler ---
+    def _execute(self, task):
+        started = time.time()
+        try:
+            task.fn()
+            task.last_error = None
+        except Exception as e:
+            task.last_error = f"{type(e).__name__}: {e}"
+            logging.error(f"Task {task.name} failed: {task.last_error}")
+        finally:
+            task.last_run = started
+            task.last_duration = time.time() - started
+            task.runs += 1
+            with self._run_lock:
+                task.running = False
+
+    def _dispatch(self, task):
+        with self._run_lock:
+            if task.running:
+                logging.warning(f"Task {task.name} still running; skipping this run")
+                return False
+            task.running = True
+        try:
+            self._executor.submit(self._execute, task)
+        except RuntimeError:
+            # Executor already shut down (daemon stopping)
+            with self._run_lock:
+                task.running = False
+            return False
+        return True
+
+    def _scheduler(self):
+        while not self._stop.is_set():
+            with self._cond:
+                if not self._heap:
+                    self._cond.wait(1.0)
+                    continue
+                when, name = self._heap[0]
+                delay = when - time.time()
+                if delay > 0:
+                    self._cond.wait(min(delay, 1.0))
+                    continue
+                heapq.heappop(self._heap)
+                task = self.tasks[name]
+                # After a stall (e.g. the machine slept) catch up with one run, not a burst
+                task.next_run = task.schedule.next_after(max(when, time.time() - 1))
+                heapq.heappush(self._heap, (task.next_run, name))
+            if not task.paused:
+                self._dispatch(task)
+
+    def run_now(self, name) -> bool:
+        task = self.tasks.get(name)
+        if task is None:
+            raise ValueError(f"Unknown task '{name}'")
+        return self._dispatch(task)
+
+    # --- services ---
+    def _start_services(self):
+        from notification.telegram_queue import get_queue
+        queue = get_queue()
+        if queue.token and not self.dry_run:
+            queue.start()
+        if 'jobs' in self.services:
+            if self.dry_run:
+                # Jobs have real side effects (redeem, cancel); they wait for a live daemon
+                logging.warning("Dry run: job workers not started")
+                self.services.remove('jobs')
+                return
+            from job_queue import get_queue as get_job_queue
+            jobs = get_job_queue()
+            jobs.prune()
+            jobs.start()
+
+    def _stop_services(self):
+        from notification.telegram_queue import get_queue
+        get_queue().stop()
+        if 'jobs' in self.services:
+            from job_queue import get_queue as get_job_queue
+            get_job_queue().stop()
+
+    # --- control socket ---
+    def handle(self, request: dict) -> dict:
+        cmd = request.get('cmd')
+        name = request.get('task')
+        if cmd == 'status':
+            out = {'pid': os.getpid(), 'uptime': int(time.time() - self.started), 'dry_run': self.dry_run,
+                   'tasks': {n: t.status() for n, t in self.tasks.items()}, 'services': self.services}
+            if 'jobs' in self.services:
+                from job_queue import get_queue as get_job_queue
+                out['jobs'] = get_job_queue().status()
+            from notification.telegram_queue import get_queue
+            out['telegram'] = get_queue().status()
+            return out
+        if cmd in ('run', 'pause', 'resume'):
+            if name not in self.tasks:
+                return {'error': f"Unknown task '{name}'. Tasks: {', '.join(self.tasks)}"}
+            if cmd == 'run':
+                return {'started': self.run_now(name)}
+            self.tasks[name].paused = cmd == 'pause'
+            return {'task': name, 'paused': self.tasks[name].paused}
+        if cmd == 'stop':
+            self._stop.set()
+            return {'stopping': True}
+        return {'error': f"Unknown command '{cmd}'. Commands: status, run, pause, resume, stop"}
+
+    def _serve_client(self, conn):
+        with conn:
+            conn.settimeout(CONTROL_TIMEOUT)
+            try:
+                data = b''
+                while not data.endswith(b'\n'):
+                    chunk = conn.recv(4096)
+                    if not chunk:
+                        break
+                    data += chunk
+                response = self.handle(json.loads(data or b'{}'))
+            except Exception as e:
+                response = {'error': str(e)}
+            conn.sendall(json.dumps(response, default=str).encode() + b'\n')
+
+    def _control_server(self, server):
+        server.settimeout(1.0)
+        while not self._stop.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+
+    def run(self):
+        server = open_control_socket()
+        self._start_services()
+        threads = [threading.Thread(target=self._scheduler, name='scheduler', daemon=True),
+                   threading.Thread(target=self._control_server, args=(server,), name='control', daemon=True)]
+        for t in threads:
+            t.start()
+        for task in self.tasks.values():
+            logging.info(f"Task {task.name}: {task.schedule}, next {task.status()['next_run']}")
+        logging.info(f"Bot daemon running (pid {os.getpid()}, services: {', '.join(self.services) or 'none'})")
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        finally:
+            logging.info("Stopping bot daemon...")
+            with self._cond:
+                self._cond.notify_all()
+            server.close()
+            if hasattr(socket, 'AF_UNIX') and os.path.exists(DAEMON_SOCKET):
+                os.unlink(DAEMON_SOCKET)
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._stop_services()
+
+    def stop(self):
+        self._stop.set()
+
+
+def open_control_socket():
+    if hasattr(socket, 'AF_UNIX'):
+        if os.path.exists(DAEMON_SOCKET):
+            try:
+                send_command({'cmd': 'status'}, timeout=2)
+            except OSError:
+                # Left behind by a daemon that died
+                os.unlink(DAEMON_SOCKET)
+            else:
+                raise SystemExit(f"Another bot daemon is already listening on {DAEMON_SOCKET}")
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(DAEMON_SOCKET)
+        os.chmod(DAEMON_SOCKET, 0o600)
+    else:
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', DAEMON_PORT))
+    server.listen(8)
+    return server
+
+
+def send_command(request: dict, timeout=CONTROL_TIMEOUT) -> dict:
+    """Send one command to the running daemon and return its JSON answer."""
+    if hasattr(socket, 'AF_UNIX'):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = DAEMON_SOCKET
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ('127.0.0.1', DAEMON_PORT)
+    with sock:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    if len(sys.argv) > 1 and sys.argv[1] == 'ctl':
+        parser = argparse.ArgumentParser(prog='bot_daemon.py ctl', description='Control the running bot daemon.')
+        parser.add_argument('cmd', choices=['status', 'run', 'pause', 'resume', 'stop'])
+        parser.add_argument('task', nargs='?', help='Task name for run / pause / resume')
+        args = parser.parse_args(sys.argv[2:])
+        try:
+            print(json.dumps(send_command({'cmd': args.cmd, 'task': args.task}), indent=2))
+        except OSError as e:
+            print(f"Bot daemon not reachable: {e}")
+            sys.exit(1)
+        return
+
+    parser = argparse.ArgumentParser(description='Run ordering, redeem, monitoring and reports in one process.')
+    parser.add_argument('--tasks', default=DAEMON_TASKS,
+                        help='Comma separated: summary, excel, monitor, jobs, reconcile, redeem, orders')
+    parser.add_argument('--dry-run', action='store_true', help='Print summaries, reports and alerts instead of sending')
+    args = parser.parse_args()
+
+    daemon = BotDaemon([t.strip() for t in args.tasks.split(',') if t.strip()], dry_run=args.dry_run)
+    signal.signal(signal.SIGINT, lambda *_: daemon.stop())
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    daemon.run()
+
+
+if __name__ == '__main__':
+    main()
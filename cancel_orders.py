@@ -7,8 +7,6 @@ Cancel Polymarket CLOB orders placed by order_gpt.py
 import os
 import dotenv
 
-from py_clob_client.client import ClobClient
-
 # Load environment variables
 dotenv.load_dotenv()
 
@@ -23,6 +21,8 @@ SIGNATURE_TYPE = int(os.getenv("SIGNATURE_TYPE", "1"))
 ORDER_IDS_DIR = "order_ids"
 
 def prepare_client():
+    # Imported here so loading order IDs (and `import cancel_orders`) stays cheap
+    from py_clob_client.client import ClobClient
     if SIGNATURE_TYPE == 1:
         client = ClobClient(
             HOST,
@@ -71,5 +71,9 @@ def cancel_orders(client, order_ids):
 if __name__ == "__main__":
     order_ids = load_all_order_ids()
     print(f"Loaded {len(order_ids)} order IDs to cancel from '{ORDER_IDS_DIR}'.")
-    client = prepare_client()
-    cancel_orders(client, order_ids)
+    if order_ids:
+        client = prepare_client()
+        cancel_orders(client, order_ids)
+    else:
+        # Nothing to cancel: skip importing the client and deriving API creds
+        print("No order IDs to cancel.")
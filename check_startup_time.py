@@ -0,0 +1,127 @@
+"""
+Startup-time budget for the CLI entry points.
+
+Every entry point is started in a fresh interpreter under `python -X importtime` and the
+import time it adds on top of a bare interpreter is compared with its budget. Scripts
+with an argument parser are started with --help; the others are only imported, so
+nothing is fetched, sent or cancelled. Heavy dependencies (py_clob_client, web3,
+openpyxl, requests) are imported where they are used, and this check keeps it that way:
+an entry point over budget fails the run and the packages it spent the time in are listed.
+
+Import time is measured rather than wall time: it is far less noisy and is what a stray
+top-level import costs. Each entry point is run STARTUP_RUNS times (after one warm-up run
+that compiles bytecode) and the fastest run is kept, since machine noise only adds time.
+Entry points whose dependencies are not installed are reported as skipped.
+
+Usage:
+    python check_startup_time.py
+    python check_startup_time.py --runs 5 --top 8
+    python check_startup_time.py send_reports cancel_orders
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
+
+STARTUP_RUNS = 5
+TOP_PACKAGES = 5
+
+# name -> (interpreter arguments, budget in ms of import time beyond a bare interpreter)
+ENTRY_POINTS = {
+    'cancel_orders': (['-c', 'import cancel_orders'], 75),
+    'find_market_by_slug': (['-c', 'import find_market_by_slug'], 75),
+    'send_reports': (['notification/send_reports.py', '--dry-run', '--help'], 100),
+    'order': (['-c', 'import order'], 100),
+    'fill_template': (['export_data/fill_template.py', '--help'], 120),
+    'fetch_redeemable_positions': (['fetch_redeemable_positions.py', '--help'], 120),
+    'redeem_all': (['redeem_all.py', '--help'], 120),
+    'telegram_queue': (['notification/telegram_queue.py', '--help'], 75),
+    'job_queue': (['job_queue.py', '--help'], 75),
+    'bot_daemon': (['bot_daemon.py', '--help'], 75),
+}
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """[(module, depth, self_us, cumulative_us), ...] from `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        raw = parts[2].rstrip()
+        name = raw.lstrip()
+        depth = (len(raw) - len(name) - 1) // 2
+        rows.append((name, depth, int(parts[0]), int(parts[1])))
+    return rows
+
+
+def _run(args: list[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=PROJECT_ROOT,
+                          capture_output=True, text=True, timeout=120)
+
+
+def interpreter_modules() -> set[str]:
+    """Modules a bare interpreter imports at startup (site, encodings, ...)."""
+    return {name for name, _, _, _ in parse_importtime(_run(['-c', 'pass']).stderr)}
+
+
+def measure(args: list[str], baseline: set[str], runs: int = STARTUP_RUNS):
+    """(fastest import ms, {top-level package: self ms} of that run), or (None, error)."""
+    _run(args)  # warm-up: writes __pycache__
+    samples = []
+    for _ in range(runs):
+        proc = _run(args)
+        if proc.returncode != 0:
+            lines = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')]
+            return None, lines[-1] if lines else f"exit code {proc.returncode}"
+        rows = [r for r in parse_importtime(proc.stderr) if r[0] not in baseline]
+        total = sum(cum for _, depth, _, cum in rows if depth == 0)
+        samples.append((total, rows))
+    total, rows = min(samples, key=lambda s: s[0])
+    packages = {}
+    for name, _, self_us, _ in rows:
+        pkg = name.split('.')[0]
+        packages[pkg] = packages.get(pkg, 0) + self_us
+    return total / 1000, {pkg: us / 1000 for pkg, us in packages.items()}
+
+
+def check(names=None, runs: int = STARTUP_RUNS, top: int = TOP_PACKAGES) -> bool:
+    """Measure the entry points and print a report; True if all measured ones are in budget."""
+    baseline = interpreter_modules()
+    ok = True
+    for name, (args, budget) in ENTRY_POINTS.items():
+        if names and name not in names:
+            continue
+        ms, detail = measure(args, baseline, runs)
+        if ms is None:
+            print(f"SKIP  {name:<28} {detail}")
+            continue
+        over = ms > budget
+        ok = ok and not over
+        print(f"{'OVER' if over else 'ok':<5} {name:<28} {ms:7.1f} ms  (budget {budget} ms)")
+        if over or top:
+            heaviest = sorted(detail.items(), key=lambda kv: kv[1], reverse=True)[:top or TOP_PACKAGES]
+            print('      ' + ', '.join(f"{pkg} {pkg_ms:.1f}" for pkg, pkg_ms in heaviest))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check CLI entry points against their import-time budgets.')
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help=f"Entry points to check (default all): {', '.join(ENTRY_POINTS)}")
+    parser.add_argument('--runs', type=int, default=STARTUP_RUNS, help=f'Runs per entry point (fastest kept, default {STARTUP_RUNS})')
+    parser.add_argument('--top', type=int, default=TOP_PACKAGES, help=f'Heaviest packages listed per entry point (default {TOP_PACKAGES}; over-budget ones always get them)')
+    args = parser.parse_args()
+    unknown = sorted(set(args.names) - set(ENTRY_POINTS))
+    if unknown:
+        parser.error(f"unknown entry point(s): {', '.join(unknown)}")
+    sys.exit(0 if check(args.names, max(1, args.runs), args.top) else 1)
+
+
+if __name__ == '__main__':
+    main()
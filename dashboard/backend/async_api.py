@@ -0,0 +1,159 @@
+"""
+Async upstream client for the dashboard backend (httpx).
+
+Mirrors fill_template.fetch_activities / fetch_positions and
+onchain_balance.get_erc20_balance without blocking the event loop or a worker
+thread per request. Activity windows are fetched concurrently (bounded by
+API_CONCURRENCY) and share fill_template's in-process window/positions caches, so
+settled windows fetched by either path are never requested twice.
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+import httpx
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from export_data import fill_template  # noqa: E402
+from export_data.fill_template import (  # noqa: E402
+    DATA_API_ACTIVITY_URL, DATA_API_POSITION_URL, ACTIVITY_WINDOW_SECONDS, ACTIVITY_SETTLE_SECONDS,
+    POSITIONS_CACHE_TTL,
+)
+from notification.onchain_balance import normalize_address, build_balance_of_call  # noqa: E402
+
+API_CONCURRENCY = int(os.getenv('DASHBOARD_API_CONCURRENCY', '4'))
+API_TIMEOUT = 10
+POSITIONS_PAGE_SIZE = 500
+POSITIONS_MAX_OFFSET = 10000
+
+
+def _split_activities(batch):
+    trades, redeems = [], []
+    if isinstance(batch, list):
+        for item in batch:
+            if item.get('type') == 'TRADE':
+                trades.append(item)
+            elif item.get('type') == 'REDEEM':
+                redeems.append(item)
+    return trades, redeems
+
+
+class AsyncApiClient:
+    """One pooled httpx.AsyncClient for the Data API and the Polygon RPC."""
+
+    def __init__(self, concurrency=API_CONCURRENCY, timeout=API_TIMEOUT):
+        self._concurrency = concurrency
+        self._timeout = timeout
+        self._client = None
+        self._sem = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=httpx.Limits(max_connections=self._concurrency * 2,
+                                    max_keepalive_connections=self._concurrency),
+            )
+            self._sem = asyncio.Semaphore(self._concurrency)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_json(self, url, params):
+        client = self.client
+        async with self._sem:
+            resp = await client.get(url, params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    # --- Data API ---
+    async def fetch_activity_window(self, address, start_time, end_time):
+        """Return (trades, redeems) for one window, using the shared settled-window cache."""
+        key = (address, start_time, end_time)
+        with fill_template._cache_lock:
+            cached = fill_template.ACTIVITY_WINDOW_CACHE.get(key)
+        if cached is not None:
+            return [dict(i) for i in cached[0]], [dict(i) for i in cached[1]]
+        batch = await self._get_json(DATA_API_ACTIVITY_URL, {
+            'user': address, 'start': start_time, 'end': end_time, 'limit': 500,
+        })
+        trades, redeems = _split_activities(batch)
+        if end_time <= time.time() - ACTIVITY_SETTLE_SECONDS:
+            with fill_template._cache_lock:
+                fill_template.ACTIVITY_WINDOW_CACHE[key] = (trades, redeems)
+            return [dict(i) for i in trades], [dict(i) for i in redeems]
+        return trades, redeems
+
+    async def fetch_activities(self, from_time, to_time, address):
+        """Return (trades, redeems) in [from_time, to_time); windows run concurrently.
+
+        Any failed window raises: the cache keeps a sync cursor and must not skip gaps.
+        """
+        start_time = int(from_time)
+        end = int(to_time) if to_time not in ("", None) else int(time.time())
+        windows = []
+        while start_time < end:
+            windows.append((start_time, min(start_time + ACTIVITY_WINDOW_SECONDS, end)))
+            start_time = windows[-1][1]
+        results = await asyncio.gather(*(self.fetch_activity_window(address, s, e) for s, e in windows))
+        trades_out, redeems_out = [], []
+        for trades, redeems in results:
+            trades_out.extend(trades)
+            redeems_out.extend(redeems)
+        return trades_out, redeems_out
+
+    async def fetch_positions(self, address, max_age=POSITIONS_CACHE_TTL):
+        """Fetch all positions with pagination, reusing a recent in-process copy."""
+        now = time.time()
+        with fill_template._cache_lock:
+            cached = fill_template.POSITIONS_CACHE.get(address)
+        if cached is not None and now - cached[0] < max_age:
+            return cached[1]
+        all_positions = []
+        offset = 0
+        while offset < POSITIONS_MAX_OFFSET:
+            page = await self._get_json(DATA_API_POSITION_URL, {
+                'user': address, 'limit': POSITIONS_PAGE_SIZE, 'offset': offset,
+                'sortBy': 'CURRENT', 'sortDirection': 'DESC',
+            })
+            if isinstance(page, dict) and 'data' in page:
+                page = page['data']
+            if not page:
+                break
+            all_positions.extend(page)
+            if len(page) < POSITIONS_PAGE_SIZE:
+                break
+            offset += POSITIONS_PAGE_SIZE
+        with fill_template._cache_lock:
+            fill_template.POSITIONS_CACHE[address] = (now, all_positions)
+        return all_positions
+
+    # --- Polygon RPC ---
+    async def get_erc20_balance(self, rpc_url, token_address, wallet_address, decimals) -> dict:
+        token_address = normalize_address(token_address)
+        wallet_address = normalize_address(wallet_address)
+        payload = {
+            "jsonrpc": "2.0", "id": 1, "method": "eth_call",
+            "params": [{"to": token_address, "data": build_balance_of_call(wallet_address)}, "latest"],
+        }
+        resp = await self.client.post(rpc_url, json=payload)
+        resp.raise_for_status()
+        out = resp.json()
+        if 'error' in out:
+            raise RuntimeError(out['error'])
+        raw_hex = out.get('result')
+        if not raw_hex or not raw_hex.startswith("0x"):
+            raise RuntimeError("Invalid eth_call result")
+        raw_int = int(raw_hex, 16)
+        return {'token': token_address, 'wallet': wallet_address, 'raw': raw_int,
+                'decimals': decimals, 'human': raw_int / (10 ** decimals)}
@@ -0,0 +1,135 @@
+"""
+Server-Sent Events hub for live dashboard updates.
+
+Events (round, fill, balance) are produced once by the background sync and fanned
+out to every viewer, so the number of open dashboards never multiplies upstream
+calls. Each event gets an increasing id and is kept in a ring buffer, so a client
+that reconnects with Last-Event-ID gets what it missed. Ids start from the process
+start time in microseconds, so they keep increasing across backend restarts, and an
+id issued by another process (older or newer) is answered with 'reset'. Every
+subscriber has a bounded queue: a viewer that falls behind is sent a single 'reset'
+event (reload via the REST API) instead of slowing the publisher down or growing
+memory.
+"""
+
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+
+EVENT_BUFFER_SIZE = 1000
+SUBSCRIBER_QUEUE_SIZE = 256
+HEARTBEAT_SECONDS = 15
+
+
+def format_event(event_id, event_type, data) -> str:
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscriber:
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE, start_id=0):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.lagged = False
+        # Events up to start_id were replayed from the buffer already
+        self.start_id = start_id
+
+    def offer(self, event_id, frame):
+        if self.lagged or event_id <= self.start_id:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Drop the backlog; None wakes the stream, which sends one 'reset' instead
+            self.lagged = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class EventHub:
+    """Ring buffer of serialized events plus per-subscriber bounded queues."""
+
+    def __init__(self, buffer_size=EVENT_BUFFER_SIZE, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self._buffer = deque(maxlen=buffer_size)  # (id, frame)
+        self._queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._loop = None
+        # Per-process epoch: ids of this process are > first_id, any other id needs a reset
+        self.first_id = time.time_ns() // 1000
+        self.last_id = self.first_id
+
+    def bind(self, loop):
+        """Attach the event loop that owns the subscriber queues (call on startup)."""
+        self._loop = loop
+
+    def publish(self, event_type, data) -> int:
+        """Record and fan out one event. Safe to call from any thread."""
+        with self._lock:
+            self.last_id += 1
+            event_id = self.last_id
+            frame = format_event(event_id, event_type, data)
+            self._buffer.append((event_id, frame))
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._fan_out, event_id, frame)
+            except RuntimeError:
+                pass  # loop already closed (shutdown)
+        return event_id
+
+    def _fan_out(self, event_id, frame):
+        for sub in list(self._subscribers):
+            sub.offer(event_id, frame)
+
+    def subscribe(self, last_event_id=None) -> tuple[Subscriber, list[str], bool]:
+        """Register a subscriber; returns (subscriber, frames to replay, reset_needed).
+
+        reset_needed is True when last_event_id is older than the ring buffer or was
+        not issued by this process (e.g. the backend restarted). Must be called on the
+        bound event loop.
+        """
+        with self._lock:
+            sub = Subscriber(self._queue_size, self.last_id)
+            replay, reset = [], False
+            if last_event_id is not None:
+                oldest = self._buffer[0][0] if self._buffer else self.last_id + 1
+                if last_event_id < oldest - 1 or last_event_id > self.last_id or last_event_id < self.first_id:
+                    reset = True
+                else:
+                    replay = [frame for event_id, frame in self._buffer if event_id > last_event_id]
+            self._subscribers.add(sub)
+        return sub, replay, reset
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def stream(self, last_event_id=None, is_disconnected=None, heartbeat=HEARTBEAT_SECONDS):
+        """Async generator of SSE text for one client."""
+        sub, replay, reset = self.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            if reset:
+                yield format_event(self.last_id, 'reset', {'reason': 'expired'})
+            for frame in replay:
+                yield frame
+            while True:
+                try:
+                    frame = await asyncio.wait_for(sub.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    if is_disconnected is not None and await is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    sub.lagged = False
+                    yield format_event(self.last_id, 'reset', {'reason': 'lagged'})
+                    continue
+                yield frame
+        finally:
+            self.unsubscribe(sub)
@@ -1,12 +1,101 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request, Header
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-import subprocess
+from fastapi.middleware.gzip import GZipMiddleware
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import time
+import orjson
 import sys
 import os
-import importlib.util
-import json
 
-app = FastAPI()
+# Ensure project root is on sys.path for 'utils'
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from dashboard.backend.round_cache import RoundCache  # noqa: E402
+from dashboard.backend.round_store import RoundStore, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE  # noqa: E402
+from dashboard.backend.events import EventHub  # noqa: E402
+from export_data.fill_template import PRICE_RANGE, TIME_FRAMES  # noqa: E402
+from export_data.analysis_cube import parse_price_range, parse_frames  # noqa: E402
+from notification.timeseries import TimeSeriesStore  # noqa: E402
+
+BALANCE_INTERVAL = int(os.getenv('DASHBOARD_BALANCE_INTERVAL', '60'))
+# Responses smaller than this are not worth compressing (SSE is never gzipped)
+GZIP_MIN_SIZE = 1000
+logger = logging.getLogger(__name__)
+
+
+class OrjsonResponse(JSONResponse):
+    """JSON response serialized with orjson (compact, several times faster than json)."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+# Live updates: produced once per sync / balance poll, fanned out to every viewer
+event_hub = EventHub()
+
+
+def publish_sync_changes(rounds, trades):
+    # Runs in the sync thread; EventHub.publish is thread-safe
+    for t in trades:
+        event_hub.publish('fill', {
+            'round_id': t.get('conditionId'),
+            'title': t.get('title'),
+            'price': int(round((t.get('price') or 0) * 100)),
+            'outcome_index': t.get('outcomeIndex'),
+            'side': t.get('side'),
+            'size': t.get('size'),
+            'timestamp': t.get('timestamp'),
+        })
+    for r in rounds:
+        event_hub.publish('round', r)
+
+
+# Grouped rounds served from memory, kept fresh by a background delta sync and
+# mirrored into an indexed SQLite store for filtered queries
+round_store = RoundStore()
+round_cache = RoundCache(store=round_store, on_change=publish_sync_changes)
+# Balance / PnL samples written by notification/monitor.py
+timeseries_store = TimeSeriesStore()
+
+
+async def watch_balance(interval=BALANCE_INTERVAL):
+    """Poll the on-chain USDC balance and publish a 'balance' event when it changes."""
+    from notification.onchain_balance import POLYGON_RPC, USDC_ADDRESS, USDC_DECIMALS
+    address = round_cache.address
+    if not address:
+        return
+    last = None
+    while True:
+        try:
+            bal = await round_cache.client.get_erc20_balance(POLYGON_RPC, USDC_ADDRESS, address, USDC_DECIMALS)
+            if bal['raw'] != last:
+                last = bal['raw']
+                event_hub.publish('balance', {'wallet': bal['wallet'], 'usdc': bal['human']})
+        except Exception as e:
+            logger.warning(f"Balance poll failed: {e}")
+        await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    event_hub.bind(asyncio.get_running_loop())
+    tasks = [asyncio.create_task(round_cache.run_forever()), asyncio.create_task(watch_balance())]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await round_cache.client.aclose()
+        round_store.close()
+        timeseries_store.close()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=OrjsonResponse)
 
 # Allow CORS for local frontend
 app.add_middleware(
@@ -16,17 +105,109 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
 
-# Path to your fill_template.py
-FILL_TEMPLATE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../export_data/fill_template.py'))
 
 @app.get("/api/grouped-data")
-def get_grouped_data():
-    # Dynamically import fill_template.py and run the logic
-    spec = importlib.util.spec_from_file_location("fill_template", FILL_TEMPLATE_PATH)
-    fill_template = importlib.util.module_from_spec(spec)
-    sys.modules["fill_template"] = fill_template
-    spec.loader.exec_module(fill_template)
-    data = fill_template.get_data()
-    grouped_data = fill_template.group_rounds(data)
-    return grouped_data
+async def get_grouped_data(refresh: bool = False):
+    # refresh=true waits for a delta sync (shared with any sync already running)
+    if refresh:
+        await round_cache.refresh()
+    return await round_cache.get_rounds()
+
+
+@app.get("/api/rounds")
+async def query_rounds(
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    price: int | None = None,
+    price_min: int | None = None,
+    price_max: int | None = None,
+    outcome: int | None = None,
+    result: str | None = Query(None, pattern="^(win|lose)$"),
+    minute_min: int | None = None,
+    minute_max: int | None = None,
+    sort: str = "start_time",
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+):
+    """Filtered, cursor-paginated rounds; pass next_cursor back as `cursor` for the next page."""
+    await round_cache.ensure_synced()
+    try:
+        # SQLite query under the store lock: keep it off the event loop (SSE, other requests)
+        return await asyncio.to_thread(
+            round_store.query,
+            from_ts=from_ts, to_ts=to_ts, price=price, price_min=price_min, price_max=price_max,
+            outcome=outcome, is_win=None if result is None else result == "win",
+            minute_min=minute_min, minute_max=minute_max, sort=sort,
+            descending=order == "desc", limit=limit, cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/analysis")
+async def get_analysis(
+    prices: str | None = Query(None, description="Price cents, e.g. 1-10 or 5,4,3"),
+    frames: str | None = Query(None, description="Minute frame boundaries, e.g. 0,4,6,8,12"),
+    outcome: int | None = None,
+    hours: str | None = Query(None, description="Comma separated hours of day in GMT+7"),
+    weekdays: str | None = Query(None, description="Comma separated weekdays (0=Mon)"),
+):
+    """Price x time-frame win/EV statistics in columnar form, served from the cached cube."""
+    try:
+        price_list = parse_price_range(prices) if prices else PRICE_RANGE
+        frame_list = parse_frames(frames) if frames else TIME_FRAMES
+        filters = {'outcome': outcome}
+        if hours:
+            filters['hours'] = [int(x) for x in hours.split(',') if x.strip()]
+        if weekdays:
+            filters['weekdays'] = [int(x) for x in weekdays.split(',') if x.strip()]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    body = await round_cache.get_analysis(price_list, frame_list, encode=orjson.dumps, **filters)
+    return Response(body, media_type="application/json")
+
+
+@app.post("/api/refresh")
+async def refresh_rounds():
+    """Wait for a delta sync (joins one already running) and return the cache status."""
+    await round_cache.refresh()
+    return round_cache.status()
+
+
+@app.get("/api/timeseries")
+async def get_timeseries(
+    series: str = "balance",
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    step: int = Query(3600, ge=60),
+):
+    """Downsampled balance / PnL history (columnar buckets); defaults to the last 24 hours."""
+    to_ts = to_ts or int(time.time())
+    from_ts = from_ts if from_ts is not None else to_ts - 24 * 3600
+    if to_ts <= from_ts:
+        raise HTTPException(status_code=400, detail="to_ts must be after from_ts")
+    data = await asyncio.to_thread(timeseries_store.downsample, series, from_ts, to_ts, step)
+    return {'series': series, 'step': step, **data}
+
+
+@app.get("/api/events")
+async def stream_events(request: Request, last_event_id: int | None = Header(None),
+                        since: int | None = None):
+    """SSE stream of 'round', 'fill', 'balance' and 'reset' events.
+
+    Browsers resend Last-Event-ID on reconnect; `since` does the same for the first connect.
+    """
+    resume_from = last_event_id if last_event_id is not None else since
+    return StreamingResponse(
+        event_hub.stream(resume_from, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/status")
+async def get_status():
+    return {**round_cache.status(), 'last_event_id': event_hub.last_id, 'viewers': event_hub.subscriber_count}
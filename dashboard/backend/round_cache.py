@@ -0,0 +1,257 @@
+"""
+In-memory cache of grouped rounds for the dashboard backend.
+
+The first sync crawls activities from DASHBOARD_FROM_TIME up to now; later syncs
+only fetch from the last sync point (minus SYNC_OVERLAP for late-indexed
+activities), dedupe the new activities and regroup just the rounds they touch.
+Requests are served from memory. A stale cache is returned immediately while a
+refresh runs in the background, and concurrent refreshes share one in-flight sync.
+Upstream calls go through the async httpx client (async_api.py); only the regrouping
+runs in a worker thread. Changed rounds are also written to an optional RoundStore for
+indexed queries, folded into an AnalysisCube for /api/analysis, and passed with the new
+trades to an optional on_change(rounds, trades) callback (after the first sync) for
+live push.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from utils.common import r2, format_timestamps, ET_TZ  # noqa: E402
+from export_data import fill_template  # noqa: E402
+from export_data.analysis_cube import AnalysisCube  # noqa: E402
+from dashboard.backend.async_api import AsyncApiClient  # noqa: E402
+
+CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '60'))
+DASHBOARD_FROM_TIME = int(os.getenv('DASHBOARD_FROM_TIME', fill_template.FROM_TIME))
+# Re-fetch this much before the last sync point; the Data API can index activities late
+SYNC_OVERLAP = fill_template.ACTIVITY_SETTLE_SECONDS
+# Encoded /api/analysis answers kept per cache version
+ANALYSIS_CACHE_SIZE = 32
+
+logger = logging.getLogger(__name__)
+
+
+def add_display_times(grouped_data):
+    """Attach ET display strings, formatting all round/order timestamps in one batch."""
+    start_labels = format_timestamps((r.get('start_time') for r in grouped_data), ET_TZ, '%Y-%m-%d %I:%M %p')
+    order_labels = iter(format_timestamps((o.get('time') for r in grouped_data for o in r.get('orders', [])),
+                                          ET_TZ, '%I:%M:%S %p'))
+    for r, label in zip(grouped_data, start_labels):
+        r['start_time_et'] = label
+        for o in r.get('orders', []):
+            o['time_et'] = next(order_labels)
+
+
+def _activity_key(a):
+    return (a.get('transactionHash'), a.get('asset'), a.get('side'), a.get('timestamp'),
+            a.get('price'), a.get('size'))
+
+
+class RoundCache:
+    """Grouped rounds kept in memory and refreshed by delta syncs."""
+
+    def __init__(self, address=None, from_time=DASHBOARD_FROM_TIME, ttl=CACHE_TTL, store=None, on_change=None,
+                 client=None):
+        self.address = address or fill_template.POLYMARKET_ADDRESS
+        self.client = client or AsyncApiClient()
+        self.store = store
+        self.cube = AnalysisCube()
+        self._analysis_cache = {}
+        self.on_change = on_change
+        self.from_time = int(from_time)
+        self.ttl = ttl
+        self._seen = set()
+        self._trades_by_cid = {}
+        self._redeems_by_cid = {}
+        self._rounds = {}
+        self._sorted = []
+        self._lock = threading.Lock()
+        self._inflight = None
+        self.synced_to = None
+        self.updated_at = 0.0
+        self.version = 0
+
+    # --- sync ---
+    async def sync(self) -> list[dict]:
+        """Fetch activities since the last sync and regroup the touched rounds; returns them."""
+        start = self.from_time if self.synced_to is None else max(self.from_time, self.synced_to - SYNC_OVERLAP)
+        now = int(time.time())
+        trades, redeems = await self.client.fetch_activities(start, now, self.address)
+        try:
+            positions = await self.client.fetch_positions(self.address)
+        except Exception as e:
+            logger.warning(f"Could not fetch positions: {e}")
+            positions = []
+        return await asyncio.to_thread(self._apply, trades, redeems, positions, now)
+
+    def _apply(self, trades, redeems, positions, now) -> list[dict]:
+        # Blocking part of a sync: dedupe, regroup touched rounds, write through
+        touched = set()
+        new_trades = []
+        for bucket, items in ((self._trades_by_cid, trades), (self._redeems_by_cid, redeems)):
+            for item in items:
+                cid = item.get('conditionId')
+                key = _activity_key(item)
+                if not cid or key in self._seen:
+                    continue
+                self._seen.add(key)
+                bucket.setdefault(cid, []).append(item)
+                touched.add(cid)
+                if bucket is self._trades_by_cid:
+                    new_trades.append(item)
+        # Redeemable positions can flip older rounds to WIN without any new trade
+        touched.update(p.get('conditionId') for p in positions
+                       if p.get('redeemable') and p.get('conditionId') in self._trades_by_cid)
+
+        round_trades = [t for cid in touched for t in self._trades_by_cid.get(cid, [])]
+        round_redeems = [r for cid in touched for r in self._redeems_by_cid.get(cid, [])]
+        fill_template.merge_positions(round_trades, round_redeems, positions)
+        changed = fill_template.group_rounds(round_trades)
+        add_display_times(changed)
+        # Overlapping windows and position merges often regroup rounds that didn't change
+        changed = [r for r in changed if self._rounds.get(r['id']) != r]
+        if self.store is not None and changed:
+            self.store.upsert_rounds(changed)
+
+        first_sync = self.synced_to is None
+        with self._lock:
+            for r in changed:
+                self._rounds[r['id']] = r
+            self.cube.add_rounds(changed)
+            if changed:
+                self._analysis_cache.clear()
+            self._sorted = sorted(self._rounds.values(), key=lambda r: (r.get('start_time') or 0, r['id']))
+            self.synced_to = now
+            self.updated_at = time.time()
+            self.version += 1
+        if self.on_change is not None and not first_sync and (changed or new_trades):
+            try:
+                self.on_change(changed, new_trades)
+            except Exception as e:
+                logger.warning(f"on_change callback failed: {e}")
+        return changed
+
+    # --- async API ---
+    async def refresh(self) -> list[dict]:
+        """Run a sync, or join the one already in flight (single-flight)."""
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self.sync())
+            self._inflight.add_done_callback(self._clear_inflight)
+        return await asyncio.shield(self._inflight)
+
+    def _clear_inflight(self, future):
+        self._inflight = None
+
+    async def _refresh_quietly(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"Background refresh failed: {e}")
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.updated_at > self.ttl
+
+    async def ensure_synced(self):
+        """Block only until the very first sync completes; later staleness refreshes in the background."""
+        if self.synced_to is None:
+            await self.refresh()
+        elif self.stale and self._inflight is None:
+            asyncio.ensure_future(self._refresh_quietly())
+
+    async def get_rounds(self) -> list[dict]:
+        """Rounds sorted by start time."""
+        await self.ensure_synced()
+        with self._lock:
+            return self._sorted
+
+    async def run_forever(self, interval=None):
+        """Background loop: delta sync every `interval` seconds (default: the TTL)."""
+        interval = interval or self.ttl
+        while True:
+            await self._refresh_quietly()
+            await asyncio.sleep(interval)
+
+    async def get_analysis(self, prices, frames, encode=None, **filters):
+        """Columnar price x time-frame statistics (get_analysis_data fields) from the cube.
+
+        prices: price cents, frames: [{'name', 'min', 'max'}], filters: AnalysisCube.query
+        filters (outcome, hours, weekdays). With `encode`, the encoded result is cached until
+        the next sync changes a round.
+        """
+        await self.ensure_synced()
+        key = (tuple(prices), tuple((f['min'], f['max']) for f in frames),
+               tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in filters.items())))
+        with self._lock:
+            cached = self._analysis_cache.get(key) if encode is not None else None
+            if cached is not None:
+                return cached
+            result = self._analysis(prices, frames, **filters)
+        if encode is None:
+            return result
+        encoded = encode(result)
+        with self._lock:
+            if len(self._analysis_cache) >= ANALYSIS_CACHE_SIZE:
+                self._analysis_cache.pop(next(iter(self._analysis_cache)))
+            self._analysis_cache[key] = encoded
+        return encoded
+
+    def _analysis(self, prices, frames, **filters) -> dict:
+        # Caller holds self._lock
+        rounds = self._sorted
+        to_time = self.synced_to or self.from_time
+        total_orders = int((to_time - self.from_time) / 3600 * 4)
+        total_trades = len(rounds)
+        win_rounds = sum(1 for r in rounds if r.get('is_win'))
+        columns = {k: [] for k in ('price', 'matched_rounds', 'matched_rate', 'win_rounds', 'win_rate', 'ev_value')}
+        frame_columns = {k: [] for k in ('in_frame_rounds', 'in_frame_rounds_rate', 'win_in_frame_rounds',
+                                         'win_rate', 'ev_value')}
+        for price in prices:
+            matched, wins = self.cube.query_price(price, **filters)
+            win_rate = r2(wins / matched) if matched else 0
+            columns['price'].append(price)
+            columns['matched_rounds'].append(matched)
+            columns['matched_rate'].append(r2(matched / total_trades) if total_trades else 0)
+            columns['win_rounds'].append(wins)
+            columns['win_rate'].append(win_rate)
+            columns['ev_value'].append(fill_template.calculate_ev(win_rate, price))
+            rows = {k: [] for k in frame_columns}
+            for f in frames:
+                n, w = self.cube.query_price(price, f['min'], f['max'], **filters)
+                tf_win_rate = r2(w / n) if n else 0
+                rows['in_frame_rounds'].append(n)
+                rows['in_frame_rounds_rate'].append(r2(n / matched) if matched else 0)
+                rows['win_in_frame_rounds'].append(w)
+                rows['win_rate'].append(tf_win_rate)
+                rows['ev_value'].append(fill_template.calculate_ev(tf_win_rate, price))
+            for k, v in rows.items():
+                frame_columns[k].append(v)
+        return {
+            'from_time': self.from_time,
+            'to_time': to_time,
+            'total_orders': total_orders,
+            'total_trades': total_trades,
+            'trade_order_rate': r2(total_trades / total_orders) if total_orders else 0,
+            'win_rounds': win_rounds,
+            'win_trade_rate': r2(win_rounds / total_trades) if total_trades else 0,
+            'frames': [f['name'] for f in frames],
+            'prices': columns,
+            'time_frames': frame_columns,
+        }
+
+    def status(self) -> dict:
+        return {
+            'rounds': len(self._rounds),
+            'synced_to': self.synced_to,
+            'updated_at': int(self.updated_at),
+            'version': self.version,
+            'refreshing': self._inflight is not None,
+        }
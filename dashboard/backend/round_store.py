@@ -0,0 +1,168 @@
+"""
+SQLite store of grouped rounds for filtered, paginated dashboard queries.
+
+rounds holds one row per round plus a few denormalized sort/filter columns, and
+orders holds one row per (round, price). Every filter maps to an index, and
+pagination is keyset-based (cursor = last sort value + id), so page latency does
+not grow with history.
+"""
+
+import os
+import json
+import base64
+import sqlite3
+import threading
+
+DASHBOARD_DB_PATH = os.getenv('DASHBOARD_DB_PATH', os.path.join(os.path.dirname(__file__), 'rounds.db'))
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Sort columns never hold NULL so keyset comparisons stay simple
+NO_FILL_MINUTE = 1_000_000
+# public sort name -> column
+SORT_COLUMNS = {
+    'start_time': 'start_time',
+    'best_price': 'best_price',
+    'fill_minute': 'fill_minute',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id TEXT PRIMARY KEY,
+    start_time INTEGER NOT NULL,
+    is_win INTEGER NOT NULL,
+    best_price INTEGER NOT NULL,
+    fill_minute INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rounds_start ON rounds(start_time, id);
+CREATE INDEX IF NOT EXISTS idx_rounds_win_start ON rounds(is_win, start_time, id);
+CREATE INDEX IF NOT EXISTS idx_rounds_best_price ON rounds(best_price, id);
+CREATE INDEX IF NOT EXISTS idx_rounds_fill_minute ON rounds(fill_minute, id);
+CREATE TABLE IF NOT EXISTS orders (
+    round_id TEXT NOT NULL,
+    price INTEGER NOT NULL,
+    outcome_index INTEGER,
+    time INTEGER,
+    time_to_matched INTEGER,
+    PRIMARY KEY (round_id, price)
+);
+CREATE INDEX IF NOT EXISTS idx_orders_price ON orders(price, outcome_index, round_id);
+"""
+
+
+def encode_cursor(sort_value, rid) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort_value, rid]).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        sort_value, rid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return sort_value, rid
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class RoundStore:
+    """Thread-safe SQLite store; writes come from the sync thread, reads from requests."""
+
+    def __init__(self, path: str = DASHBOARD_DB_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def upsert_rounds(self, rounds) -> int:
+        """Insert or replace rounds (group_rounds dicts) in one transaction."""
+        round_rows, order_rows, ids = [], [], []
+        for r in rounds:
+            orders = r.get('orders', [])
+            minutes = [o.get('time_to_matched') for o in orders if o.get('time_to_matched') is not None]
+            round_rows.append((
+                r['id'], r.get('start_time') or 0, 1 if r.get('is_win') else 0,
+                max((o.get('price') or 0 for o in orders), default=0),
+                min(minutes) if minutes else NO_FILL_MINUTE,
+                json.dumps(r, separators=(',', ':')),
+            ))
+            order_rows.extend((r['id'], o.get('price'), o.get('outcome_index'), o.get('time'),
+                               o.get('time_to_matched')) for o in orders if o.get('price') is not None)
+            ids.append((r['id'],))
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM orders WHERE round_id = ?", ids)
+            self._conn.executemany("INSERT OR REPLACE INTO rounds VALUES (?, ?, ?, ?, ?, ?)", round_rows)
+            self._conn.executemany("INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?)", order_rows)
+        return len(round_rows)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rounds").fetchone()[0]
+
+    def query(self, from_ts=None, to_ts=None, price=None, price_min=None, price_max=None,
+              outcome=None, is_win=None, minute_min=None, minute_max=None,
+              sort='start_time', descending=True, limit=DEFAULT_PAGE_SIZE, cursor=None) -> dict:
+        """One page of rounds matching the filters: {'items': [...], 'next_cursor': str | None}.
+
+        Time bounds apply to the round start (from inclusive, to exclusive). Price / outcome /
+        minute filters match rounds having at least one order that satisfies all of them.
+        """
+        column = SORT_COLUMNS.get(sort)
+        if column is None:
+            raise ValueError(f"Unknown sort '{sort}'. Available: {', '.join(SORT_COLUMNS)}")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        if price is not None:
+            price_min = price_max = price
+
+        where, params = [], []
+        if from_ts is not None:
+            where.append("r.start_time >= ?")
+            params.append(int(from_ts))
+        if to_ts is not None:
+            where.append("r.start_time < ?")
+            params.append(int(to_ts))
+        if is_win is not None:
+            where.append("r.is_win = ?")
+            params.append(1 if is_win else 0)
+        order_where, order_params = [], []
+        if price_min is not None:
+            order_where.append("o.price >= ?")
+            order_params.append(int(price_min))
+        if price_max is not None:
+            order_where.append("o.price <= ?")
+            order_params.append(int(price_max))
+        if outcome is not None:
+            order_where.append("o.outcome_index = ?")
+            order_params.append(int(outcome))
+        if minute_min is not None:
+            order_where.append("o.time_to_matched >= ?")
+            order_params.append(int(minute_min))
+        if minute_max is not None:
+            order_where.append("o.time_to_matched < ?")
+            order_params.append(int(minute_max))
+        if order_where:
+            where.append("EXISTS (SELECT 1 FROM orders o WHERE o.round_id = r.id AND "
+                         + " AND ".join(order_where) + ")")
+            params.extend(order_params)
+        if cursor:
+            sort_value, rid = decode_cursor(cursor)
+            op = '<' if descending else '>'
+            where.append(f"(r.{column} {op} ? OR (r.{column} = ? AND r.id {op} ?))")
+            params.extend([sort_value, sort_value, rid])
+
+        direction = 'DESC' if descending else 'ASC'
+        sql = (f"SELECT r.{column}, r.id, r.data FROM rounds r"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + f" ORDER BY r.{column} {direction}, r.id {direction} LIMIT ?")
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'items': [json.loads(row[2]) for row in rows],
+            'next_cursor': encode_cursor(rows[-1][0], rows[-1][1]) if has_more else None,
+        }
@@ -0,0 +1,264 @@
+"""
+Precomputed analysis cube over grouped rounds.
+
+Each cell is keyed by (price_cents, minute_to_match, outcome_index, hour, weekday)
+and holds [rounds, win_rounds]. Hour/weekday come from the round start time in
+CUBE_TZ. Rounds are added incrementally, and any price range or time-frame boundary
+is answered by summing cached cells instead of rescanning rounds. Reports cover
+arbitrary ranges, so re-adding a round only widens it: its orders are merged (latest
+fill per price) and a WIN sticks. A range that cuts a round, or ends before its redeem,
+can't degrade the entry an earlier, wider report stored.
+
+Usage (query the cached cube without re-fetching):
+    python export_data/analysis_cube.py --prices 1-10 --frames 0,2,4,6,8,12
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from datetime import datetime
+
+# Ensure project root (parent directory) is on sys.path for 'utils'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from utils.common import r2, get_zone, file_lock, GMT7_TZ  # noqa: E402
+
+CUBE_PATH = os.path.join(CURRENT_DIR, 'analysis_cube.json')
+CUBE_TZ = GMT7_TZ
+CUBE_VERSION = 1
+# Serializes load-merge-save of the cube file between concurrent report jobs; the file
+# lock next to the cube does the same for reports in other processes (daemon + CLI)
+_update_lock = threading.Lock()
+
+
+class AnalysisCube:
+    """Sparse price x minute x outcome x hour x weekday counters with cached rollups."""
+
+    def __init__(self, tz: str = CUBE_TZ):
+        self.tz = tz
+        self._zone = get_zone(tz)
+        # price -> {(minute, outcome, hour, weekday): [rounds, wins]}
+        self.cells = {}
+        # round id -> (list of cell keys, is_win)
+        self.rounds = {}
+        self._rollups = {}
+
+    # --- building ---
+    def _round_keys(self, round_obj):
+        start = round_obj.get('start_time')
+        if start is not None:
+            dt = datetime.fromtimestamp(start, tz=self._zone)
+            hour, weekday = dt.hour, dt.weekday()
+        else:
+            hour, weekday = None, None
+        keys = []
+        for o in round_obj.get('orders', []):
+            price = o.get('price')
+            if price is None:
+                continue
+            keys.append((price, o.get('time_to_matched'), o.get('outcome_index'), hour, weekday))
+        return keys
+
+    @staticmethod
+    def _merge_keys(old_keys, new_keys):
+        # Prices are unique within a round; like group_rounds, the latest fill per price wins
+        by_price = {k[0]: k for k in old_keys}
+        for k in new_keys:
+            old = by_price.get(k[0])
+            if old is None or (k[1] is not None and (old[1] is None or k[1] > old[1])):
+                by_price[k[0]] = k
+        return [by_price[p] for p in sorted(by_price, reverse=True)]
+
+    def _apply(self, keys, is_win, sign):
+        for price, minute, outcome, hour, weekday in keys:
+            by_price = self.cells.setdefault(price, {})
+            sub = (minute, outcome, hour, weekday)
+            cell = by_price.get(sub)
+            if cell is None:
+                cell = by_price[sub] = [0, 0]
+            cell[0] += sign
+            if is_win:
+                cell[1] += sign
+            if cell[0] == 0:
+                del by_price[sub]
+                if not by_price:
+                    del self.cells[price]
+
+    def add_round(self, round_obj) -> bool:
+        """Add one round, or widen the stored one with it. Returns True if the cube changed."""
+        rid = round_obj.get('id')
+        if not rid:
+            return False
+        keys = self._round_keys(round_obj)
+        is_win = bool(round_obj.get('is_win'))
+        previous = self.rounds.get(rid)
+        if previous is not None:
+            keys = self._merge_keys(previous[0], keys)
+            is_win = is_win or previous[1]
+            if previous[0] == keys and previous[1] == is_win:
+                return False
+            self._apply(previous[0], previous[1], -1)
+        self._apply(keys, is_win, 1)
+        self.rounds[rid] = (keys, is_win)
+        self._rollups.clear()
+        return True
+
+    def add_rounds(self, rounds) -> int:
+        """Add many rounds; returns number of rounds that changed the cube."""
+        return sum(1 for r in rounds if self.add_round(r))
+
+    # --- querying ---
+    def query(self, price_min=None, price_max=None, minute_min=None, minute_max=None,
+              outcome=None, hours=None, weekdays=None) -> tuple[int, int]:
+        """Return (rounds, win_rounds) summed over matching cells.
+
+        Bounds: price_min/price_max inclusive, minute_min inclusive, minute_max exclusive.
+        Passing any minute bound excludes orders without a time_to_matched.
+        Counts are (round, price) pairs, so a multi-price range counts a round once per price hit.
+        """
+        hours_key = tuple(sorted(hours)) if hours is not None else None
+        weekdays_key = tuple(sorted(weekdays)) if weekdays is not None else None
+        cache_key = (price_min, price_max, minute_min, minute_max, outcome, hours_key, weekdays_key)
+        cached = self._rollups.get(cache_key)
+        if cached is not None:
+            return cached
+
+        check_minute = minute_min is not None or minute_max is not None
+        total = wins = 0
+        for price, by_price in self.cells.items():
+            if price_min is not None and price < price_min:
+                continue
+            if price_max is not None and price > price_max:
+                continue
+            for (minute, out, hour, weekday), (n, w) in by_price.items():
+                if check_minute:
+                    if minute is None:
+                        continue
+                    if minute_min is not None and minute < minute_min:
+                        continue
+                    if minute_max is not None and minute >= minute_max:
+                        continue
+                if outcome is not None and out != outcome:
+                    continue
+                if hours_key is not None and hour not in hours_key:
+                    continue
+                if weekdays_key is not None and weekday not in weekdays_key:
+                    continue
+                total += n
+                wins += w
+        result = (total, wins)
+        self._rollups[cache_key] = result
+        return result
+
+    def query_price(self, price, minute_min=None, minute_max=None, **filters) -> tuple[int, int]:
+        """Shortcut for a single price in cents."""
+        return self.query(price, price, minute_min, minute_max, **filters)
+
+    def prices(self) -> list[int]:
+        return sorted(self.cells, reverse=True)
+
+    # --- persistence ---
+    def to_dict(self) -> dict:
+        return {
+            'version': CUBE_VERSION,
+            'tz': self.tz,
+            'rounds': {rid: {'keys': [list(k) for k in keys], 'win': win}
+                       for rid, (keys, win) in self.rounds.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'AnalysisCube':
+        cube = cls(tz=data.get('tz', CUBE_TZ))
+        if data.get('version') != CUBE_VERSION:
+            return cube
+        for rid, entry in data.get('rounds', {}).items():
+            keys = [tuple(k) for k in entry.get('keys', [])]
+            win = bool(entry.get('win'))
+            cube._apply(keys, win, 1)
+            cube.rounds[rid] = (keys, win)
+        return cube
+
+    def save(self, path: str = CUBE_PATH):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+
+def load_cube(path: str = CUBE_PATH) -> AnalysisCube:
+    """Load the cached cube from disk, or return an empty one."""
+    if os.path.isfile(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return AnalysisCube.from_dict(json.load(f))
+        except Exception as e:
+            print(f"Warning: could not load analysis cube: {e}")
+    return AnalysisCube()
+
+
+def update_cube(rounds, path: str = CUBE_PATH) -> AnalysisCube:
+    """Incrementally merge new/changed rounds into the cached cube and persist it."""
+    with _update_lock, file_lock(f"{path}.lock"):
+        cube = load_cube(path)
+        changed = cube.add_rounds(rounds)
+        if changed:
+            try:
+                cube.save(path)
+            except Exception as e:
+                print(f"Warning: could not save analysis cube: {e}")
+    return cube
+
+
+def parse_price_range(text: str) -> list[int]:
+    # "1-10" -> [10..1], "5,4,3" -> [5,4,3]
+    if '-' in text:
+        lo, hi = (int(x) for x in text.split('-', 1))
+        return list(range(max(lo, hi), min(lo, hi) - 1, -1))
+    return [int(x) for x in text.split(',') if x.strip()]
+
+
+def parse_frames(text: str) -> list[dict]:
+    # "0,4,6,8,12" -> [{'name': '0-4', 'min': 0, 'max': 4}, ...]
+    bounds = [int(x) for x in text.split(',') if x.strip()]
+    return [{'name': f"{a}-{b}", 'min': a, 'max': b} for a, b in zip(bounds, bounds[1:])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the cached analysis cube.')
+    parser.add_argument('--prices', default='5-1', help='Price cents, e.g. 1-10 or 5,4,3')
+    parser.add_argument('--frames', default='0,4,6,8,12', help='Minute frame boundaries, e.g. 0,2,4,8')
+    parser.add_argument('--outcome', type=int, default=None, help='Outcome index (0=Up, 1=Down)')
+    parser.add_argument('--hours', default=None, help='Comma separated hours of day in GMT+7')
+    parser.add_argument('--weekdays', default=None, help='Comma separated weekdays (0=Mon)')
+    args = parser.parse_args()
+
+    cube = load_cube()
+    if not cube.rounds:
+        print(f"Analysis cube is empty ({CUBE_PATH}); run fill_template.py first.")
+        return
+    filters = {'outcome': args.outcome}
+    if args.hours:
+        filters['hours'] = [int(x) for x in args.hours.split(',')]
+    if args.weekdays:
+        filters['weekdays'] = [int(x) for x in args.weekdays.split(',')]
+    frames = parse_frames(args.frames)
+
+    print(f"Cached rounds: {len(cube.rounds)}")
+    header = ['price', 'rounds', 'wins', 'rate'] + [f"{f['name']}m" for f in frames]
+    print('\t'.join(header))
+    for price in parse_price_range(args.prices):
+        n, w = cube.query_price(price, **filters)
+        row = [price, n, w, r2(w / n) if n else 0]
+        for f in frames:
+            fn, fw = cube.query_price(price, f['min'], f['max'], **filters)
+            row.append(f"{fn}/{fw}")
+        print('\t'.join(str(x) for x in row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""
+Vectorized ladder backtester over historical rounds.
+
+Historical rounds (group_rounds output) record, per outcome, which price levels of
+our past ladders matched and at which minute after the round start. A buy at p
+fills once the ask trades down to p, so a fill at p by minute m means every price
+>= p was touched by minute m too. That gives a first-touch matrix
+
+    touch[round, outcome, price_cent] = first minute the price was reached (inf = never)
+
+which is all a ladder evaluation needs. Levels above the highest price we ever
+quoted are only known to be touched when a lower level filled, so results for
+high ladders (e.g. 25c) are a lower bound on fills.
+
+A ladder (prices in cents, sizes in shares, cancel minutes) is evaluated on every
+round at once with NumPy: fills before the cancel time, OCO (the first side to fill
+cancels the other; a same-minute tie keeps both), payout 1 USDC per winning share,
+and optionally a take-profit sell at `take_profit` x entry. Without intra-round
+price series a take-profit is only assumed to fill on rounds that resolve in its
+favour.
+
+Usage:
+    python export_data/backtest.py --from-ts 1756684800 --to-ts 1759276800
+    python export_data/backtest.py --prices 10,7,5 --sizes 30,30,40 --cancel 10
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import NamedTuple
+
+import numpy as np
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from utils.common import r2, to_gmt7_datetime  # noqa: E402
+
+ROUNDS_CACHE_PATH = os.path.join(CURRENT_DIR, 'backtest_rounds.npz')
+PRICE_LEVELS = 101  # cents 0..100
+ROUND_SECONDS = 15 * 60
+OUTCOMES = 2
+
+
+class RoundArrays(NamedTuple):
+    start: np.ndarray    # int64[n] round start (unix seconds), ascending
+    winner: np.ndarray   # int8[n] winning outcome index, -1 if unknown (round never traded)
+    touch: np.ndarray    # float32[n, 2, 101] first-touch minute per outcome/price, inf if never
+
+
+def build_round_arrays(grouped_rounds, from_ts=None, to_ts=None) -> tuple[RoundArrays, int]:
+    """Build the first-touch arrays from group_rounds output (dicts or Round records).
+
+    group_rounds only holds rounds we traded, so when from_ts/to_ts are given every other
+    ROUND_SECONDS slot in the range is added as an untouched round (winner -1). Rounds
+    whose winner can't be inferred (fills without timing, or fills on both sides) are
+    dropped, and their slots are not padded back in; returns (arrays, dropped_count).
+    """
+    kept = []
+    dropped = 0
+    dropped_starts = set()
+    for r in grouped_rounds:
+        fills = [(o.get('outcome_index'), o.get('price'), o.get('time_to_matched')) for o in r.get('orders', [])]
+        fills = [f for f in fills if f[0] in (0, 1) and f[1] is not None and f[2] is not None
+                 and 0 <= f[1] < PRICE_LEVELS]
+        sides = {f[0] for f in fills}
+        if len(sides) != 1 or r.get('start_time') is None:
+            dropped += 1
+            if r.get('start_time') is not None:
+                dropped_starts.add(r['start_time'])
+            continue
+        side = sides.pop()
+        kept.append((r['start_time'], side if r.get('is_win') else 1 - side, fills))
+    if from_ts is not None and to_ts is not None:
+        traded = {k[0] for k in kept} | dropped_starts
+        first_slot = -(-int(from_ts) // ROUND_SECONDS) * ROUND_SECONDS
+        kept.extend((t, -1, []) for t in range(first_slot, int(to_ts), ROUND_SECONDS) if t not in traded)
+    kept.sort(key=lambda k: k[0])
+
+    n = len(kept)
+    start = np.array([k[0] for k in kept], dtype=np.int64)
+    winner = np.array([k[1] for k in kept], dtype=np.int8)
+    r_idx, o_idx, p_idx, minutes = [], [], [], []
+    for i, (_, _, fills) in enumerate(kept):
+        for outcome, price, minute in fills:
+            r_idx.append(i)
+            o_idx.append(outcome)
+            p_idx.append(price)
+            minutes.append(minute)
+    touch = np.full((n, OUTCOMES, PRICE_LEVELS), np.inf, dtype=np.float32)
+    if minutes:
+        np.minimum.at(touch, (np.array(r_idx), np.array(o_idx), np.array(p_idx)),
+                      np.array(minutes, dtype=np.float32))
+    # Reaching p means every higher price was reached no later
+    np.minimum.accumulate(touch, axis=2, out=touch)
+    return RoundArrays(start, winner, touch), dropped
+
+
+def save_round_arrays(arrays: RoundArrays, path: str = ROUNDS_CACHE_PATH):
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, start=arrays.start, winner=arrays.winner, touch=arrays.touch)
+    os.replace(tmp_path, path)
+
+
+def load_round_arrays(path: str = ROUNDS_CACHE_PATH) -> RoundArrays | None:
+    if not os.path.isfile(path):
+        return None
+    with np.load(path) as data:
+        return RoundArrays(data['start'], data['winner'], data['touch'])
+
+
+def fetch_round_arrays(from_ts, to_ts, address=None) -> RoundArrays:
+    """Fetch and group rounds for a range, then build (and cache) their arrays."""
+    from export_data import fill_template
+
+    data = fill_template.get_data(from_ts, to_ts, address, compact=True) or []
+    arrays, dropped = build_round_arrays(fill_template.group_rounds(data, compact=True), from_ts, to_ts)
+    print(f"Rounds: {len(arrays.start)} usable, {dropped} skipped (untimed fills or both sides)")
+    save_round_arrays(arrays)
+    return arrays
+
+
+def ladder_from_specs(price_start, price_step, size_start, size_step, num_orders) -> tuple[np.ndarray, np.ndarray]:
+    """Ladder arrays (price cents, sizes) from order_specs_generator-style parameters."""
+    prices = [int(round((price_start + price_step * i) * 100)) for i in range(num_orders)]
+    sizes = [size_start + size_step * i for i in range(num_orders)]
+    return np.array(prices, dtype=np.intp), np.array(sizes, dtype=np.float64)
+
+
+def strategy_ladder(name=None) -> tuple[np.ndarray, np.ndarray, float, float | None]:
+    """(prices cents, sizes, cancel minutes, take-profit) of a strategy registered in order_specs_generator."""
+    from order_specs_generator import get_strategy
+    strat = get_strategy(name)
+    prices = np.array([int(round(p * 100)) for p in strat['prices']], dtype=np.intp)
+    return prices, np.array(strat['sizes'], dtype=np.float64), strat['cancel_minutes'], strat['take_profit']
+
+
+def simulate_ladder(arrays: RoundArrays, prices, sizes, cancel_minutes, take_profit=None, oco=True):
+    """Per-round (cost, payout) arrays for one ladder across all rounds."""
+    prices = np.asarray(prices, dtype=np.intp)
+    sizes = np.asarray(sizes, dtype=np.float64)
+    fill_time = arrays.touch[:, :, prices]                    # (n, 2, k)
+    filled = fill_time < cancel_minutes
+    if oco:
+        first = np.where(filled, fill_time, np.inf).min(axis=2)   # (n, 2)
+        active = first <= first[:, ::-1]
+        filled &= active[:, :, None]
+    entry = prices / 100.0
+    shares = filled * sizes                                      # (n, 2, k)
+    cost = (shares * entry).sum(axis=(1, 2))
+    won = arrays.winner[:, None] == np.arange(OUTCOMES)          # (n, 2)
+    exit_price = np.minimum(entry * take_profit, 1.0) if take_profit else np.ones_like(entry)
+    payout = (shares * exit_price * won[:, :, None]).sum(axis=(1, 2))
+    return cost, payout
+
+
+def evaluate_ladder(arrays: RoundArrays, prices, sizes, cancel_minutes, take_profit=None, oco=True) -> dict:
+    """EV, hit rate, win rate, PnL and max drawdown of one ladder over all rounds."""
+    cost, payout = simulate_ladder(arrays, prices, sizes, cancel_minutes, take_profit, oco)
+    return summarize(cost, payout)
+
+
+def summarize(cost, payout) -> dict:
+    pnl = payout - cost
+    n = len(pnl)
+    traded = cost > 0
+    trades = int(traded.sum())
+    wins = int((traded & (payout > 0)).sum())
+    equity = np.cumsum(pnl)
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0)) if n else equity
+    total_cost = float(cost.sum())
+    total_pnl = float(pnl.sum())
+    return {
+        'rounds': n,
+        'trades': trades,
+        'hit_rate': r2(trades / n, 4) if n else 0,
+        'wins': wins,
+        'win_rate': r2(wins / trades, 4) if trades else 0,
+        'cost': r2(total_cost),
+        'payout': r2(float(payout.sum())),
+        'pnl': r2(total_pnl),
+        'ev_per_round': r2(total_pnl / n, 4) if n else 0,
+        'ev_per_trade': r2(total_pnl / trades, 4) if trades else 0,
+        'roi': r2(total_pnl / total_cost, 4) if total_cost else 0,
+        'max_drawdown': r2(float((peak - equity).max())) if n else 0,
+    }
+
+
+def _parse_list(text, cast):
+    return [cast(x) for x in text.split(',') if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest an order ladder over historical rounds.')
+    parser.add_argument('--from-ts', type=int, default=None, help='Fetch rounds from this time (unix seconds); otherwise use the cache')
+    parser.add_argument('--to-ts', type=int, default=None, help='Fetch range end, exclusive (default now)')
+    parser.add_argument('--strategy', default=None, help='Strategy from order_specs_generator (linear, cong, thu); default DEFAULT_STRATEGY')
+    parser.add_argument('--prices', default=None, help='Ladder prices in cents, e.g. 10,7,5 (overrides the strategy)')
+    parser.add_argument('--sizes', default=None, help='Sizes in shares per price, e.g. 30,30,40')
+    parser.add_argument('--cancel', type=float, default=None, help='Cancel minutes after round start')
+    parser.add_argument('--take-profit', type=float, default=None, help='Sell at this multiple of entry, e.g. 2 (0 = hold)')
+    parser.add_argument('--no-oco', action='store_true', help='Keep both sides open after a fill')
+    args = parser.parse_args()
+
+    if args.from_ts is not None:
+        arrays = fetch_round_arrays(args.from_ts, args.to_ts or int(time.time()))
+    else:
+        arrays = load_round_arrays()
+        if arrays is None:
+            print(f"No cached rounds at {ROUNDS_CACHE_PATH}; pass --from-ts/--to-ts to fetch.")
+            return
+    if not len(arrays.start):
+        print("No usable rounds.")
+        return
+
+    prices, sizes, cancel, take_profit = strategy_ladder(args.strategy)
+    if args.prices:
+        prices = np.array(_parse_list(args.prices, int), dtype=np.intp)
+        sizes = np.array(_parse_list(args.sizes, float), dtype=np.float64) if args.sizes else np.full(len(prices), sizes[0])
+    if len(sizes) != len(prices):
+        print("--sizes must have one entry per price.")
+        return
+    if args.cancel is not None:
+        cancel = args.cancel
+    if args.take_profit is not None:
+        take_profit = args.take_profit or None
+
+    print(f"Rounds {to_gmt7_datetime(int(arrays.start[0]))} .. {to_gmt7_datetime(int(arrays.start[-1]))} [GMT+7]")
+    print(f"Ladder: prices {prices.tolist()} sizes {sizes.tolist()} cancel {cancel}m"
+          f"{f' take-profit x{take_profit}' if take_profit else ''}{' no-OCO' if args.no_oco else ''}")
+    result = evaluate_ladder(arrays, prices, sizes, cancel, take_profit, not args.no_oco)
+    for key, value in result.items():
+        print(f"{key:>13}: {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark the normal vs streaming (write-only) Excel export.
+
+Generates synthetic grouped rounds and reports wall time and peak traced
+memory (measured in a separate tracemalloc run) for each fill_excel mode.
+
+Usage:
+    python export_data/benchmark_excel.py --rows 100000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from export_data import fill_template  # noqa: E402
+
+
+def make_rounds(total_rows: int, orders_per_round: int = 3) -> list[dict]:
+    """Synthetic rounds shaped like group_rounds output."""
+    start = int(fill_template.FROM_TIME)
+    rounds = []
+    rows = 0
+    i = 0
+    while rows < total_rows:
+        round_start = start + i * 900
+        n = min(orders_per_round, total_rows - rows)
+        orders = []
+        for k in range(n):
+            t = round_start + random.randint(0, 720)
+            orders.append({'price': 5 - k, 'time': t, 'outcome_index': k % 2,
+                           'time_to_matched': (t - round_start) // 60})
+        rounds.append({
+            'id': f"0x{i:064x}",
+            'title': f"Bitcoin Up or Down - round {i}",
+            'slug': f"btc-up-or-down-15m-{round_start}",
+            'is_win': random.random() < 0.1,
+            'start_time': round_start,
+            'orders': orders,
+        })
+        rows += n
+        i += 1
+    return rounds
+
+
+def run(data, streaming: bool, out_dir: str) -> tuple[float, float, int]:
+    """Wall time from an untraced run, peak memory from a second run under tracemalloc."""
+    out_path = os.path.join(out_dir, f"bench_{'stream' if streaming else 'normal'}.xlsx")
+    t0 = time.perf_counter()
+    fill_template.fill_excel(data, streaming=streaming, output_path=out_path)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fill_template.fill_excel(data, streaming=streaming, output_path=out_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024), os.path.getsize(out_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fill_excel normal vs streaming modes.')
+    parser.add_argument('--rows', type=int, default=100000, help='Number of order rows in the Data sheet')
+    parser.add_argument('--mode', choices=['both', 'normal', 'streaming'], default='both')
+    args = parser.parse_args()
+
+    random.seed(42)
+    data = make_rounds(args.rows)
+    print(f"Rounds: {len(data)}  order rows: {args.rows}")
+    with tempfile.TemporaryDirectory() as out_dir:
+        # Don't let the benchmark overwrite the real last_report.json
+        fill_template.REPORT_META_PATH = os.path.join(out_dir, 'last_report.json')
+        modes = [False, True] if args.mode == 'both' else [args.mode == 'streaming']
+        for streaming in modes:
+            elapsed, peak_mb, size = run(data, streaming, out_dir)
+            label = 'streaming' if streaming else 'normal'
+            print(f"{label:>9}: {elapsed:7.2f}s  peak {peak_mb:8.1f} MiB  file {size / 1024:8.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark memory of raw activity dicts vs compact slotted records.
+
+Builds a synthetic multi-month activity history shaped like the Data API
+response (JSON-decoded, so every dict owns its strings), then measures the
+memory retained by the activities plus the grouped rounds after merge_positions
+and group_rounds, once with dicts and once with Activity/Round/RoundOrder records.
+
+Usage:
+    python export_data/benchmark_records.py --months 3
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from export_data import fill_template  # noqa: E402
+from export_data.records import to_activities  # noqa: E402
+
+ROUND_SECONDS = 900
+
+
+def make_payload(months: int, trades_per_round: int = 4) -> tuple[str, list[dict]]:
+    """JSON text of TRADE activities (one 15m round after another) plus redeemable positions."""
+    start = int(fill_template.FROM_TIME)
+    total_rounds = months * 30 * 24 * 3600 // ROUND_SECONDS
+    activities = []
+    positions = []
+    for i in range(total_rounds):
+        round_start = start + i * ROUND_SECONDS
+        cid = f"0x{random.getrandbits(256):064x}"
+        title = f"Bitcoin Up or Down - round {i}"
+        slug = f"btc-updown-15m-{round_start}"
+        outcome_index = i % 2
+        for k in range(trades_per_round):
+            price = (5 - k % 5) / 100
+            size = 10.0 + k
+            activities.append({
+                'proxyWallet': '0x' + 'ab' * 20,
+                'timestamp': round_start + random.randint(0, 840),
+                'conditionId': cid,
+                'type': 'TRADE',
+                'size': size,
+                'usdcSize': round(size * price, 6),
+                'transactionHash': f"0x{random.getrandbits(256):064x}",
+                'price': price,
+                'asset': str(random.getrandbits(250)),
+                'side': 'BUY',
+                'outcomeIndex': outcome_index,
+                'title': title,
+                'slug': slug,
+                'icon': 'https://polymarket-upload.s3.us-east-2.amazonaws.com/BTC+fullsize.png',
+                'eventSlug': slug,
+                'outcome': 'Up' if outcome_index == 0 else 'Down',
+                'name': 'trader',
+                'pseudonym': 'Synthetic-Trader',
+                'bio': '',
+                'profileImage': '',
+                'profileImageOptimized': '',
+            })
+        if random.random() < 0.1:
+            positions.append({'conditionId': cid, 'redeemable': True, 'totalBought': 40.0,
+                              'avgPrice': 0.04, 'cashPnl': 360.0, 'percentPnl': 900.0})
+    return json.dumps(activities), positions
+
+
+def run(payload: str, positions: list[dict], compact: bool) -> tuple[float, float, float, int]:
+    """Returns (seconds, retained MiB, peak MiB, rounds) for one decode-merge-group pass."""
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    activities = json.loads(payload)
+    if compact:
+        activities = to_activities(activities)
+    fill_template.merge_positions(activities, [], positions)
+    rounds = fill_template.group_rounds(activities, compact=compact)
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current / (1024 * 1024), peak / (1024 * 1024), len(rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dict vs slotted record memory.')
+    parser.add_argument('--months', type=int, default=3, help='Months of 15m rounds to synthesize')
+    args = parser.parse_args()
+
+    random.seed(42)
+    payload, positions = make_payload(args.months)
+    print(f"Months: {args.months}  payload: {len(payload) / (1024 * 1024):.1f} MiB JSON")
+    for compact in (False, True):
+        elapsed, retained, peak, rounds = run(payload, positions, compact)
+        label = 'records' if compact else 'dicts'
+        print(f"{label:>7}: {elapsed:6.2f}s  retained {retained:7.1f} MiB  peak {peak:7.1f} MiB  rounds {rounds}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Columnar exporters for the reporting pipeline (alongside the Excel report).
+
+Each format writes two files next to each other:
+    <base>.rounds.<ext>      one row per (round, order), same shape as the Excel Data sheet
+    <base>.activities.<ext>  raw TRADE activities with the fields the analysis uses
+
+Rows are streamed to disk in chunks of CHUNK_ROWS so memory stays bounded.
+Parquet needs pyarrow (optional); CSV and JSONL only use the standard library.
+"""
+
+import csv
+import json
+from itertools import islice
+
+CHUNK_ROWS = 10000
+
+# (column, type) - types are used for the Parquet schema
+ROUND_FIELDS = [
+    ('round_index', 'int64'), ('id', 'string'), ('title', 'string'), ('slug', 'string'),
+    ('is_win', 'bool'), ('start_time', 'int64'), ('price', 'int64'), ('time', 'int64'),
+    ('time_to_matched', 'int64'), ('outcome_index', 'int64'),
+]
+
+ACTIVITY_FIELDS = [
+    ('timestamp', 'int64'), ('conditionId', 'string'), ('type', 'string'), ('side', 'string'),
+    ('price', 'float64'), ('size', 'float64'), ('usdcSize', 'float64'), ('outcomeIndex', 'int64'),
+    ('outcome', 'string'), ('asset', 'string'), ('title', 'string'), ('slug', 'string'),
+    ('transactionHash', 'string'), ('is_win', 'bool'), ('totalBought', 'float64'),
+    ('avgPrice', 'float64'), ('cashPnl', 'float64'), ('percentPnl', 'float64'),
+]
+ROUND_COLUMNS = [name for name, _ in ROUND_FIELDS]
+ACTIVITY_COLUMNS = [name for name, _ in ACTIVITY_FIELDS]
+_IS_WIN_COL = ACTIVITY_COLUMNS.index('is_win')
+
+
+def iter_round_rows(grouped_data):
+    """Yield one flat row per order of each round."""
+    for idx, r in enumerate(grouped_data, 1):
+        for o in r.get('orders', []) or [{}]:
+            yield (
+                idx, r.get('id'), r.get('title'), r.get('slug'), bool(r.get('is_win')),
+                r.get('start_time'), o.get('price'), o.get('time'),
+                o.get('time_to_matched'), o.get('outcome_index'),
+            )
+
+
+def iter_activity_rows(activities):
+    for a in activities:
+        row = [a.get(c) for c in ACTIVITY_COLUMNS]
+        # is_win is only set on winning trades upstream; make the column a clean bool
+        row[_IS_WIN_COL] = bool(row[_IS_WIN_COL])
+        yield row
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_csv(path, fields, rows, chunk_rows=CHUNK_ROWS):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([name for name, _ in fields])
+        for chunk in _chunks(rows, chunk_rows):
+            writer.writerows(chunk)
+
+
+def write_jsonl(path, fields, rows, chunk_rows=CHUNK_ROWS):
+    columns = [name for name, _ in fields]
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in _chunks(rows, chunk_rows):
+            f.write(''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in chunk))
+
+
+def write_parquet(path, fields, rows, chunk_rows=CHUNK_ROWS):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+    schema = pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in fields])
+    # One row group per chunk
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _chunks(rows, chunk_rows):
+            arrays = [pa.array(list(col), type=field.type) for col, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+# format -> (file extension, writer)
+EXPORTERS = {
+    'csv': ('csv', write_csv),
+    'jsonl': ('jsonl', write_jsonl),
+    'parquet': ('parquet', write_parquet),
+}
+
+
+def export_tabular(fmt, grouped_data, activities, base_path, chunk_rows=CHUNK_ROWS) -> list[str]:
+    """Write rounds and activities in `fmt`; returns the written file paths (rounds first)."""
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Unknown export format '{fmt}'. Available: {', '.join(sorted(EXPORTERS))}")
+    ext, writer = EXPORTERS[fmt]
+    rounds_path = f"{base_path}.rounds.{ext}"
+    activities_path = f"{base_path}.activities.{ext}"
+    writer(rounds_path, ROUND_FIELDS, iter_round_rows(grouped_data), chunk_rows)
+    writer(activities_path, ACTIVITY_FIELDS, iter_activity_rows(activities or []), chunk_rows)
+    return [rounds_path, activities_path]
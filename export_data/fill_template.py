@@ -1,16 +1,17 @@
 import re
-import requests
-import openpyxl
 from datetime import datetime, timezone
-from zoneinfo import ZoneInfo
 import json
 import os
 import sys
-from openpyxl.styles import PatternFill
+from copy import copy
 from dotenv import load_dotenv
 import time
 import argparse
 from datetime import timedelta
+from functools import lru_cache
+import threading
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
 
 # Ensure project root (parent directory) is on sys.path for 'utils'
 CURRENT_DIR = os.path.dirname(__file__)
@@ -18,7 +19,10 @@ PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from utils.common import r2, to_et_time, to_gmt7_date, to_gmt7_datetime, extract_time_part
+from utils.common import r2, to_et_time, to_gmt7_date, to_gmt7_datetime, extract_time_parts, get_zone, ET_TZ
+from export_data.analysis_cube import AnalysisCube, update_cube
+from export_data.exporters import EXPORTERS, export_tabular
+from export_data.records import Round, RoundOrder, to_activities
 
 load_dotenv()
 
@@ -26,6 +30,7 @@ load_dotenv()
 DATA_API_ACTIVITY_URL = "https://data-api.polymarket.com/activity"
 DATA_API_POSITION_URL = "https://data-api.polymarket.com/positions"
 TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "template.xlsx")
+REPORT_META_PATH = os.path.join(os.path.dirname(__file__), "last_report.json")
 POLYMARKET_ADDRESS = os.getenv("POLYMARKET_PROXY_ADDRESS")
 FROM_TIME='1758727800' # Sep 24, 2025, 10:30:00 PM GMT+7
 TO_TIME='1759251600'   # Oct 1, 2025, 12:00:00 AM GMT+7
@@ -63,6 +68,11 @@ ANALYSIS_COLUMNS = [
     {'type': 'win_time_frame', 'frame_index': 2, 'property': 'win_rate'},
     {'type': 'win_time_frame', 'frame_index': 2, 'property': 'ev_value'},
     ]
+# Data sheets with at least this many order rows are written in write-only (streaming) mode
+STREAMING_MIN_ROWS = 20000
+WIN_COLOR = "C6EFCE"
+LOSE_COLOR = "FFC7CE"
+
 limit = 500
 offset = 0 # max 10.000 for api: data-api.polymarket.com/positions / api data-api.polymarket.com/activity max 1.000
 all_activities = []
@@ -88,57 +98,42 @@ def get_analysis_data(grouped_data, from_time, to_time):
     win_rounds = [g for g in grouped_data if g.get('is_win')]
     total_win_rounds = len(win_rounds)
     win_trade_rate = r2(total_win_rounds / total_trades) if total_trades else 0
+    # Every price/frame statistic below is a sum over cube cells, not a rescan of rounds
+    cube = AnalysisCube()
+    cube.add_rounds(grouped_data)
     analysis_prices = []
     for price in PRICE_RANGE:
-        rounds_with_price = []
-        for round_obj in grouped_data:
-            # Check if any order in this round has this price
-            for order in round_obj.get('orders', []):
-                if order.get('price') == price:
-                    # Attach time_to_matched for this price in this round
-                    rounds_with_price.append({
-                        'is_win': round_obj.get('is_win'),
-                        'time_to_matched': order.get('time_to_matched')
-                    })
-                    break
-        
-        matched_rounds = len(rounds_with_price)
+        matched_rounds, price_win_rounds = cube.query_price(price)
         matched_rate = r2(matched_rounds / total_trades) if total_trades else 0
-        price_win_rounds = [r for r in rounds_with_price if r['is_win']]
-        win_rate = r2(len(price_win_rounds) / matched_rounds) if matched_rounds else 0
-        
+        win_rate = r2(price_win_rounds / matched_rounds) if matched_rounds else 0
+
         # Dynamic time frames
         time_frame_data = []
         win_time_frame_data = []
-        
+
         for tf_config in TIME_FRAMES:
             tf_min, tf_max = tf_config['min'], tf_config['max']
             tf_name = tf_config['name']
-            
-            # Filter rounds by time frame
-            tf_rounds = [r for r in rounds_with_price 
-                        if r['time_to_matched'] is not None and tf_min <= r['time_to_matched'] < tf_max]
-            win_tf_rounds = [r for r in price_win_rounds 
-                           if r['time_to_matched'] is not None and tf_min <= r['time_to_matched'] < tf_max]
-            
+            tf_rounds, win_tf_rounds = cube.query_price(price, tf_min, tf_max)
+
             # Time frame stats
             time_frame_data.append({
                 'frame': tf_name,
-                'in_frame_rounds': len(tf_rounds),
-                'in_frame_rounds_rate': r2(len(tf_rounds)/matched_rounds) if matched_rounds else 0
+                'in_frame_rounds': tf_rounds,
+                'in_frame_rounds_rate': r2(tf_rounds/matched_rounds) if matched_rounds else 0
             })
-            
+
             # Win time frame stats
-            tf_win_rate = r2(len(win_tf_rounds)/len(tf_rounds)) if len(tf_rounds) else 0
+            tf_win_rate = r2(win_tf_rounds/tf_rounds) if tf_rounds else 0
             tf_ev = calculate_ev(tf_win_rate, price)
-            
+
             win_time_frame_data.append({
                 'frame': tf_name,
-                'win_in_frame_rounds': len(win_tf_rounds),
+                'win_in_frame_rounds': win_tf_rounds,
                 'win_rate': tf_win_rate,
                 'ev_value': tf_ev
             })
-        
+
         # Overall price EV
         ev = calculate_ev(win_rate, price)
 
@@ -146,7 +141,7 @@ def get_analysis_data(grouped_data, from_time, to_time):
             'price': price,
             'matched_rounds': matched_rounds,
             'matched_rate': matched_rate,
-            'win_rounds': len(price_win_rounds),
+            'win_rounds': price_win_rounds,
             'win_rate': win_rate,
             'ev_value': r2(ev),
             'time_frames': time_frame_data,
@@ -164,68 +159,123 @@ def get_analysis_data(grouped_data, from_time, to_time):
         'orders': grouped_data
     }
 
-def parse_start_time_from_title(title):
+# --- Round start time resolution ---
+# Slugs like "btc-up-or-down-15m-1758125700" end with the start epoch (UTC seconds)
+SLUG_EPOCH_RE = re.compile(r"-(\d{9,11})$")
+TITLE_START_RE = re.compile(r"- ([A-Za-z]+ \d+), (\d{1,2}:\d{2}[AP]M)-")
+ET_ZONE = get_zone(ET_TZ)
+# slug -> start timestamp from Gamma market metadata (eventStartTime), filled lazily
+MARKET_START_CACHE = {}
+
+
+def parse_start_time_from_slug(slug):
+    """Return the start epoch encoded at the end of a market slug, or None."""
+    if not slug:
+        return None
+    match = SLUG_EPOCH_RE.search(slug)
+    return int(match.group(1)) if match else None
+
+
+@lru_cache(maxsize=8192)
+def _parse_title_start(date_str, time_str, year):
+    try:
+        dt = datetime.strptime(f"{date_str} {year} {time_str}", "%B %d %Y %I:%M%p")
+        return int(dt.replace(tzinfo=ET_ZONE).timestamp())
+    except Exception:
+        return None
+
+
+def parse_start_time_from_title(title, ref_ts=None):
     # Example: "Bitcoin Up or Down - September 18, 00:00AM-00:15AM ET" or "Bitcoin Up or Down - September 8, 9:00AM-9:15AM ET"
-    # Extract date and start time
-    match = re.search(r"- ([A-Za-z]+ \d+), (\d{1,2}:\d{2}[AP]M)-", title)
+    # Titles carry no year: pick the year that puts the start closest to ref_ts (a trade time),
+    # so rounds around New Year don't land 12 months off.
+    match = TITLE_START_RE.search(title or '')
     if not match:
         return None
     date_str, time_str = match.groups()
-    # Assume year is current year
-    year = datetime.now().year
-    # Compose datetime string
-    dt_str = f"{date_str} {year} {time_str}"
-    # Example: "September 18 2025 00:00AM"
-    try:
-        dt = datetime.strptime(dt_str, "%B %d %Y %I:%M%p")
-        et = ZoneInfo('US/Eastern')
-        dt = dt.replace(tzinfo=et)
-        return int(dt.timestamp())
-    except Exception:
+    if ref_ts is None:
+        return _parse_title_start(date_str, time_str, datetime.now().year)
+    ref_year = datetime.fromtimestamp(ref_ts, tz=ET_ZONE).year
+    candidates = [_parse_title_start(date_str, time_str, y) for y in (ref_year, ref_year - 1, ref_year + 1)]
+    candidates = [c for c in candidates if c is not None]
+    return min(candidates, key=lambda c: abs(c - ref_ts)) if candidates else None
+
+
+def _start_time_from_market(slug):
+    """Fallback: eventStartTime from (cached) Gamma market metadata."""
+    if not slug:
         return None
+    if slug in MARKET_START_CACHE:
+        return MARKET_START_CACHE[slug]
+    start = None
+    try:
+        from find_market_by_slug import find_market_by_slug
+        market = find_market_by_slug(slug)
+        start_str = market.get('eventStartTime') or market.get('startDate')
+        if start_str:
+            start = int(datetime.fromisoformat(start_str.replace('Z', '+00:00')).timestamp())
+    except Exception as e:
+        print(f"Warning: could not resolve start time for {slug}: {e}")
+    MARKET_START_CACHE[slug] = start
+    return start
 
-def group_rounds(all_data):
+
+def resolve_start_time(slug, title, ref_ts=None):
+    """Resolve a round start: slug epoch, then memoized title parse, then market metadata."""
+    start = parse_start_time_from_slug(slug)
+    if start is None:
+        start = parse_start_time_from_title(title, ref_ts)
+    if start is None:
+        start = _start_time_from_market(slug)
+    return start
+
+
+def group_rounds(all_data, compact=False):
+    """Group trades (dicts or Activity records) into rounds keyed by conditionId.
+
+    compact=True builds Round/RoundOrder slotted records instead of dicts.
+    """
+    new_round = Round if compact else dict
+    new_order = RoundOrder if compact else dict
+    # Single pass: orders are kept unique by price (latest timestamp wins) while grouping
     rounds = {}
     for item in all_data:
         cid = item.get('conditionId')
         if not cid:
             continue
-        if cid not in rounds:
-            rounds[cid] = {
-                'id': cid,
-                'title': item.get('title', ''),
-                'is_win': item.get('is_win', False),
-                'slug': item.get('slug', ''),
-                'orders': []
-            }
+        r = rounds.get(cid)
+        if r is None:
+            r = rounds[cid] = new_round(
+                id=cid,
+                title=item.get('title', ''),
+                is_win=item.get('is_win', False),
+                slug=item.get('slug', ''),
+                orders={}
+            )
         # Always update is_win if any item in round is win
         if item.get('is_win'):
-            rounds[cid]['is_win'] = True
-        # Add order info
-        order = {
-            'price': int(round(item.get('price') * 100)),
-            'time': item.get('timestamp')
-        }
-        rounds[cid]['orders'].append(order)
+            r['is_win'] = True
+        price = int(round(item.get('price') * 100))
+        t = item.get('timestamp')
+        prev = r['orders'].get(price)
+        if prev is None or (t is not None and (prev['time'] is None or t > prev['time'])):
+            r['orders'][price] = new_order(
+                price=price,
+                time=t,
+                outcome_index=item.get('outcomeIndex')
+            )
 
-    # Post-process each round: unique orders by price, keep latest timestamp
     for r in rounds.values():
-        price_map = {}
-        for o in r['orders']:
-            p = o['price']
-            t = o['time']
-            if p not in price_map or (t is not None and t > price_map[p]['time']):
-                price_map[p] = o
-        # Now, price_map.values() are unique by price, latest timestamp
-        r['orders'] = list(price_map.values())
-        # Sort orders by price descending
-        r['orders'].sort(key=lambda x: (-x['price'], x['time'] if x['time'] is not None else 0))
-        # Parse start_time from title
-        r['start_time'] = parse_start_time_from_title(r['title'])
+        price_map = r['orders']
+        # Orders by price descending (prices are unique within a round)
+        r['orders'] = [price_map[p] for p in sorted(price_map, reverse=True)]
+        ref_ts = next((o['time'] for o in r['orders'] if o['time'] is not None), None)
+        start = resolve_start_time(r['slug'], r['title'], ref_ts)
+        r['start_time'] = start
         # Add time_to_matched for each order
         for o in r['orders']:
-            if r['start_time'] is not None and o['time'] is not None:
-                o['time_to_matched'] = int((o['time'] - r['start_time']) / 60)
+            if start is not None and o['time'] is not None:
+                o['time_to_matched'] = int((o['time'] - start) / 60)
             else:
                 o['time_to_matched'] = None
     # Return as list
@@ -233,93 +283,171 @@ def group_rounds(all_data):
 
 # --- Get data from API or mock file ---
 
-def get_data():
-    all_data = []
-    redeemed_orders = []
-    try:
-        start_time = int(FROM_TIME)
-        now_time = int(TO_TIME) if TO_TIME != "" else int(datetime.now(timezone.utc).timestamp())
-        three_hours = 3 * 60 * 60
-        while start_time < now_time:
-            end_time = min(start_time + three_hours, now_time)
-            params = {
-                'user': POLYMARKET_ADDRESS,
-                'start': start_time,
-                'end': end_time,
-                'limit': 500,
-            }
-            try:
-                resp = requests.get(DATA_API_ACTIVITY_URL, params=params, timeout=10)
-                resp.raise_for_status()
-                batch = resp.json()
-                if isinstance(batch, list):
-                    # Filter and split by type
-                    for item in batch:
-                        if item.get('type') == 'TRADE':
-                            all_data.append(item)
-                        elif item.get('type') == 'REDEEM':
-                            redeemed_orders.append(item)
-            except Exception as e:
-                print(f"Warning: API error for window {start_time} - {end_time}: {e}")
-            start_time = end_time
+# Per-thread HTTP sessions stay warm across reports in the same process
+_thread_local = threading.local()
+_cache_lock = threading.Lock()
+_meta_lock = threading.Lock()
+# (address, start, end) -> (trades, redeems); only windows that ended before ACTIVITY_SETTLE_SECONDS ago
+ACTIVITY_WINDOW_CACHE = {}
+ACTIVITY_SETTLE_SECONDS = 15 * 60
+# address -> (fetched_at, positions)
+POSITIONS_CACHE = {}
+POSITIONS_CACHE_TTL = 5 * 60
+ACTIVITY_WINDOW_SECONDS = 3 * 60 * 60
+
+
+def _get_session():
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        import requests
+        session = _thread_local.session = requests.Session()
+    return session
+
+
+def fetch_activity_window(address, start_time, end_time):
+    """Return (trades, redeems) for one activity window. Settled windows are cached in-process."""
+    key = (address, start_time, end_time)
+    with _cache_lock:
+        cached = ACTIVITY_WINDOW_CACHE.get(key)
+    if cached is not None:
+        # Callers mutate items (is_win, pnl merge), so hand out copies
+        return [dict(i) for i in cached[0]], [dict(i) for i in cached[1]], True
+    params = {
+        'user': address,
+        'start': start_time,
+        'end': end_time,
+        'limit': 500,
+    }
+    resp = _get_session().get(DATA_API_ACTIVITY_URL, params=params, timeout=10)
+    resp.raise_for_status()
+    batch = resp.json()
+    trades, redeems = [], []
+    if isinstance(batch, list):
+        # Filter and split by type
+        for item in batch:
+            if item.get('type') == 'TRADE':
+                trades.append(item)
+            elif item.get('type') == 'REDEEM':
+                redeems.append(item)
+    if end_time <= time.time() - ACTIVITY_SETTLE_SECONDS:
+        with _cache_lock:
+            ACTIVITY_WINDOW_CACHE[key] = (trades, redeems)
+        return [dict(i) for i in trades], [dict(i) for i in redeems], False
+    return trades, redeems, False
+
+
+def fetch_positions(address, max_age=POSITIONS_CACHE_TTL):
+    """Fetch all positions with pagination, reusing a recent in-process copy."""
+    now = time.time()
+    with _cache_lock:
+        cached = POSITIONS_CACHE.get(address)
+    if cached is not None and now - cached[0] < max_age:
+        return cached[1]
+    limit = 500
+    max_offset = 10000
+    offset = 0
+    all_positions = []
+    session = _get_session()
+    while offset < max_offset:
+        params = {
+            'user': address,
+            'limit': limit,
+            'offset': offset,
+            'sortBy': 'CURRENT',
+            'sortDirection': 'DESC'
+        }
+        resp = session.get(DATA_API_POSITION_URL, params=params, timeout=10)
+        resp.raise_for_status()
+        page = resp.json()
+        if isinstance(page, dict) and 'data' in page:
+            page = page['data']
+        if not page:
+            break
+        all_positions.extend(page)
+        if len(page) < limit:
+            break
+        offset += limit
+        time.sleep(0.2)
+    with _cache_lock:
+        POSITIONS_CACHE[address] = (now, all_positions)
+    return all_positions
+
+
+def merge_positions(all_data, redeemed_orders, all_positions):
+    """Mark is_win from redeems/positive PnL and merge redeemable position info into trades."""
+    redeemable_map = {}
+    for pos in all_positions:
+        if pos.get('redeemable') == True:
+            cid = pos.get('conditionId')
+            if cid:
+                redeemable_map[cid] = {
+                    'totalBought': pos.get('totalBought'),
+                    'avgPrice': pos.get('avgPrice'),
+                    'cashPnl': pos.get('cashPnl'),
+                    'percentPnl': pos.get('percentPnl')
+                }
+    # Mark is_win from redeemed_orders
+    redeemed_cids = set()
+    for r in redeemed_orders:
+        cid = r.get('conditionId')
+        if cid:
+            redeemed_cids.add(cid)
+    for obj in all_data:
+        cid = obj.get('conditionId')
+        if cid in redeemed_cids:
+            obj['is_win'] = True
+        # Merge info into data
+        if cid in redeemable_map:
+            obj.update(redeemable_map[cid])
+            # If percentPnl > 0, set is_win True
+            percent_pnl = obj.get('percentPnl')
+            if percent_pnl is not None and percent_pnl > 0:
+                obj['is_win'] = True
+
+
+def fetch_activities(from_time, to_time, address, strict=False):
+    """Return (trades, redeems) in [from_time, to_time), walking ACTIVITY_WINDOW_SECONDS windows.
+
+    to_time may be None / "" for "until now". Failed windows are skipped with a warning,
+    or re-raised when strict=True (callers that keep a sync cursor must not skip gaps).
+    """
+    trades_out = []
+    redeems_out = []
+    start_time = int(from_time)
+    now_time = int(to_time) if to_time not in ("", None) else int(datetime.now(timezone.utc).timestamp())
+    while start_time < now_time:
+        end_time = min(start_time + ACTIVITY_WINDOW_SECONDS, now_time)
+        try:
+            trades, redeems, cached = fetch_activity_window(address, start_time, end_time)
+            trades_out.extend(trades)
+            redeems_out.extend(redeems)
+        except Exception as e:
+            if strict:
+                raise
+            cached = False
+            print(f"Warning: API error for window {start_time} - {end_time}: {e}")
+        start_time = end_time
+        if not cached:
             time.sleep(0.2)  # avoid hammering API
+    return trades_out, redeems_out
+
 
+def get_data(from_time=None, to_time=None, address=None, compact=False):
+    """Fetch TRADE activities in [from_time, to_time) and merge win/PnL info from positions.
+
+    Defaults to FROM_TIME / TO_TIME / POLYMARKET_ADDRESS. Safe to call from several threads.
+    compact=True returns slotted Activity records instead of raw API dicts.
+    """
+    from_time = FROM_TIME if from_time is None else from_time
+    to_time = TO_TIME if to_time is None else to_time
+    address = address or POLYMARKET_ADDRESS
+    try:
+        all_data, redeemed_orders = fetch_activities(from_time, to_time, address)
+        if compact:
+            all_data = to_activities(all_data)
         # Fetch extended info from positions API with pagination
         try:
-            user_addr = POLYMARKET_ADDRESS
-            limit = 500
-            max_offset = 10000
-            offset = 0
-            all_positions = []
-            while offset < max_offset:
-                params = {
-                    'user': user_addr,
-                    'limit': limit,
-                    'offset': offset,
-                    'sortBy': 'CURRENT',
-                    'sortDirection': 'DESC'
-                }
-                resp = requests.get(DATA_API_POSITION_URL, params=params, timeout=10)
-                resp.raise_for_status()
-                page = resp.json()
-                if isinstance(page, dict) and 'data' in page:
-                    page = page['data']
-                if not page:
-                    break
-                all_positions.extend(page)
-                if len(page) < limit:
-                    break
-                offset += limit
-                time.sleep(0.2)
-
-            redeemable_map = {}
-            for pos in all_positions:
-                if pos.get('redeemable') == True:
-                    cid = pos.get('conditionId')
-                    if cid:
-                        redeemable_map[cid] = {
-                            'totalBought': pos.get('totalBought'),
-                            'avgPrice': pos.get('avgPrice'),
-                            'cashPnl': pos.get('cashPnl'),
-                            'percentPnl': pos.get('percentPnl')
-                        }
-            # Mark is_win from redeemed_orders
-            redeemed_cids = set()
-            for r in redeemed_orders:
-                cid = r.get('conditionId')
-                if cid:
-                    redeemed_cids.add(cid)
-            for obj in all_data:
-                cid = obj.get('conditionId')
-                if cid in redeemed_cids:
-                    obj['is_win'] = True
-                # Merge info into data
-                if cid in redeemable_map:
-                    obj.update(redeemable_map[cid])
-                    # If percentPnl > 0, set is_win True
-                    percent_pnl = obj.get('percentPnl')
-                    if percent_pnl is not None and percent_pnl > 0:
-                        obj['is_win'] = True
+            merge_positions(all_data, redeemed_orders, fetch_positions(address))
         except Exception as e:
             print(f"Warning: Could not fetch/merge positions API: {e}")
         return all_data
@@ -377,77 +505,335 @@ def fill_excel_analysis_sheet(wb, analysis_data):
     except Exception as e:
         print(f"Warning: Could not fill analysis summary section: {e}")
 
-def _build_report_filename(from_ts: int, to_ts: int) -> str:
+def _build_report_filename(from_ts: int, to_ts: int, ext: str = 'xlsx') -> str:
     """Return filename like dd.MM.yyyy-dd.MM.yyyy.xlsx using GMT+7.
     to_ts treated as exclusive end; subtract 1 second for inclusive date.
+    Pass ext='' for the bare base name used by the columnar exporters.
     """
     from_date = to_gmt7_date(int(from_ts))
     to_inclusive = int(to_ts) - 1 if to_ts else int(time.time())
     to_date = to_gmt7_date(to_inclusive)
-    return f"{from_date}-{to_date}.xlsx"
+    return f"{from_date}-{to_date}.{ext}" if ext else f"{from_date}-{to_date}"
 
 
-def fill_excel(data):
-    wb = openpyxl.load_workbook(TEMPLATE_PATH)
-    effective_to = TO_TIME if TO_TIME else int(datetime.now(timezone.utc).timestamp())
-    analysis_data = get_analysis_data(data, FROM_TIME, effective_to)
-    fill_excel_analysis_sheet(wb, analysis_data)
-    ws = wb['Data']
+def _order_time_parts(data):
+    """ET time strings for every order, in Data sheet row order, formatted in one pass."""
+    return iter(extract_time_parts(o.get('time') for obj in data for o in obj.get('orders', [])))
+
+
+@lru_cache(maxsize=None)
+def _status_fill(is_win):
+    """Solid WIN/LOSE fill; openpyxl is only imported once a workbook is built."""
+    from openpyxl.styles import PatternFill
+    color = WIN_COLOR if is_win else LOSE_COLOR
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+def _fill_data_sheet(ws, data):
     start_row = 2  # assuming headers are in row 1
     row = start_row
+    time_parts = _order_time_parts(data)
     for idx, obj in enumerate(data, 1):
         ws.cell(row=row, column=1, value=idx)
         ws.cell(row=row, column=2, value=obj.get('title', ''))
         ws.cell(row=row, column=10, value=obj.get('id', ''))
         ws.cell(row=row, column=11, value=obj.get('slug', ''))
-        ws.cell(row=row, column=5, value='WIN' if obj.get('is_win') else 'LOSE')
-        cell = ws.cell(row=row, column=5)
-        if obj.get('is_win'):
-            cell.fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-        else:
-            cell.fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+        cell = ws.cell(row=row, column=5, value='WIN' if obj.get('is_win') else 'LOSE')
+        cell.fill = _status_fill(bool(obj.get('is_win')))
         for order in obj.get('orders', []):
             ts = order.get('time')
-            ws.cell(row=row, column=3, value=extract_time_part(ts))
+            ws.cell(row=row, column=3, value=next(time_parts))
             ws.cell(row=row, column=4, value=order.get('price'))
             ws.cell(row=row, column=6, value=order.get('time_to_matched'))
             ws.cell(row=row, column=12, value=ts)
             row += 1
-    filename = _build_report_filename(FROM_TIME, effective_to)
-    output_path = os.path.join(os.path.dirname(__file__), filename)
-    wb.save(output_path)
+
+
+def _write_only_copy(ws, c):
+    """Return a WriteOnlyCell for ws carrying the value and style of template cell c."""
+    from openpyxl.cell import WriteOnlyCell
+    wc = WriteOnlyCell(ws, value=c.value)
+    if c.has_style:
+        wc.font = copy(c.font)
+        wc.fill = copy(c.fill)
+        wc.border = copy(c.border)
+        wc.alignment = copy(c.alignment)
+        wc.number_format = c.number_format
+    return wc
+
+
+def _copy_sheet_write_only(src, dst, max_row=None):
+    """Copy values, styles, widths and merges of a small template sheet into a write-only sheet."""
+    for key, dim in src.column_dimensions.items():
+        if dim.width:
+            dst.column_dimensions[key].width = dim.width
+    if max_row is None:
+        for merged in src.merged_cells.ranges:
+            dst.merged_cells.add(str(merged))
+    for src_row in src.iter_rows(max_row=max_row):
+        dst.append([_write_only_copy(dst, c) for c in src_row])
+
+
+def _build_streaming_workbook(data, analysis_data):
+    """Write-only workbook: Analysis copied from the filled template, Data streamed row by row."""
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import NamedStyle
+    template = openpyxl.load_workbook(TEMPLATE_PATH)
+    fill_excel_analysis_sheet(template, analysis_data)
+    wb = openpyxl.Workbook(write_only=True)
+    win_style = NamedStyle(name='win_cell', fill=copy(_status_fill(True)))
+    lose_style = NamedStyle(name='lose_cell', fill=copy(_status_fill(False)))
+    wb.add_named_style(win_style)
+    wb.add_named_style(lose_style)
+
+    _copy_sheet_write_only(template['Analysis'], wb.create_sheet('Analysis'))
+
+    # Only the header row of the Data template is kept; rows below are streamed
+    ws = wb.create_sheet('Data')
+    _copy_sheet_write_only(template['Data'], ws, max_row=1)
+
+    # Columns: 1 index, 2 title, 3 time, 4 price, 5 win/lose, 6 time matched, 10 conditionId, 11 slug, 12 timestamp
+    time_parts = _order_time_parts(data)
+    for idx, obj in enumerate(data, 1):
+        status = WriteOnlyCell(ws, value='WIN' if obj.get('is_win') else 'LOSE')
+        status.style = 'win_cell' if obj.get('is_win') else 'lose_cell'
+        orders = obj.get('orders', [])
+        if not orders:
+            ws.append([idx, obj.get('title', ''), None, None, status, None, None, None, None,
+                       obj.get('id', ''), obj.get('slug', ''), None])
+            continue
+        for i, order in enumerate(orders):
+            ts = order.get('time')
+            if i == 0:
+                ws.append([idx, obj.get('title', ''), next(time_parts), order.get('price'), status,
+                           order.get('time_to_matched'), None, None, None, obj.get('id', ''),
+                           obj.get('slug', ''), ts])
+            else:
+                ws.append([None, None, next(time_parts), order.get('price'), None,
+                           order.get('time_to_matched'), None, None, None, None, None, ts])
+    return wb
+
+
+def write_report_meta(meta, meta_path=None):
+    """Atomically write last_report.json so concurrent reports never leave a torn file."""
+    meta_path = meta_path or REPORT_META_PATH
+    tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with _meta_lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=2)
+            os.replace(tmp_path, meta_path)
+    except Exception as e:
+        print(f"Warning: could not write metadata file: {e}")
+
+
+def fill_excel(data, streaming=None, output_path=None, from_time=None, to_time=None, meta_path=None,
+               write_meta=True):
+    """Build and save the report workbook; returns its path.
+
+    from_time/to_time default to FROM_TIME/TO_TIME. streaming=None picks the
+    write-only path automatically once the Data sheet reaches STREAMING_MIN_ROWS order rows.
+    """
+    from_time = FROM_TIME if from_time is None else from_time
+    to_time = TO_TIME if to_time is None else to_time
+    effective_to = to_time if to_time else int(datetime.now(timezone.utc).timestamp())
+    analysis_data = get_analysis_data(data, from_time, effective_to)
+    if streaming is None:
+        streaming = sum(len(obj.get('orders', [])) for obj in data) >= STREAMING_MIN_ROWS
+    if streaming:
+        wb = _build_streaming_workbook(data, analysis_data)
+    else:
+        import openpyxl
+        wb = openpyxl.load_workbook(TEMPLATE_PATH)
+        fill_excel_analysis_sheet(wb, analysis_data)
+        _fill_data_sheet(wb['Data'], data)
+    filename = _build_report_filename(from_time, effective_to)
+    if output_path is None:
+        output_path = os.path.join(os.path.dirname(__file__), filename)
+    else:
+        filename = os.path.basename(output_path)
+    # Save under a private name first so a concurrent job never reads a half-written file
+    tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    wb.save(tmp_path)
+    os.replace(tmp_path, output_path)
     # Write metadata for other scripts
     meta = {
         'path': output_path,
         'filename': filename,
-        'from_time': FROM_TIME,
-        'to_time': effective_to
+        'from_time': str(from_time),
+        'to_time': effective_to,
+        'format': 'xlsx',
+        'files': [output_path]
     }
-    try:
-        with open(os.path.join(os.path.dirname(__file__), 'last_report.json'), 'w', encoding='utf-8') as f:
-            json.dump(meta, f, indent=2)
-    except Exception as e:
-        print(f"Warning: could not write metadata file: {e}")
+    if write_meta:
+        write_report_meta(meta, meta_path)
     print(f"Filled data saved to {output_path}")
     return output_path
 
+
+def export_report(grouped_data, activities=None, fmt='xlsx', output_path=None, from_time=None, to_time=None,
+                  streaming=None, write_meta=True, meta_path=None) -> dict:
+    """Export one report in `fmt` (xlsx, or a columnar format from exporters.EXPORTERS).
+
+    Every format writes the same last_report.json metadata, plus 'format' and 'files'.
+    For columnar formats output_path is the base path without extension.
+    """
+    from_time = FROM_TIME if from_time is None else from_time
+    to_time = TO_TIME if to_time is None else to_time
+    effective_to = to_time if to_time else int(datetime.now(timezone.utc).timestamp())
+    if fmt == 'xlsx':
+        path = fill_excel(grouped_data, streaming=streaming, output_path=output_path, from_time=from_time,
+                          to_time=to_time, meta_path=meta_path, write_meta=write_meta)
+        files = [path]
+    else:
+        base_path = output_path or os.path.join(os.path.dirname(__file__), _build_report_filename(from_time, effective_to, ''))
+        files = export_tabular(fmt, grouped_data, activities, base_path)
+        path = files[0]
+        print(f"Exported {fmt} report to {', '.join(files)}")
+    meta = {
+        'path': path,
+        'filename': os.path.basename(path),
+        'from_time': str(from_time),
+        'to_time': effective_to,
+        'format': fmt,
+        'files': files
+    }
+    if write_meta and fmt != 'xlsx':
+        write_report_meta(meta, meta_path)
+    return meta
+
+
+def generate_report(from_ts, to_ts, address=None, out_path=None, streaming=None, fmt='xlsx') -> dict | None:
+    """Fetch, group and export one report in-process; returns the report metadata.
+
+    Reuses warm HTTP sessions and fills this process's activity/positions caches (both
+    behind _cache_lock), so several reports can run concurrently in threads. Each run also
+    merges its rounds into analysis_cube.json (under a file lock, so reports in other
+    processes don't lose updates) and rewrites last_report.json, where the last one wins.
+    """
+    address = address or POLYMARKET_ADDRESS
+    if not address:
+        print("POLYMARKET_PROXY_ADDRESS not set in .env; cannot fetch data.")
+        return None
+    print(f"Data range: {to_gmt7_datetime(int(from_ts))} to {to_gmt7_datetime(int(to_ts))} [GMT+7]")
+    data = get_data(from_ts, to_ts, address, compact=True) or []
+    grouped_data = group_rounds(data, compact=True)
+    print(f"Total unique rounds: {len(grouped_data)}")
+    # Keep the all-time analysis cube in sync so new slicings don't need a re-fetch
+    update_cube(grouped_data)
+    meta = export_report(grouped_data, data, fmt, out_path, from_ts, to_ts, streaming)
+    meta['rounds'] = len(grouped_data)
+    return meta
+
+
+def merge_ranges(ranges):
+    """Merge overlapping/adjacent (from, to) ranges into the minimal set of spans to fetch."""
+    merged = []
+    for start, end in sorted((int(a), int(b)) for a, b in ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(m) for m in merged]
+
+
+def partition_activities(activities, ranges):
+    """Split raw activities into one list per (from, to) range by timestamp."""
+    ordered = sorted(activities, key=lambda a: a.get('timestamp') or 0)
+    index = [a.get('timestamp') or 0 for a in ordered]
+    return [ordered[bisect_left(index, int(start)):bisect_left(index, int(end))] for start, end in ranges]
+
+
+def partition_rounds(activity_parts, compact=False):
+    """Group each range's activities (partition_activities output) into its own rounds.
+
+    Same rule as generate_report: a range holds the rounds with fills inside it, with only
+    those fills, so a round starting at 23:50 that fills after midnight is split across
+    the two days exactly as two single-range reports would split it.
+    """
+    return [group_rounds(part, compact=compact) for part in activity_parts]
+
+
+def _build_report_worker(rounds, activities, from_ts, to_ts, out_path, streaming, fmt):
+    # Runs in a worker process; the parent writes last_report.json once all reports exist
+    return export_report(rounds, activities, fmt, out_path, from_ts, to_ts, streaming, write_meta=False)
+
+
+def generate_reports(ranges, address=None, out_dir=None, streaming=None, workers=None, fmt='xlsx') -> list[dict]:
+    """Generate one report per (from, to) range from a single fetch of their union.
+
+    Activities are fetched once per merged span, partitioned per range by timestamp and
+    grouped per range (the same rounds generate_report builds for that range), and the
+    workbooks are built in parallel worker processes. Win flags come from the redeems of
+    the whole fetched span, so a round redeemed after its range ends is still a win.
+    Returns the metadata of each report in the order of `ranges`.
+    """
+    address = address or POLYMARKET_ADDRESS
+    if not address:
+        print("POLYMARKET_PROXY_ADDRESS not set in .env; cannot fetch data.")
+        return []
+    ranges = [(int(a), int(b)) for a, b in ranges]
+    if not ranges:
+        return []
+    data = []
+    for start, end in merge_ranges(ranges):
+        print(f"Fetching: {to_gmt7_datetime(start)} to {to_gmt7_datetime(end)} [GMT+7]")
+        data.extend(get_data(start, end, address, compact=True) or [])
+    grouped_data = group_rounds(data, compact=True)
+    print(f"Total unique rounds (all ranges): {len(grouped_data)}")
+    update_cube(grouped_data)
+
+    activity_parts = partition_activities(data, ranges)
+    parts = partition_rounds(activity_parts, compact=True)
+    # Raw activities are only shipped to workers for the columnar formats
+    if fmt == 'xlsx':
+        activity_parts = [None] * len(ranges)
+    out_dir = out_dir or os.path.dirname(__file__)
+    jobs = []
+    for (start, end), rounds, activities in zip(ranges, parts, activity_parts):
+        name = _build_report_filename(start, end, 'xlsx' if fmt == 'xlsx' else '')
+        jobs.append((rounds, activities, start, end, os.path.join(out_dir, name), streaming, fmt))
+
+    if len(jobs) == 1 or workers == 1:
+        metas = [_build_report_worker(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or min(len(jobs), os.cpu_count() or 1)) as pool:
+            metas = list(pool.map(_build_report_worker, *zip(*jobs)))
+
+    for job, meta in zip(jobs, metas):
+        meta['rounds'] = len(job[0])
+    # last_report.json tracks the report that reaches furthest
+    latest = max(metas, key=lambda m: m['to_time'])
+    write_report_meta({k: v for k, v in latest.items() if k != 'rounds'})
+    return metas
+
+
 def main():
+    parser = argparse.ArgumentParser(description='Generate the Excel report for a time range.')
+    parser.add_argument('--from-ts', type=int, default=int(FROM_TIME), help='Range start (unix seconds)')
+    parser.add_argument('--to-ts', type=int, default=int(TO_TIME), help='Range end, exclusive (unix seconds)')
+    parser.add_argument('--out', default=None, help='Output path (default: export_data/<range>.xlsx; base path without extension for columnar formats)')
+    parser.add_argument('--range', nargs=2, type=int, action='append', metavar=('FROM_TS', 'TO_TS'),
+                        help='Batch mode: repeat for several ranges sharing one fetch')
+    parser.add_argument('--workers', type=int, default=None, help='Batch mode: worker processes')
+    parser.add_argument('--format', default='xlsx', choices=['xlsx'] + sorted(EXPORTERS),
+                        help='Output format (columnar formats write <range>.rounds.* and <range>.activities.*)')
+    args = parser.parse_args()
+
     if not POLYMARKET_ADDRESS:
         print("POLYMARKET_PROXY_ADDRESS not set in .env; cannot fetch data. Exiting.")
         exit(1)
 
-    from_dt = to_gmt7_datetime(int(FROM_TIME))
-    to_dt = to_gmt7_datetime(int(TO_TIME))
-    print(f"Data range: {from_dt} to {to_dt} [GMT+7]")
-    
-    # Fetch and process data
-    data = get_data()
-    grouped_data = group_rounds(data)
-    print(f"Total unique rounds: {len(grouped_data)}")
-    
-    # Generate Excel report
-    generated_path = fill_excel(grouped_data)
-    print(f"Report generated: {generated_path}")
-    
+    if args.range:
+        for meta in generate_reports(args.range, POLYMARKET_ADDRESS, workers=args.workers, fmt=args.format):
+            print(f"Report generated: {meta['path']} ({meta['rounds']} rounds)")
+        return
+
+    meta = generate_report(args.from_ts, args.to_ts, POLYMARKET_ADDRESS, args.out, fmt=args.format)
+    if not meta:
+        exit(1)
+    print(f"Report generated: {meta['path']}")
+
 if __name__ == "__main__":
     main()   
@@ -0,0 +1,316 @@
+"""
+Per-round PnL, equity curve and drawdown analytics.
+
+Per round (conditionId), from the raw activities:
+    cost     = USDC spent on BUY trades
+    proceeds = USDC received from SELL trades
+    payout   = USDC received from REDEEM activities (or, before the redeem happens,
+               the value of a redeemable position: initial value + cashPnl)
+    pnl      = proceeds + payout - cost
+
+A round is only committed to the curve once it is settled: redeemed, redeemable,
+or ended more than SETTLE_SECONDS ago without either (a loss, payout 0).
+
+PnLTracker keeps equity, peak, max drawdown and a rolling win rate as running
+totals and persists them in PNL_PATH, so adding a new round is O(1). A round that
+arrives out of order or whose PnL changes after commit triggers one replay.
+
+Usage:
+    python export_data/pnl.py --from-ts 1758153600 --to-ts 1758758400
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import deque
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from utils.common import r2, to_gmt7_datetime, file_lock  # noqa: E402
+
+PNL_PATH = os.path.join(CURRENT_DIR, 'pnl_state.json')
+PNL_VERSION = 1
+ROUND_SECONDS = 15 * 60
+# Unredeemed rounds this long after their end are counted as lost
+SETTLE_SECONDS = 60 * 60
+ROLLING_WINDOW = 50
+_update_lock = threading.Lock()
+
+
+def _usdc(item):
+    value = item.get('usdcSize')
+    if value is None:
+        value = (item.get('price') or 0) * (item.get('size') or 0)
+    return float(value)
+
+
+def compute_round_pnl(trades, redeems, now=None, settle_seconds=SETTLE_SECONDS) -> list[dict]:
+    """Per-round cost/payout/PnL from TRADE and REDEEM activities (dicts or Activity records).
+
+    Trades should already carry positions info from merge_positions when available.
+    Returns settled and unsettled rounds sorted by start time; see the 'settled' flag.
+    """
+    # Imported here so the tracker/CLI query path doesn't pull in openpyxl
+    from export_data.fill_template import resolve_start_time
+
+    now = time.time() if now is None else now
+    rounds = {}
+    for t in trades:
+        cid = t.get('conditionId')
+        if not cid:
+            continue
+        r = rounds.get(cid)
+        if r is None:
+            r = rounds[cid] = {
+                'id': cid, 'title': t.get('title', ''), 'slug': t.get('slug', ''),
+                'cost': 0.0, 'proceeds': 0.0, 'payout': 0.0, 'redeemed': False,
+                'position_value': None, 'first_trade': t.get('timestamp'),
+            }
+        if t.get('side') == 'SELL':
+            r['proceeds'] += _usdc(t)
+        else:
+            r['cost'] += _usdc(t)
+        ts = t.get('timestamp')
+        if ts is not None and (r['first_trade'] is None or ts < r['first_trade']):
+            r['first_trade'] = ts
+        # Redeemable position info merged in by merge_positions
+        cash_pnl = t.get('cashPnl')
+        if cash_pnl is not None and r['position_value'] is None:
+            initial = (t.get('totalBought') or 0) * (t.get('avgPrice') or 0)
+            r['position_value'] = max(0.0, initial + cash_pnl)
+    for item in redeems:
+        r = rounds.get(item.get('conditionId'))
+        if r is not None:
+            r['payout'] += _usdc(item)
+            r['redeemed'] = True
+
+    result = []
+    for r in rounds.values():
+        start = resolve_start_time(r['slug'], r['title'], r['first_trade'])
+        if start is None:
+            start = r['first_trade']
+        if not r['redeemed'] and r['position_value'] is not None:
+            r['payout'] = r['position_value']
+        ended = start is not None and start + ROUND_SECONDS + settle_seconds <= now
+        settled = r['redeemed'] or r['position_value'] is not None or ended
+        pnl = r['proceeds'] + r['payout'] - r['cost']
+        result.append({
+            'id': r['id'],
+            'title': r['title'],
+            'start_time': start,
+            'cost': round(r['cost'], 6),
+            'proceeds': round(r['proceeds'], 6),
+            'payout': round(r['payout'], 6),
+            'pnl': round(pnl, 6),
+            'is_win': settled and r['payout'] > 0,
+            'settled': settled,
+        })
+    result.sort(key=lambda x: (x['start_time'] or 0, x['id']))
+    return result
+
+
+class PnLTracker:
+    """Running equity curve over settled rounds, updated in O(1) per appended round."""
+
+    def __init__(self, window: int = ROLLING_WINDOW):
+        self.window = window
+        # round id -> entry from compute_round_pnl
+        self.rounds = {}
+        # committed round ids in start-time order
+        self.order = []
+        # [start_time, equity, drawdown, rolling_win_rate] per committed round
+        self.points = []
+        self._reset_totals()
+
+    def _reset_totals(self):
+        self.equity = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.total_cost = 0.0
+        self.total_payout = 0.0
+        self.wins = 0
+        self._recent = deque()
+        self._recent_wins = 0
+
+    def _sort_key(self, entry):
+        return (entry.get('start_time') or 0, entry['id'])
+
+    def _append(self, entry):
+        self.order.append(entry['id'])
+        self.equity += entry['pnl']
+        self.peak = max(self.peak, self.equity)
+        drawdown = self.peak - self.equity
+        self.max_drawdown = max(self.max_drawdown, drawdown)
+        self.total_cost += entry['cost']
+        self.total_payout += entry['payout'] + entry['proceeds']
+        win = 1 if entry['is_win'] else 0
+        self.wins += win
+        self._recent.append(win)
+        self._recent_wins += win
+        if len(self._recent) > self.window:
+            self._recent_wins -= self._recent.popleft()
+        rolling = self._recent_wins / len(self._recent)
+        self.points.append([entry.get('start_time'), round(self.equity, 6), round(drawdown, 6), round(rolling, 4)])
+
+    def _replay(self):
+        ordered = sorted(self.rounds.values(), key=self._sort_key)
+        self.order = []
+        self.points = []
+        self._reset_totals()
+        for entry in ordered:
+            self._append(entry)
+
+    def add_round(self, entry) -> bool:
+        """Commit one settled round. Returns True if the curve changed; unsettled rounds are ignored."""
+        if not entry.get('settled'):
+            return False
+        rid = entry['id']
+        previous = self.rounds.get(rid)
+        keep = {k: v for k, v in entry.items() if k != 'settled'}
+        if previous is not None:
+            if previous['pnl'] == keep['pnl'] and previous['is_win'] == keep['is_win']:
+                return False
+            # A committed round changed (e.g. late redeem): replay once
+            self.rounds[rid] = keep
+            self._replay()
+            return True
+        self.rounds[rid] = keep
+        if self.order and self._sort_key(keep) < self._sort_key(self.rounds[self.order[-1]]):
+            self._replay()
+        else:
+            self._append(keep)
+        return True
+
+    def add_rounds(self, entries) -> int:
+        return sum(1 for e in entries if self.add_round(e))
+
+    def summary(self) -> dict:
+        n = len(self.order)
+        return {
+            'rounds': n,
+            'wins': self.wins,
+            'win_rate': r2(self.wins / n) if n else 0,
+            'rolling_win_rate': r2(self._recent_wins / len(self._recent)) if self._recent else 0,
+            'total_cost': r2(self.total_cost),
+            'total_payout': r2(self.total_payout),
+            'pnl': r2(self.equity),
+            'roi': r2(self.equity / self.total_cost) if self.total_cost else 0,
+            'peak': r2(self.peak),
+            'max_drawdown': r2(self.max_drawdown),
+        }
+
+    # --- persistence ---
+    def to_dict(self) -> dict:
+        return {
+            'version': PNL_VERSION,
+            'window': self.window,
+            'rounds': self.rounds,
+            'order': self.order,
+            'points': self.points,
+            'totals': {
+                'equity': self.equity, 'peak': self.peak, 'max_drawdown': self.max_drawdown,
+                'total_cost': self.total_cost, 'total_payout': self.total_payout, 'wins': self.wins,
+                'recent': list(self._recent),
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'PnLTracker':
+        tracker = cls(window=data.get('window', ROLLING_WINDOW))
+        if data.get('version') != PNL_VERSION:
+            return tracker
+        tracker.rounds = data.get('rounds', {})
+        tracker.order = data.get('order', [])
+        tracker.points = data.get('points', [])
+        totals = data.get('totals', {})
+        tracker.equity = totals.get('equity', 0.0)
+        tracker.peak = totals.get('peak', 0.0)
+        tracker.max_drawdown = totals.get('max_drawdown', 0.0)
+        tracker.total_cost = totals.get('total_cost', 0.0)
+        tracker.total_payout = totals.get('total_payout', 0.0)
+        tracker.wins = totals.get('wins', 0)
+        tracker._recent = deque(totals.get('recent', []))
+        tracker._recent_wins = sum(tracker._recent)
+        return tracker
+
+    def save(self, path: str = PNL_PATH):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+
+def load_tracker(path: str = PNL_PATH) -> PnLTracker:
+    """Load the persisted tracker, or return an empty one."""
+    if os.path.isfile(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return PnLTracker.from_dict(json.load(f))
+        except Exception as e:
+            print(f"Warning: could not load PnL state: {e}")
+    return PnLTracker()
+
+
+def update_pnl(entries, path: str = PNL_PATH) -> PnLTracker:
+    """Merge settled rounds into the persisted tracker and save it if anything changed."""
+    # The file lock covers the daemon's reconcile task and a pnl.py run at the same time
+    with _update_lock, file_lock(f"{path}.lock"):
+        tracker = load_tracker(path)
+        if tracker.add_rounds(entries):
+            try:
+                tracker.save(path)
+            except Exception as e:
+                print(f"Warning: could not save PnL state: {e}")
+    return tracker
+
+
+def fetch_round_pnl(from_ts, to_ts, address=None) -> list[dict]:
+    """Fetch trades/redeems/positions for a range (using fill_template's caches) and compute PnL."""
+    from export_data import fill_template
+
+    address = address or fill_template.POLYMARKET_ADDRESS
+    trades, redeems = fill_template.fetch_activities(from_ts, to_ts, address)
+    try:
+        fill_template.merge_positions(trades, redeems, fill_template.fetch_positions(address))
+    except Exception as e:
+        print(f"Warning: Could not fetch/merge positions API: {e}")
+    return compute_round_pnl(trades, redeems)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-round PnL, equity curve and drawdown.')
+    parser.add_argument('--from-ts', type=int, default=None, help='Fetch and add rounds from this time (unix seconds)')
+    parser.add_argument('--to-ts', type=int, default=None, help='Range end, exclusive (default: now)')
+    parser.add_argument('--last', type=int, default=10, help='Print the last N committed rounds')
+    args = parser.parse_args()
+
+    if args.from_ts is not None:
+        to_ts = args.to_ts or int(time.time())
+        entries = fetch_round_pnl(args.from_ts, to_ts)
+        pending = sum(1 for e in entries if not e['settled'])
+        tracker = update_pnl(entries)
+        print(f"Fetched {len(entries)} rounds ({pending} not settled yet)")
+    else:
+        tracker = load_tracker()
+    if not tracker.order:
+        print(f"No settled rounds in {PNL_PATH}; pass --from-ts to fetch some.")
+        return
+
+    for key, value in tracker.summary().items():
+        print(f"{key:>17}: {value}")
+    print('\t'.join(['start (GMT+7)', 'cost', 'payout', 'pnl', 'equity', 'drawdown', 'rolling']))
+    for rid, point in zip(tracker.order[-args.last:], tracker.points[-args.last:]):
+        e = tracker.rounds[rid]
+        start = to_gmt7_datetime(point[0]) if point[0] else ''
+        print('\t'.join(str(x) for x in [start, r2(e['cost']), r2(e['payout'] + e['proceeds']),
+                                          r2(e['pnl']), r2(point[1]), r2(point[2]), point[3]]))
+
+
+if __name__ == '__main__':
+    main()
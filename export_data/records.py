@@ -0,0 +1,176 @@
+"""
+Compact __slots__ records for activities, rounds and round orders.
+
+Raw Data API activity dicts carry dozens of fields the analysis never reads.
+These records keep only what the pipeline uses and intern the strings that
+repeat across many trades (conditionId, title, slug, asset token id, type, side).
+
+Records also support the dict-style access the rest of the pipeline already
+uses (`obj.get('conditionId')`, `round_obj['orders']`, `obj['is_win'] = True`,
+`obj.update(...)`), keyed by the original API / group_rounds names, so
+group_rounds, the analysis cube, the exporters and the Excel writer accept
+either form.
+"""
+
+import sys
+
+_intern = sys.intern
+
+
+class _Record:
+    __slots__ = ()
+    # external key (API / group_rounds name) -> attribute name
+    _KEYS = {}
+
+    def get(self, key, default=None):
+        attr = self._KEYS.get(key)
+        if attr is None:
+            return default
+        value = getattr(self, attr)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        attr = self._KEYS.get(key)
+        if attr is None:
+            raise KeyError(key)
+        return getattr(self, attr)
+
+    def __setitem__(self, key, value):
+        attr = self._KEYS.get(key)
+        if attr is None:
+            raise KeyError(f"{type(self).__name__} has no field '{key}'")
+        setattr(self, attr, value)
+
+    def __contains__(self, key):
+        return key in self._KEYS
+
+    def update(self, values: dict):
+        """Merge known keys from a dict; unknown keys are dropped."""
+        for key, value in values.items():
+            attr = self._KEYS.get(key)
+            if attr is not None:
+                setattr(self, attr, value)
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, attr) for key, attr in self._KEYS.items()}
+
+    # Compare equal to a record or dict with the same fields (records are not hashable)
+    def __eq__(self, other):
+        if isinstance(other, _Record):
+            other = other.to_dict()
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return tuple(getattr(self, attr) for attr in self.__slots__)
+
+    def __setstate__(self, state):
+        for attr, value in zip(self.__slots__, state):
+            setattr(self, attr, value)
+
+    def __repr__(self):
+        fields = ', '.join(f"{attr}={getattr(self, attr)!r}" for attr in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Activity(_Record):
+    """One TRADE/REDEEM activity from the Data API, reduced to the fields the analysis uses."""
+
+    __slots__ = ('type', 'timestamp', 'condition_id', 'title', 'slug', 'asset', 'side',
+                 'price', 'size', 'usdc_size', 'outcome_index', 'outcome', 'transaction_hash', 'is_win',
+                 'total_bought', 'avg_price', 'cash_pnl', 'percent_pnl')
+    _KEYS = {
+        'type': 'type', 'timestamp': 'timestamp', 'conditionId': 'condition_id',
+        'title': 'title', 'slug': 'slug', 'asset': 'asset', 'side': 'side',
+        'price': 'price', 'size': 'size', 'usdcSize': 'usdc_size',
+        'outcomeIndex': 'outcome_index', 'outcome': 'outcome',
+        'transactionHash': 'transaction_hash', 'is_win': 'is_win',
+        'totalBought': 'total_bought', 'avgPrice': 'avg_price',
+        'cashPnl': 'cash_pnl', 'percentPnl': 'percent_pnl',
+    }
+
+    def __init__(self, type=None, timestamp=None, condition_id=None, title=None, slug=None, asset=None,
+                 side=None, price=None, size=None, usdc_size=None, outcome_index=None, outcome=None,
+                 transaction_hash=None, is_win=False,
+                 total_bought=None, avg_price=None, cash_pnl=None, percent_pnl=None):
+        self.type = type
+        self.timestamp = timestamp
+        self.condition_id = condition_id
+        self.title = title
+        self.slug = slug
+        self.asset = asset
+        self.side = side
+        self.price = price
+        self.size = size
+        self.usdc_size = usdc_size
+        self.outcome_index = outcome_index
+        self.outcome = outcome
+        self.transaction_hash = transaction_hash
+        self.is_win = is_win
+        self.total_bought = total_bought
+        self.avg_price = avg_price
+        self.cash_pnl = cash_pnl
+        self.percent_pnl = percent_pnl
+
+    @classmethod
+    def from_api(cls, item: dict) -> 'Activity':
+        def s(key):
+            value = item.get(key)
+            return _intern(value) if isinstance(value, str) else value
+        return cls(
+            type=s('type'), timestamp=item.get('timestamp'), condition_id=s('conditionId'),
+            title=s('title'), slug=s('slug'), asset=s('asset'), side=s('side'),
+            price=item.get('price'), size=item.get('size'), usdc_size=item.get('usdcSize'),
+            outcome_index=item.get('outcomeIndex'), outcome=s('outcome'),
+            transaction_hash=item.get('transactionHash'), is_win=bool(item.get('is_win')),
+            total_bought=item.get('totalBought'), avg_price=item.get('avgPrice'),
+            cash_pnl=item.get('cashPnl'), percent_pnl=item.get('percentPnl'),
+        )
+
+
+class RoundOrder(_Record):
+    """Latest fill of one price level within a round (prices in cents)."""
+
+    __slots__ = ('price', 'time', 'outcome_index', 'time_to_matched')
+    _KEYS = {'price': 'price', 'time': 'time', 'outcome_index': 'outcome_index',
+             'time_to_matched': 'time_to_matched'}
+
+    def __init__(self, price=None, time=None, outcome_index=None, time_to_matched=None):
+        self.price = price
+        self.time = time
+        self.outcome_index = outcome_index
+        self.time_to_matched = time_to_matched
+
+
+class Round(_Record):
+    """One market round (conditionId) with its orders, as produced by group_rounds."""
+
+    __slots__ = ('id', 'title', 'slug', 'is_win', 'start_time', 'orders')
+    _KEYS = {'id': 'id', 'title': 'title', 'slug': 'slug', 'is_win': 'is_win',
+             'start_time': 'start_time', 'orders': 'orders'}
+
+    def __init__(self, id=None, title='', slug='', is_win=False, start_time=None, orders=None):
+        self.id = _intern(id) if isinstance(id, str) else id
+        self.title = _intern(title) if isinstance(title, str) else title
+        self.slug = _intern(slug) if isinstance(slug, str) else slug
+        self.is_win = is_win
+        self.start_time = start_time
+        self.orders = orders if orders is not None else []
+
+    def to_dict(self) -> dict:
+        d = super().to_dict()
+        d['orders'] = [o.to_dict() if isinstance(o, RoundOrder) else o for o in self.orders]
+        return d
+
+
+def to_activities(items) -> list[Activity]:
+    """Convert raw API dicts to Activity records."""
+    return [Activity.from_api(item) for item in items]
+
+
+def rounds_to_dicts(rounds) -> list[dict]:
+    """JSON-ready dicts for rounds that may be records or plain dicts."""
+    return [r.to_dict() if isinstance(r, Round) else r for r in rounds]
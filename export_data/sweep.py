@@ -0,0 +1,217 @@
+"""
+Parallel parameter sweep of order ladders over historical rounds.
+
+Builds a grid of generate_specs-style ladders (price start/step, number of orders,
+size start/step, cancel minutes, take-profit) plus every strategy registered in
+order_specs_generator.STRATEGIES (linear, cong 10-7-5 / 3-3-4, thu 25-20-15-10 / 1-2-3-4
+with a 2x take-profit).
+
+The round arrays from backtest.py are placed in shared memory once; worker processes
+attach to them by name, so only the small ladder configs are pickled per task. Results
+are appended to a CSV as shards finish and the best ladders are printed as a ranked table.
+
+Usage:
+    python export_data/sweep.py --workers 8 --top 20
+    python export_data/sweep.py --price-starts 5,8,10 --num-orders 3,4,5 --cancels 6,8,10 --sort roi
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+import itertools
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from export_data.backtest import (  # noqa: E402
+    RoundArrays, load_round_arrays, fetch_round_arrays, evaluate_ladder, ROUNDS_CACHE_PATH,
+)
+
+SWEEP_RESULTS_PATH = os.path.join(CURRENT_DIR, 'sweep_results.csv')
+SHARD_SIZE = 64
+SORT_KEYS = ['ev_per_round', 'pnl', 'roi', 'hit_rate', 'win_rate', 'ev_per_trade']
+RESULT_COLUMNS = ['name', 'prices', 'sizes', 'cancel', 'take_profit', 'rounds', 'trades', 'hit_rate',
+                  'wins', 'win_rate', 'cost', 'payout', 'pnl', 'ev_per_round', 'ev_per_trade', 'roi',
+                  'max_drawdown']
+
+
+def preset_configs() -> list[tuple]:
+    """The ladders registered in order_specs_generator.STRATEGIES as sweep configs."""
+    from order_specs_generator import STRATEGIES
+    return [
+        (name, tuple(int(round(p * 100)) for p in s['prices']), tuple(s['sizes']),
+         s['cancel_minutes'], s['take_profit'])
+        for name, s in STRATEGIES.items()
+    ]
+
+
+def grid_configs(price_starts, price_steps, num_orders, size_starts, size_steps, cancels, take_profits):
+    """Yield (name, prices, sizes, cancel, take_profit) for every valid grid point."""
+    for start, step, n, size_start, size_step, cancel, tp in itertools.product(
+            price_starts, price_steps, num_orders, size_starts, size_steps, cancels, take_profits):
+        prices = tuple(start - step * i for i in range(n))
+        sizes = tuple(size_start + size_step * i for i in range(n))
+        if prices[-1] < 1 or min(sizes) <= 0:
+            continue
+        yield ('grid', prices, sizes, cancel, tp or None)
+
+
+# --- shared memory plumbing ---
+_worker_arrays = None
+_worker_blocks = []
+
+
+def _share_arrays(arrays: RoundArrays):
+    """Copy each array into a SharedMemory block; returns (blocks, spec) where spec is picklable."""
+    blocks, spec = [], {}
+    for field in RoundArrays._fields:
+        arr = getattr(arrays, field)
+        block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)[...] = arr
+        blocks.append(block)
+        spec[field] = (block.name, arr.shape, arr.dtype.str)
+    return blocks, spec
+
+
+def _attach_arrays(spec):
+    global _worker_arrays
+    fields = {}
+    for field, (name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=name)
+        # Keep the handle alive for as long as the array is used
+        _worker_blocks.append(block)
+        fields[field] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    _worker_arrays = RoundArrays(**fields)
+
+
+def _evaluate_shard(configs):
+    out = []
+    for name, prices, sizes, cancel, tp in configs:
+        metrics = evaluate_ladder(_worker_arrays, prices, sizes, cancel, tp)
+        out.append({'name': name, 'prices': '-'.join(map(str, prices)),
+                    'sizes': '-'.join(f"{s:g}" for s in sizes), 'cancel': cancel,
+                    'take_profit': tp or '', **metrics})
+    return out
+
+
+def _shards(configs, size):
+    it = iter(configs)
+    while True:
+        shard = list(itertools.islice(it, size))
+        if not shard:
+            return
+        yield shard
+
+
+def run_sweep(arrays: RoundArrays, configs, workers=None, out_path=SWEEP_RESULTS_PATH,
+              shard_size=SHARD_SIZE, progress=True) -> list[dict]:
+    """Evaluate every config across a process pool; rows are written to out_path as shards finish."""
+    configs = list(configs)
+    results = []
+    t0 = time.perf_counter()
+    with open(out_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+
+        def collect(rows):
+            writer.writerows(rows)
+            f.flush()
+            results.extend(rows)
+            if progress:
+                print(f"\r  {len(results)}/{len(configs)} ladders, {time.perf_counter() - t0:.1f}s", end='', flush=True)
+
+        if workers == 1:
+            global _worker_arrays
+            _worker_arrays = arrays
+            for shard in _shards(configs, shard_size):
+                collect(_evaluate_shard(shard))
+        else:
+            blocks, spec = _share_arrays(arrays)
+            try:
+                with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                         initializer=_attach_arrays, initargs=(spec,)) as pool:
+                    futures = [pool.submit(_evaluate_shard, shard) for shard in _shards(configs, shard_size)]
+                    for future in as_completed(futures):
+                        collect(future.result())
+            finally:
+                for block in blocks:
+                    block.close()
+                    block.unlink()
+    if progress:
+        print()
+    return results
+
+
+def rank_results(results, sort_key='ev_per_round', max_drawdown=None, min_trades=0) -> list[dict]:
+    rows = [r for r in results if r['trades'] >= min_trades
+            and (max_drawdown is None or r['max_drawdown'] <= max_drawdown)]
+    return sorted(rows, key=lambda r: r[sort_key], reverse=True)
+
+
+def print_table(rows):
+    columns = ['name', 'prices', 'sizes', 'cancel', 'take_profit', 'ev_per_round', 'hit_rate',
+               'win_rate', 'pnl', 'roi', 'max_drawdown']
+    print('\t'.join(columns))
+    for r in rows:
+        print('\t'.join(str(r[c]) for c in columns))
+
+
+def _parse_list(text, cast):
+    return [cast(x) for x in text.split(',') if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep order ladder parameters over historical rounds.')
+    parser.add_argument('--from-ts', type=int, default=None, help='Fetch rounds from this time; otherwise use the backtest cache')
+    parser.add_argument('--to-ts', type=int, default=None, help='Fetch range end, exclusive (default now)')
+    parser.add_argument('--price-starts', default='3,4,5,6,7,8,10,12,15,20,25', help='Highest ladder price in cents')
+    parser.add_argument('--price-steps', default='1,2,3,5', help='Cents between ladder levels')
+    parser.add_argument('--num-orders', default='1,2,3,4,5', help='Orders per side')
+    parser.add_argument('--size-starts', default='5,10,20', help='Size of the first (highest) order')
+    parser.add_argument('--size-steps', default='0,2,5', help='Size change per lower level')
+    parser.add_argument('--cancels', default='4,6,8,10,12', help='Cancel minutes after round start')
+    parser.add_argument('--take-profits', default='0,2', help='Take-profit multiples (0 = hold to resolution)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--sort', choices=SORT_KEYS, default='ev_per_round')
+    parser.add_argument('--max-drawdown', type=float, default=None, help='Drop ladders with a larger max drawdown')
+    parser.add_argument('--min-trades', type=int, default=20, help='Drop ladders with fewer traded rounds')
+    parser.add_argument('--top', type=int, default=20, help='Rows in the ranked table')
+    parser.add_argument('--out', default=SWEEP_RESULTS_PATH, help='CSV with every evaluated ladder')
+    args = parser.parse_args()
+
+    if args.from_ts is not None:
+        arrays = fetch_round_arrays(args.from_ts, args.to_ts or int(time.time()))
+    else:
+        arrays = load_round_arrays()
+        if arrays is None:
+            print(f"No cached rounds at {ROUNDS_CACHE_PATH}; pass --from-ts/--to-ts to fetch.")
+            return
+
+    configs = preset_configs() + list(grid_configs(
+        _parse_list(args.price_starts, int), _parse_list(args.price_steps, int),
+        _parse_list(args.num_orders, int), _parse_list(args.size_starts, float),
+        _parse_list(args.size_steps, float), _parse_list(args.cancels, float),
+        _parse_list(args.take_profits, float)))
+    print(f"Rounds: {len(arrays.start)}  ladders: {len(configs)}")
+    results = run_sweep(arrays, configs, args.workers, args.out)
+    print(f"All results: {args.out}")
+
+    ranked = rank_results(results, args.sort, args.max_drawdown, args.min_trades)
+    print(f"\nTop {min(args.top, len(ranked))} by {args.sort}:")
+    print_table(ranked[:args.top])
+    presets = [r for r in results if r['name'] != 'grid']
+    if presets:
+        print("\nPresets:")
+        print_table(presets)
+
+
+if __name__ == '__main__':
+    main()
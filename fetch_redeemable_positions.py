@@ -0,0 +1,91 @@
+"""
+List resolved Polymarket positions that can be redeemed.
+
+Positions come from the Data API through fill_template.fetch_positions (the same
+in-process positions cache the reports use). Positions flagged redeemable are grouped
+by conditionId, so every market is redeemed once whatever outcomes are held. Markets
+whose held outcomes are all worth 0 (lost) are left out by default: redeeming them
+pays nothing but still costs gas.
+
+Usage:
+    python fetch_redeemable_positions.py
+    python fetch_redeemable_positions.py --include-worthless --json
+"""
+
+import os
+import sys
+import json
+import argparse
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from utils.common import r2  # noqa: E402
+from export_data.fill_template import fetch_positions, POLYMARKET_ADDRESS, POSITIONS_CACHE_TTL  # noqa: E402
+
+
+def group_redeemable(positions, include_worthless=False) -> list[dict]:
+    """Redeemable positions grouped by conditionId, most valuable first."""
+    markets = {}
+    for pos in positions:
+        cid = pos.get('conditionId')
+        if pos.get('redeemable') is not True or not cid:
+            continue
+        m = markets.get(cid)
+        if m is None:
+            m = markets[cid] = {
+                'condition_id': cid,
+                'title': pos.get('title'),
+                'slug': pos.get('slug'),
+                'negative_risk': bool(pos.get('negativeRisk')),
+                'size': 0.0,
+                'value': 0.0,
+                'assets': [],
+                'outcomes': [],
+            }
+        m['size'] += float(pos.get('size') or 0)
+        m['value'] += float(pos.get('currentValue') or 0)
+        if pos.get('asset'):
+            m['assets'].append(str(pos['asset']))
+        if pos.get('outcome'):
+            m['outcomes'].append(pos['outcome'])
+    out = []
+    for m in markets.values():
+        m['size'], m['value'] = r2(m['size']), r2(m['value'])
+        if include_worthless or m['value'] > 0:
+            out.append(m)
+    out.sort(key=lambda m: m['value'], reverse=True)
+    return out
+
+
+def fetch_redeemable_positions(address=None, max_age=POSITIONS_CACHE_TTL, include_worthless=False) -> list[dict]:
+    """[{condition_id, title, slug, negative_risk, size, value, assets, outcomes}, ...] for the wallet."""
+    address = address or POLYMARKET_ADDRESS
+    if not address:
+        raise ValueError("No wallet address (POLYMARKET_PROXY_ADDRESS)")
+    return group_redeemable(fetch_positions(address, max_age=max_age), include_worthless)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List redeemable (resolved) positions grouped by market.')
+    parser.add_argument('--address', default=None, help='Wallet address (default: POLYMARKET_PROXY_ADDRESS)')
+    parser.add_argument('--include-worthless', action='store_true', help='Also list markets whose held outcomes lost')
+    parser.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+    args = parser.parse_args()
+
+    markets = fetch_redeemable_positions(args.address, include_worthless=args.include_worthless)
+    if args.json:
+        print(json.dumps(markets, indent=2))
+        return
+    if not markets:
+        print("No redeemable positions.")
+        return
+    for m in markets:
+        flag = ' [neg-risk]' if m['negative_risk'] else ''
+        print(f"{m['value']:>10}  {m['condition_id']}  {m['title']}{flag}")
+    print(f"{len(markets)} markets, {r2(sum(m['value'] for m in markets))} USDC redeemable")
+
+
+if __name__ == '__main__':
+    main()
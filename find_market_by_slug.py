@@ -1,4 +1,3 @@
-import requests
 from typing import Dict
 import os
 from dotenv import load_dotenv
@@ -9,6 +8,7 @@ GAMMA_API = os.getenv("GAMMA_API", "https://gamma-api.polymarket.com")
 
 def find_market_by_slug(slug: str) -> Dict:
     """Query Gamma API to find market object by slug. Returns market dict or raises."""
+    import requests  # imported here so `import find_market_by_slug` stays cheap
     url = f"{GAMMA_API}/markets"
     params = {"slug": slug}
     r = requests.get(url, params=params, timeout=15)
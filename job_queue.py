@@ -0,0 +1,516 @@
+"""
+Persistent delayed-job queue for post-round tasks (redeem, take-profit sells, order cleanup, reports).
+
+Jobs are rows in a SQLite file (JOB_QUEUE_PATH) ordered by run_at through an index,
+so the next due job is one indexed lookup (a heap on disk) and nothing is lost when
+the process that scheduled it exits. A small pool of worker threads drains due jobs:
+
+- Claiming happens in one write transaction and hands the job a lease with an owner
+  token. A heartbeat renews the leases of running jobs; a job whose lease expired
+  (its worker died) is claimed again, and a late result from the old owner is ignored,
+  so a job finishes at most once. Handlers should still be idempotent, because a
+  crash between the side effect and the commit re-runs the job.
+- A dedupe key (e.g. redeem:<conditionId>) keeps a job from being scheduled twice
+  while one with the same key is pending or running.
+- Failures retry with exponential backoff up to max_attempts. A handler raises
+  RetryLater to be tried again after a given delay (e.g. market not resolved yet).
+- Batch handlers get every due job of their kind at once: all redeem jobs due
+  together go out in one batched redeem transaction.
+
+Usage:
+    python job_queue.py                          # run the worker pool forever
+    python job_queue.py --once                   # run due jobs, then exit
+    python job_queue.py --status
+    python job_queue.py --schedule report --payload '{"args": ["--summary-only"]}' --delay 60
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import argparse
+import threading
+import subprocess
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', os.path.join(PROJECT_ROOT, 'jobs.db'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 30.0
+BACKOFF_MAX = 3600.0
+LEASE_SECONDS = 300
+POLL_INTERVAL = 5.0
+BATCH_LIMIT = 50
+KEEP_DONE_SECONDS = 30 * 24 * 3600
+# Redeem 4 hours after the orders are placed, then every 30 min until resolved (up to 12h)
+REDEEM_DELAY = 4 * 60 * 60
+REDEEM_RETRY_DELAY = 30 * 60
+REDEEM_MAX_ATTEMPTS = 24
+# Take-profit jobs watch the entry orders from round start until they expire
+TAKE_PROFIT_POLL = 30
+REPORT_TIMEOUT = 30 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedupe_key TEXT,
+    created REAL NOT NULL,
+    run_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    owner TEXT,
+    lease_until REAL,
+    error TEXT,
+    result TEXT,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs(status, run_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_key ON jobs(dedupe_key)
+    WHERE dedupe_key IS NOT NULL AND status IN ('pending', 'running');
+"""
+
+# kind -> (handler, batch)
+HANDLERS = {}
+
+
+class RetryLater(Exception):
+    """Raised by a handler to run the job again after `delay` seconds.
+
+    With `payload`, the job's payload is replaced for the next run (progress of a polling job).
+    """
+
+    def __init__(self, delay, reason='retry later', payload=None):
+        super().__init__(reason)
+        self.delay = delay
+        self.payload = payload
+
+
+def register_handler(kind, batch=False):
+    """Decorator registering a job handler.
+
+    handler(payload) -> JSON-serializable result; with batch=True, handler(payloads) -> one
+    result (or Exception instance) per payload, in order.
+    """
+    def decorator(fn):
+        HANDLERS[kind] = (fn, batch)
+        return fn
+    return decorator
+
+
+def backoff_delay(attempts: int) -> float:
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempts - 1))) * random.uniform(0.8, 1.2)
+
+
+class JobQueue:
+    """SQLite-backed delayed jobs; safe to share between threads and processes."""
+
+    def __init__(self, path=JOB_QUEUE_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        # job id -> owner token, for the heartbeat
+        self._running = {}
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+    # --- scheduling ---
+    def schedule(self, kind, payload=None, delay=0.0, run_at=None, key=None, max_attempts=MAX_ATTEMPTS) -> int:
+        """Add a job; returns its id. With a key already pending/running, returns that job's id."""
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind '{kind}'. Available: {', '.join(sorted(HANDLERS))}")
+        now = time.time()
+        run_at = now + delay if run_at is None else run_at
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (kind, payload, dedupe_key, created, run_at, max_attempts) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (kind, json.dumps(payload or {}), key, now, run_at, max_attempts))
+            if cur.rowcount:
+                job_id = cur.lastrowid
+            else:
+                job_id = self._conn.execute(
+                    "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN ('pending', 'running')", (key,)).fetchone()[0]
+        self._wake.set()
+        return job_id
+
+    def cancel(self, job_id) -> bool:
+        with self._lock:
+            cur = self._conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                                     "WHERE id = ? AND status = 'pending'", (time.time(), job_id))
+        return cur.rowcount > 0
+
+    # --- claiming ---
+    def _claim(self, now):
+        """Lease the next due job (plus due peers for batch handlers). Returns (jobs, wait_seconds)."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Running jobs whose lease expired belong to a dead worker
+            for job_id, attempts, max_attempts in self._conn.execute(
+                    "SELECT id, attempts, max_attempts FROM jobs WHERE status = 'running' AND lease_until < ?",
+                    (now,)).fetchall():
+                if attempts >= max_attempts:
+                    self._conn.execute("UPDATE jobs SET status = 'failed', error = 'lease expired', owner = NULL, "
+                                       "finished_at = ? WHERE id = ?", (now, job_id))
+                else:
+                    self._conn.execute("UPDATE jobs SET status = 'pending', owner = NULL WHERE id = ?", (job_id,))
+            row = self._conn.execute(
+                "SELECT id, kind, payload, attempts, max_attempts FROM jobs WHERE status = 'pending' AND run_at <= ? "
+                "ORDER BY run_at, id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                nxt = self._conn.execute("SELECT MIN(run_at) FROM jobs WHERE status = 'pending'").fetchone()[0]
+                self._conn.execute("COMMIT")
+                return [], None if nxt is None else max(0.0, nxt - now)
+            rows = [row]
+            if HANDLERS.get(row[1], (None, False))[1]:
+                rows += self._conn.execute(
+                    "SELECT id, kind, payload, attempts, max_attempts FROM jobs WHERE status = 'pending' "
+                    "AND run_at <= ? AND kind = ? AND id != ? ORDER BY run_at, id LIMIT ?",
+                    (now, row[1], row[0], BATCH_LIMIT - 1)).fetchall()
+            owner = f"{os.getpid()}:{uuid.uuid4().hex[:12]}"
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                [(owner, now + LEASE_SECONDS, r[0]) for r in rows])
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        jobs = [{'id': r[0], 'kind': r[1], 'payload': json.loads(r[2]), 'attempt': r[3] + 1,
+                 'max_attempts': r[4], 'owner': owner} for r in rows]
+        return jobs, 0.0
+
+    def _finish(self, job, status, run_at=None, error=None, result=None, payload=None) -> bool:
+        """Record a job outcome; False when the lease was lost (another worker owns the job now)."""
+        now = time.time()
+        with self._lock:
+            if status == 'pending':
+                cur = self._conn.execute(
+                    "UPDATE jobs SET status = 'pending', run_at = ?, error = ?, owner = NULL, lease_until = NULL, "
+                    "payload = COALESCE(?, payload) WHERE id = ? AND owner = ? AND status = 'running'",
+                    (run_at, error, None if payload is None else json.dumps(payload), job['id'], job['owner']))
+            else:
+                cur = self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, result = ?, owner = NULL, lease_until = NULL, "
+                    "finished_at = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                    (status, error, None if result is None else json.dumps(result, default=str), now,
+                     job['id'], job['owner']))
+            self._running.pop(job['id'], None)
+        if not cur.rowcount:
+            logging.warning(f"Job {job['id']} ({job['kind']}): lease lost, outcome discarded")
+        return cur.rowcount > 0
+
+    def _record(self, job, outcome):
+        if isinstance(outcome, RetryLater):
+            if job['attempt'] >= job['max_attempts']:
+                self._finish(job, 'failed', error=f"{outcome} (gave up after {job['attempt']} attempts)")
+            else:
+                self._finish(job, 'pending', run_at=time.time() + outcome.delay, error=str(outcome),
+                             payload=outcome.payload)
+        elif isinstance(outcome, Exception):
+            error = f"{type(outcome).__name__}: {outcome}"
+            if job['attempt'] >= job['max_attempts']:
+                self._finish(job, 'failed', error=error)
+                logging.error(f"Job {job['id']} ({job['kind']}) failed for good: {error}")
+            else:
+                self._finish(job, 'pending', run_at=time.time() + backoff_delay(job['attempt']), error=error)
+                logging.warning(f"Job {job['id']} ({job['kind']}) attempt {job['attempt']} failed: {error}")
+        else:
+            self._finish(job, 'done', result=outcome)
+            logging.info(f"Job {job['id']} ({job['kind']}) done")
+
+    def run_one(self):
+        """Claim and run the next due job(s). Returns (jobs_run, wait_seconds_until_next)."""
+        with self._lock:
+            jobs, wait = self._claim(time.time())
+            for job in jobs:
+                self._running[job['id']] = job['owner']
+        if not jobs:
+            return 0, wait
+        handler, batch = HANDLERS.get(jobs[0]['kind'], (None, False))
+        if handler is None:
+            for job in jobs:
+                self._finish(job, 'failed', error=f"no handler for '{job['kind']}'")
+            return len(jobs), 0.0
+        if batch:
+            try:
+                outcomes = handler([job['payload'] for job in jobs])
+                if len(outcomes) != len(jobs):
+                    raise RuntimeError(f"handler returned {len(outcomes)} outcomes for {len(jobs)} jobs")
+            except Exception as e:
+                outcomes = [e] * len(jobs)
+        else:
+            try:
+                outcomes = [handler(jobs[0]['payload'])]
+            except Exception as e:
+                outcomes = [e]
+        for job, outcome in zip(jobs, outcomes):
+            self._record(job, outcome)
+        return len(jobs), 0.0
+
+    def drain(self, timeout=None) -> int:
+        """Run due jobs until none is due (or timeout passes). Returns the number of jobs run."""
+        deadline = None if timeout is None else time.time() + timeout
+        total = 0
+        while deadline is None or time.time() < deadline:
+            ran, _ = self.run_one()
+            if not ran:
+                break
+            total += ran
+        return total
+
+    # --- worker pool (long-running processes) ---
+    def start(self, workers=JOB_WORKERS):
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+                         for i in range(max(1, workers))]
+        self._threads.append(threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout=10):
+        if self._threads:
+            self._stop.set()
+            self._wake.set()
+            for t in self._threads:
+                t.join(timeout=timeout)
+            self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                ran, wait = self.run_one()
+            except Exception as e:
+                logging.error(f"Job queue error: {e}")
+                ran, wait = 0, POLL_INTERVAL
+            if not ran:
+                # Jobs scheduled by other processes are picked up within POLL_INTERVAL
+                self._wake.wait(min(POLL_INTERVAL, POLL_INTERVAL if wait is None else wait) or 0.05)
+                self._wake.clear()
+
+    def _heartbeat(self):
+        while not self._stop.wait(LEASE_SECONDS / 3):
+            with self._lock:
+                if self._running:
+                    self._conn.executemany(
+                        "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                        [(time.time() + LEASE_SECONDS, i, owner) for i, owner in self._running.items()])
+
+    # --- inspection ---
+    def prune(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < ?",
+                               (time.time() - KEEP_DONE_SECONDS,))
+
+    def jobs(self, status=None, limit=50) -> list[dict]:
+        sql = "SELECT id, kind, payload, status, run_at, attempts, error FROM jobs"
+        params = []
+        if status:
+            sql += " WHERE status = ?"
+            params.append(status)
+        sql += " ORDER BY run_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{'id': r[0], 'kind': r[1], 'payload': json.loads(r[2]), 'status': r[3], 'run_at': r[4],
+                 'attempts': r[5], 'error': r[6]} for r in rows]
+
+    def status(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+            nxt = self._conn.execute("SELECT MIN(run_at) FROM jobs WHERE status = 'pending'").fetchone()[0]
+        return {**{s: counts.get(s, 0) for s in ('pending', 'running', 'done', 'failed', 'cancelled')},
+                'next_in': None if nxt is None else max(0, int(nxt - time.time()))}
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+        return _default_queue
+
+
+def schedule_redeem(condition_id, slug=None, delay=REDEEM_DELAY) -> int:
+    """Schedule a redeem for one market (once per conditionId while pending)."""
+    return get_queue().schedule('redeem', {'condition_id': condition_id, 'slug': slug}, delay=delay,
+                                key=f"redeem:{condition_id.lower()}", max_attempts=REDEEM_MAX_ATTEMPTS)
+
+
+def schedule_take_profit(slug, order_ids, strategy, start_time_str) -> int:
+    """Watch a market's entry orders from round start and sell what fills at the strategy's take-profit."""
+    from order_specs_generator import generate_specs, get_strategy
+    strat = get_strategy(strategy)
+    until = generate_specs(start_time_str, strat['name'])[0]['expiration']
+    run_at = max(time.time(), until - strat['cancel_minutes'] * 60)
+    return get_queue().schedule(
+        'take_profit', {'slug': slug, 'strategy': strat['name'], 'order_ids': list(order_ids), 'until': until,
+                        'covered': {}},
+        run_at=run_at, key=f"take_profit:{slug}", max_attempts=int((until - run_at) / TAKE_PROFIT_POLL) + 10)
+
+
+_clob_client = None
+_clob_lock = threading.Lock()
+
+
+def get_clob_client():
+    """CLOB client shared by this process's handlers (deriving API creds is slow)."""
+    global _clob_client
+    with _clob_lock:
+        if _clob_client is None:
+            from order import prepare_client
+            _clob_client = prepare_client()
+        return _clob_client
+
+
+# --- built-in handlers ---
+@register_handler('redeem', batch=True)
+def redeem_job(payloads):
+    # web3 is only needed by workers that actually redeem
+    from redeem_all import run_once
+    cids = [p['condition_id'].lower() for p in payloads]
+    result = run_once(condition_ids=cids)
+    pending = set(result['pending'])
+    failed = {m['condition_id'].lower(): reason for m, reason in result['failed']}
+    txs = {m['condition_id'].lower(): t['tx'] for t in result['txs'] for m in t['markets']}
+    skipped = {m['condition_id'].lower(): reason for m, reason in result['skipped']}
+    outcomes = []
+    for cid in cids:
+        if cid in pending:
+            outcomes.append(RetryLater(REDEEM_RETRY_DELAY, 'market not redeemable yet'))
+        elif cid in failed:
+            outcomes.append(RuntimeError(failed[cid]))
+        elif cid in skipped:
+            outcomes.append({'skipped': skipped[cid]})
+        else:
+            outcomes.append({'tx': txs.get(cid)})
+    return outcomes
+
+
+@register_handler('take_profit')
+def take_profit_job(payload):
+    """Post a take-profit sell for every newly filled entry order; polls until the entries expire.
+
+    payload['covered'] maps order id -> shares already covered by a sell, so each fill is
+    sold once even though the job runs many times.
+    """
+    from order import build_orders, post_batch_orders, extract_order_ids
+    from order_specs_generator import take_profit_spec, MIN_ORDER_SIZE
+    client = get_clob_client()
+    covered = dict(payload.get('covered') or {})
+    waiting = False
+    for order_id in payload['order_ids']:
+        order = client.get_order(order_id) or {}
+        size = int(float(order.get('size_matched') or 0)) - covered.get(order_id, 0)
+        if size < MIN_ORDER_SIZE:
+            continue
+        spec = take_profit_spec(None, float(order['price']), size, payload['strategy'])
+        if spec is None:
+            return {'covered': covered}
+        spec['token_id'] = order['asset_id']
+        resp = post_batch_orders(client, build_orders(client, [], [spec]), order_ids_file=None)
+        if extract_order_ids(resp):
+            covered[order_id] = covered.get(order_id, 0) + size
+            logging.info(f"Take-profit for {payload['slug']}: sell {size} @ {spec['price']}")
+        else:
+            # e.g. the fill hasn't settled yet; try again on the next poll
+            waiting = True
+    if waiting or time.time() < payload['until']:
+        raise RetryLater(TAKE_PROFIT_POLL, 'entry orders still open', payload={**payload, 'covered': covered})
+    return {'covered': covered}
+
+
+@register_handler('cancel_orders')
+def cancel_orders_job(payload):
+    """Cancel the orders listed in the payload, or placed for a market slug (order_ids/ file)."""
+    import cancel_orders
+    order_ids = payload.get('order_ids')
+    if order_ids is None:
+        path = os.path.join(PROJECT_ROOT, cancel_orders.ORDER_IDS_DIR, f"placed_order_ids_{payload['slug']}.txt")
+        if not os.path.exists(path):
+            return {'cancelled': 0}
+        with open(path) as f:
+            order_ids = [line.strip() for line in f if line.strip()]
+    if order_ids:
+        cancel_orders.cancel_orders(cancel_orders.prepare_client(), order_ids)
+    return {'cancelled': len(order_ids)}
+
+
+@register_handler('report')
+def report_job(payload):
+    """Run notification/send_reports.py with the payload's args (e.g. ["--summary-only"])."""
+    cmd = [sys.executable, os.path.join(PROJECT_ROOT, 'notification', 'send_reports.py'), *payload.get('args', [])]
+    proc = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=REPORT_TIMEOUT)
+    if proc.returncode != 0:
+        raise RuntimeError(f"send_reports exited {proc.returncode}: {proc.stderr.strip()[-500:]}")
+    return {'args': payload.get('args', [])}
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    parser = argparse.ArgumentParser(description='Run or manage the delayed job queue.')
+    parser.add_argument('--workers', type=int, default=JOB_WORKERS, help='Worker threads')
+    parser.add_argument('--once', action='store_true', help='Run due jobs, then exit')
+    parser.add_argument('--status', action='store_true', help='Show job counts and exit')
+    parser.add_argument('--list', nargs='?', const='', metavar='STATUS', help='List recent jobs (optionally by status)')
+    parser.add_argument('--schedule', metavar='KIND', help=f"Schedule a job ({', '.join(sorted(HANDLERS))})")
+    parser.add_argument('--payload', default='{}', help='Job payload as JSON')
+    parser.add_argument('--delay', type=float, default=0, help='Seconds until the job is due')
+    parser.add_argument('--key', default=None, help='Dedupe key')
+    parser.add_argument('--cancel', type=int, metavar='ID', help='Cancel a pending job')
+    args = parser.parse_args()
+
+    queue = get_queue()
+    if args.status:
+        print(queue.status())
+        return
+    if args.list is not None:
+        for job in queue.jobs(args.list or None):
+            due = time.strftime('%Y-%m-%d %H:%M', time.localtime(job['run_at']))
+            print(f"{job['id']:>6}  {job['status']:<9}  {due}  {job['kind']:<14} {json.dumps(job['payload'])}"
+                  f"{'  ' + job['error'] if job['error'] else ''}")
+        return
+    if args.schedule:
+        job_id = queue.schedule(args.schedule, json.loads(args.payload), delay=args.delay, key=args.key)
+        print(f"Scheduled job {job_id}")
+        return
+    if args.cancel is not None:
+        print('Cancelled' if queue.cancel(args.cancel) else 'Not pending')
+        return
+    queue.prune()
+    if args.once:
+        print(f"Ran {queue.drain()} jobs; {queue.status()}")
+        return
+    queue.start(args.workers)
+    print(f"Job workers running ({args.workers}) on {queue.path}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        queue.stop()
+
+
+if __name__ == '__main__':
+    main()
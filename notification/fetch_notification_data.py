@@ -4,6 +4,7 @@ import json
 import time
 from datetime import datetime, timezone
 from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait
 
 # Add project root to path for utils import
 CURRENT_DIR = os.path.dirname(__file__)
@@ -12,6 +13,8 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from utils.common import r2
+from notification.rpc_pool import get_pool
+from notification.timeseries import TimeSeriesStore, TIMESERIES_PATH
 
 import requests
 from zoneinfo import ZoneInfo
@@ -25,16 +28,17 @@ VALUE_API = "https://data-api.polymarket.com/value"
 
 SESSION = requests.Session()
 DEFAULT_TIMEOUT = 15
+# generate_summary waits at most this long for all sources together
+SUMMARY_DEADLINE = float(os.getenv("SUMMARY_DEADLINE", "20"))
 
-# On-chain (Polygon) USDC details
-POLYGON_RPC = os.getenv("POLYGON_RPC", "https://polygon-rpc.com")
+# On-chain (Polygon) USDC details; RPC endpoints come from rpc_pool (POLYGON_RPCS / POLYGON_RPC)
 USDC_ADDRESS = (os.getenv("USDC_ADDRESS") or "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174").lower()
 USDC_DECIMALS = 6
 
 
-def fetch_json(url: str, params: dict) -> Optional[object]:
+def fetch_json(url: str, params: dict, timeout: float = DEFAULT_TIMEOUT) -> Optional[object]:
     try:
-        r = SESSION.get(url, params=params, timeout=DEFAULT_TIMEOUT)
+        r = SESSION.get(url, params=params, timeout=timeout)
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -42,13 +46,13 @@ def fetch_json(url: str, params: dict) -> Optional[object]:
         return None
 
 
-def get_latest_pnl(address: str) -> Optional[float]:
+def get_latest_pnl(address: str, timeout: float = DEFAULT_TIMEOUT) -> Optional[float]:
     params = {
         'user_address': address,
         'interval': 'all',
         'fidelity': '1d'
     }
-    data = fetch_json(PNL_API, params)
+    data = fetch_json(PNL_API, params, timeout)
     if not isinstance(data, list) or not data:
         return None
     # Assume list sorted ascending by time; take last
@@ -57,11 +61,11 @@ def get_latest_pnl(address: str) -> Optional[float]:
     return float(p) if isinstance(p, (int, float)) else 0
 
 
-def get_pending_claimable(address: str) -> Optional[float]:
+def get_pending_claimable(address: str, timeout: float = DEFAULT_TIMEOUT) -> Optional[float]:
     params = {
         'user': address
     }
-    data = fetch_json(VALUE_API, params)
+    data = fetch_json(VALUE_API, params, timeout)
     if not isinstance(data, list) or not data:
         return None
     item = data[0]
@@ -88,7 +92,7 @@ def _build_balance_of_call(wallet_address: str) -> str:
     return '0x' + sig + ('0' * 24) + wallet_clean
 
 
-def _eth_call_balance(token_address: str, wallet_address: str) -> Optional[int]:
+def _eth_call_balance(token_address: str, wallet_address: str, timeout: float = DEFAULT_TIMEOUT) -> Optional[int]:
     try:
         payload = {
             'jsonrpc': '2.0',
@@ -102,9 +106,8 @@ def _eth_call_balance(token_address: str, wallet_address: str) -> Optional[int]:
                 'latest'
             ]
         }
-        r = requests.post(POLYGON_RPC, json=payload, timeout=15)
-        r.raise_for_status()
-        js = r.json()
+        # Hedged across the pool's healthiest endpoints; raises only if all of them fail
+        js = get_pool().post(payload, deadline=timeout)
         if 'error' in js:
             raise RuntimeError(js['error'])
         raw_hex = js.get('result')
@@ -116,8 +119,8 @@ def _eth_call_balance(token_address: str, wallet_address: str) -> Optional[int]:
         return None
 
 
-def get_usdc_balance(address: str) -> Optional[float]:
-    raw = _eth_call_balance(USDC_ADDRESS, address)
+def get_usdc_balance(address: str, timeout: float = DEFAULT_TIMEOUT) -> Optional[float]:
+    raw = _eth_call_balance(USDC_ADDRESS, address, timeout)
     if raw is None:
         return None
     return raw / (10 ** USDC_DECIMALS)
@@ -134,12 +137,71 @@ def main():
     _write_summary(summary)
 
 
-def generate_summary(address: str = None) -> dict:
+# source name -> fetcher(address, timeout); fetchers return None on error
+SUMMARY_SOURCES = {
+    'pnl': get_latest_pnl,
+    'value': get_pending_claimable,
+    'usdc': get_usdc_balance,
+}
+
+
+def fetch_sources(address: str, deadline: float = SUMMARY_DEADLINE) -> tuple[dict, dict, dict]:
+    """Fetch every SUMMARY_SOURCES entry concurrently within one overall deadline.
+
+    Returns (values, latency_ms, errors). A source that fails or misses the deadline
+    has value None and an entry in errors ('error' or 'timeout').
+    """
+    timeout = min(DEFAULT_TIMEOUT, deadline)
+    started = time.perf_counter()
+    finished_at = {}
+
+    def timed(name, fetcher):
+        try:
+            return fetcher(address, timeout)
+        finally:
+            finished_at[name] = time.perf_counter()
+
+    pool = ThreadPoolExecutor(max_workers=len(SUMMARY_SOURCES))
+    futures = {name: pool.submit(timed, name, fetcher) for name, fetcher in SUMMARY_SOURCES.items()}
+    wait(futures.values(), timeout=deadline)
+    # Don't wait for stragglers; their own request timeout still bounds them
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    values, latency_ms, errors = {}, {}, {}
+    for name, future in futures.items():
+        if not future.done():
+            values[name] = None
+            errors[name] = 'timeout'
+            latency_ms[name] = int(deadline * 1000)
+            continue
+        try:
+            values[name] = future.result()
+        except Exception as e:
+            print(f"Error fetching {name}: {e}")
+            values[name] = None
+        if values[name] is None:
+            errors[name] = 'error'
+        latency_ms[name] = int((finished_at.get(name, time.perf_counter()) - started) * 1000)
+    return values, latency_ms, errors
+
+
+def generate_summary(address: str = None, deadline: float = SUMMARY_DEADLINE, record: bool = True) -> dict:
+    """Balance / profit / claimable summary; missing sources are listed rather than read as 0.
+
+    record=False (dry runs) still reports the 24h changes but doesn't store the sample.
+    """
     address = address or POLYMARKET_ADDRESS
-    latest_pnl = get_latest_pnl(address)
-    pending_claimable = get_pending_claimable(address)
-    usdc_balance = get_usdc_balance(address)
-    total_balance = (usdc_balance or 0) + (pending_claimable or 0)
+    values, latency_ms, errors = fetch_sources(address, deadline)
+    latest_pnl = values['pnl']
+    pending_claimable = values['value']
+    usdc_balance = values['usdc']
+    # Without the wallet balance the total would be misleading, so report it as unknown
+    total_balance = None if usdc_balance is None else usdc_balance + (pending_claimable or 0)
+    print('Summary sources: ' + ', '.join(
+        f"{name} {latency_ms[name]}ms" + (f" ({errors[name]})" if name in errors else '')
+        for name in SUMMARY_SOURCES))
+    changes = _record_sample({'usdc': usdc_balance, 'claimable': pending_claimable,
+                              'pnl': latest_pnl, 'balance': total_balance}, record)
     gmt7 = ZoneInfo('Asia/Bangkok')
     retrieved_local = datetime.now(gmt7).strftime('%Y-%m-%d %H:%M:%S GMT+7')
     return {
@@ -147,8 +209,35 @@ def generate_summary(address: str = None) -> dict:
         'balance': r2(total_balance, 1),
         'profit': r2(latest_pnl, 1),
         'pending_claimable': r2(pending_claimable, 1),
+        'balance_24h': changes.get('balance'),
+        'profit_24h': changes.get('pnl'),
+        'missing': errors,
+        'latency_ms': latency_ms,
     }
 
+
+def _record_sample(values: dict, record: bool = True) -> dict:
+    """Append to the time-series store (if record); returns 24h changes of balance and pnl where known."""
+    if not record and not os.path.exists(TIMESERIES_PATH):
+        return {}
+    try:
+        store = TimeSeriesStore()
+        try:
+            now = int(time.time())
+            if record:
+                store.append(now, values)
+                return {name: store.change(name, 24 * 3600, now) for name in ('balance', 'pnl')}
+            changes = {}
+            for name in ('balance', 'pnl'):
+                past = store.latest(name, now - 24 * 3600 + 1)
+                changes[name] = None if values.get(name) is None or past is None else r2(values[name] - past[1])
+            return changes
+        finally:
+            store.close()
+    except Exception as e:
+        print(f"Warning: could not update time-series store: {e}")
+        return {}
+
 def _write_summary(summary: dict):
     out_dir = os.path.dirname(__file__)
     combined_path = os.path.join(out_dir, 'combined_notification_data.json')
@@ -0,0 +1,132 @@
+"""
+Lightweight balance / PnL monitor.
+
+Every MONITOR_INTERVAL seconds it fetches the summary sources (PnL API, value API,
+USDC balance) concurrently and appends them to the time-series store as the series
+usdc, claimable, pnl and balance (usdc + claimable). Sources that fail are skipped,
+leaving a gap instead of a fake 0. After each sample the alert thresholds are checked
+and a Telegram alert is queued (coalesced with other alerts in the same window through
+telegram_queue), at most once per ALERT_COOLDOWN per alert:
+- ALERT_MIN_BALANCE: balance below this value
+- ALERT_MAX_DROP: balance dropped more than this below its high of the last
+  ALERT_WINDOW seconds
+
+Usage:
+    python notification/monitor.py                 # run forever
+    python notification/monitor.py --once --dry-run
+"""
+
+import os
+import sys
+import time
+import argparse
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from utils.common import r2  # noqa: E402
+from notification.fetch_notification_data import fetch_sources, POLYMARKET_ADDRESS  # noqa: E402
+from notification.timeseries import TimeSeriesStore  # noqa: E402
+from notification.telegram_queue import get_queue  # noqa: E402
+
+MONITOR_INTERVAL = int(os.getenv('MONITOR_INTERVAL', '60'))
+ALERT_MIN_BALANCE = float(os.getenv('ALERT_MIN_BALANCE')) if os.getenv('ALERT_MIN_BALANCE') else None
+ALERT_MAX_DROP = float(os.getenv('ALERT_MAX_DROP')) if os.getenv('ALERT_MAX_DROP') else None
+ALERT_WINDOW = int(os.getenv('ALERT_WINDOW', '3600'))
+ALERT_COOLDOWN = int(os.getenv('ALERT_COOLDOWN', '3600'))
+
+
+def take_sample(store: TimeSeriesStore, address: str, deadline: float, now=None) -> dict:
+    """Fetch the sources once and append them; returns the sampled values."""
+    values, latency_ms, errors = fetch_sources(address, deadline)
+    usdc, claimable = values['usdc'], values['value']
+    sample = {
+        'usdc': usdc,
+        'claimable': claimable,
+        'pnl': values['pnl'],
+        'balance': None if usdc is None else usdc + (claimable or 0),
+    }
+    store.append(int(time.time()) if now is None else now, sample)
+    if errors:
+        print(f"Monitor: missing {', '.join(f'{k} ({v})' for k, v in errors.items())}")
+    return sample
+
+
+def check_alerts(store: TimeSeriesStore, now: int, min_balance=ALERT_MIN_BALANCE,
+                 max_drop=ALERT_MAX_DROP, window=ALERT_WINDOW) -> dict:
+    """{alert_name: message} for every threshold the latest balance crosses."""
+    alerts = {}
+    latest = store.latest('balance')
+    if latest is None:
+        return alerts
+    balance = latest[1]
+    if min_balance is not None and balance < min_balance:
+        alerts['min_balance'] = f"Balance {r2(balance)} is below {r2(min_balance)}"
+    if max_drop is not None:
+        recent = store.downsample('balance', now - window, now + 1, window + 1)
+        if recent['max']:
+            high = max(recent['max'])
+            if high - balance > max_drop:
+                alerts['drop'] = (f"Balance dropped {r2(high - balance)} in the last {window // 60} min "
+                                  f"({r2(high)} -> {r2(balance)})")
+    return alerts
+
+
+def tick(store: TimeSeriesStore, address: str, deadline: float, last_sent: dict, queue=None, dry_run=False) -> dict:
+    """One sample plus alert check; last_sent ({alert: ts}) carries the cooldown between ticks."""
+    sample = take_sample(store, address, deadline=deadline)
+    now = int(time.time())
+    print(f"{time.strftime('%H:%M:%S')} balance={r2(sample['balance'])} pnl={r2(sample['pnl'])}")
+    for name, message in check_alerts(store, now).items():
+        if now - last_sent.get(name, 0) < ALERT_COOLDOWN:
+            continue
+        last_sent[name] = now
+        if dry_run or queue is None:
+            print(f"[DRY] Would alert: {message}")
+        else:
+            queue.enqueue_message(f"⚠️ {message}", coalesce_key='alert')
+    return sample
+
+
+def run(interval=MONITOR_INTERVAL, once=False, dry_run=False, address=None):
+    address = address or POLYMARKET_ADDRESS
+    store = TimeSeriesStore()
+    last_sent = {}
+    queue = None
+    if not dry_run:
+        queue = get_queue()
+        if not queue.token:
+            print('Telegram credentials missing; alerts stay in the spool.')
+        elif not once:
+            # Delivers queued alerts (and anything left in the spool) in the background
+            queue.start()
+    print(f"Monitoring {address} every {interval}s -> {store.path}")
+    while True:
+        started = time.time()
+        try:
+            tick(store, address, interval * 0.8, last_sent, queue, dry_run)
+        except Exception as e:
+            print(f"Monitor error: {e}")
+        if once:
+            if queue is not None and queue.token:
+                queue.flush(queue.coalesce_window + 30)
+            return
+        time.sleep(max(0.0, interval - (time.time() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sample balance / PnL into the time-series store and alert on thresholds.')
+    parser.add_argument('--interval', type=int, default=MONITOR_INTERVAL, help='Seconds between samples')
+    parser.add_argument('--once', action='store_true', help='Take one sample and exit')
+    parser.add_argument('--dry-run', action='store_true', help='Print alerts instead of sending them')
+    args = parser.parse_args()
+    try:
+        run(args.interval, args.once, args.dry_run)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
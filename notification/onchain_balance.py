@@ -1,7 +1,6 @@
 import os
 import sys
 import json
-import requests
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -43,6 +42,7 @@ def eth_call(rpc_url: str, to: str, data: str, timeout: int = 15) -> str:
             "latest"
         ]
     }
+    import requests
     r = requests.post(rpc_url, json=payload, timeout=timeout)
     r.raise_for_status()
     out = r.json()
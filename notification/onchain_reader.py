@@ -0,0 +1,235 @@
+"""
+Batched on-chain balance reader (Polygon).
+
+Reads many balances in as few round trips as possible:
+- multicall: all calls packed into one Multicall3 aggregate3 eth_call (chunked by
+  MULTICALL_CHUNK); failures are per call (allowFailure=true).
+- batch: one JSON-RPC batch request of plain eth_call entries (chunked by BATCH_CHUNK),
+  for RPCs or chains without Multicall3.
+- auto (default): multicall, falling back to batch if the aggregate call itself fails.
+
+Supported reads are ERC-20 balanceOf(address) (USDC) and ERC-1155 balanceOf(address, id)
+(Polymarket CTF position tokens), for any number of wallets. ABI encoding/decoding is
+done by hand on one bytes buffer per response, so there is no per-call client overhead.
+Requests go through the rpc_pool endpoint pool (hedging, failover) unless an explicit
+RPC URL is given, so a local stub server can stand in for Polygon.
+
+Usage:
+    python notification/onchain_reader.py --wallets 0xabc...,0xdef...
+    python notification/onchain_reader.py --wallets 0xabc... --token-ids 1234,5678 --mode batch
+"""
+
+import os
+import sys
+import json
+import argparse
+from typing import NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from notification.onchain_balance import normalize_address, USDC_ADDRESS, USDC_DECIMALS  # noqa: E402
+from notification.rpc_pool import get_pool  # noqa: E402
+
+load_dotenv()
+
+# Multicall3 is deployed at the same address on every major chain, Polygon included
+MULTICALL3_ADDRESS = "0xca11bde05977b3631167028862be2a173976ca11"
+# Polymarket Conditional Tokens (ERC-1155 outcome positions)
+CTF_ADDRESS = "0x4d97dcd97ec945f40cf65f87097ace5ea0476045"
+CTF_DECIMALS = 6
+
+ERC20_BALANCE_OF = "70a08231"     # balanceOf(address)
+ERC1155_BALANCE_OF = "00fdd58e"   # balanceOf(address,uint256)
+AGGREGATE3 = "82ad56cb"           # aggregate3((address,bool,bytes)[])
+
+MULTICALL_CHUNK = 500
+BATCH_CHUNK = 100
+DEFAULT_TIMEOUT = 15
+READ_MODES = ('auto', 'multicall', 'batch')
+
+
+class BalanceQuery(NamedTuple):
+    key: tuple        # caller's label, e.g. (wallet, 'usdc') or (wallet, token_id)
+    to: str           # contract address (lowercase 0x...)
+    data: str         # calldata hex without 0x
+    decimals: int
+
+
+def _word(value: int) -> str:
+    return format(value, '064x')
+
+
+def _address_word(address: str) -> str:
+    return normalize_address(address)[2:].rjust(64, '0')
+
+
+def erc20_balance_query(token: str, wallet: str, decimals: int = USDC_DECIMALS, key=None) -> BalanceQuery:
+    return BalanceQuery(key or (wallet, token), normalize_address(token),
+                        ERC20_BALANCE_OF + _address_word(wallet), decimals)
+
+
+def ctf_balance_query(wallet: str, token_id, ctf: str = CTF_ADDRESS, decimals: int = CTF_DECIMALS,
+                      key=None) -> BalanceQuery:
+    token_id = int(token_id)
+    return BalanceQuery(key or (wallet, str(token_id)), normalize_address(ctf),
+                        ERC1155_BALANCE_OF + _address_word(wallet) + _word(token_id), decimals)
+
+
+def encode_aggregate3(calls, allow_failure=True) -> str:
+    """Calldata (hex, no 0x) for aggregate3 over [(to, data_hex), ...]."""
+    n = len(calls)
+    heads, tails, offset = [], [], 32 * n
+    for to, data in calls:
+        size = len(data) // 2
+        padded = data + '0' * (-len(data) % 64)
+        # (address target, bool allowFailure, bytes callData): 3 head words + length + data
+        tail = _address_word(to) + _word(1 if allow_failure else 0) + _word(96) + _word(size) + padded
+        heads.append(_word(offset))
+        tails.append(tail)
+        offset += len(tail) // 2
+    return AGGREGATE3 + _word(32) + _word(n) + ''.join(heads) + ''.join(tails)
+
+
+def decode_aggregate3(result_hex: str) -> list[Optional[bytes]]:
+    """Decode aggregate3's (bool success, bytes returnData)[]; failed calls become None."""
+    buf = bytes.fromhex(result_hex[2:] if result_hex.startswith('0x') else result_hex)
+    base = int.from_bytes(buf[0:32], 'big')
+    n = int.from_bytes(buf[base:base + 32], 'big')
+    items = base + 32
+    out = []
+    for i in range(n):
+        pos = items + int.from_bytes(buf[items + 32 * i:items + 32 * i + 32], 'big')
+        success = buf[pos + 31] == 1
+        data_pos = pos + int.from_bytes(buf[pos + 32:pos + 64], 'big')
+        size = int.from_bytes(buf[data_pos:data_pos + 32], 'big')
+        out.append(buf[data_pos + 32:data_pos + 32 + size] if success else None)
+    return out
+
+
+def _uint(data) -> Optional[int]:
+    if data is None or len(data) < 32:
+        return None
+    return int.from_bytes(data[:32], 'big')
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class OnchainReader:
+    """Batched eth_call reader over the RPC pool, or one HTTP session to a fixed rpc_url."""
+
+    def __init__(self, rpc_url: str = None, timeout: float = DEFAULT_TIMEOUT,
+                 multicall_address: str = MULTICALL3_ADDRESS, session=None, pool=None):
+        self.rpc_url = rpc_url
+        self.timeout = timeout
+        self.multicall_address = normalize_address(multicall_address)
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.session = session
+        self.pool = pool
+        self._next_id = 0
+
+    def _post(self, payload):
+        if self.rpc_url is None:
+            return (self.pool or get_pool()).post(payload, deadline=self.timeout)
+        r = self.session.post(self.rpc_url, json=payload, timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def _call_payload(self, to, data):
+        self._next_id += 1
+        return {'jsonrpc': '2.0', 'id': self._next_id, 'method': 'eth_call',
+                'params': [{'to': to, 'data': '0x' + data}, 'latest']}
+
+    def eth_call_batch(self, calls) -> list[Optional[bytes]]:
+        """eth_call every (to, data_hex) in JSON-RPC batches; per-call errors become None."""
+        out = []
+        for chunk in _chunks(list(calls), BATCH_CHUNK):
+            payloads = [self._call_payload(to, data) for to, data in chunk]
+            response = self._post(payloads)
+            if not isinstance(response, list):
+                raise RuntimeError(f"RPC rejected batch: {response.get('error', response)}")
+            # Servers may answer a batch in any order
+            by_id = {item.get('id'): item for item in response}
+            for p in payloads:
+                result = by_id.get(p['id'], {}).get('result')
+                out.append(bytes.fromhex(result[2:]) if isinstance(result, str) and result.startswith('0x') else None)
+        return out
+
+    def multicall(self, calls, allow_failure=True) -> list[Optional[bytes]]:
+        """Run every (to, data_hex) through Multicall3 aggregate3, MULTICALL_CHUNK calls per eth_call."""
+        out = []
+        for chunk in _chunks(list(calls), MULTICALL_CHUNK):
+            response = self._post(self._call_payload(self.multicall_address, encode_aggregate3(chunk, allow_failure)))
+            if 'error' in response:
+                raise RuntimeError(response['error'])
+            result = response.get('result')
+            if not result or result == '0x':
+                raise RuntimeError("Empty aggregate3 result (is Multicall3 deployed?)")
+            out.extend(decode_aggregate3(result))
+        return out
+
+    def read(self, calls, mode='auto') -> list[Optional[bytes]]:
+        if mode not in READ_MODES:
+            raise ValueError(f"Unknown mode '{mode}'. Available: {', '.join(READ_MODES)}")
+        if mode == 'batch':
+            return self.eth_call_batch(calls)
+        try:
+            return self.multicall(calls)
+        except Exception as e:
+            if mode == 'multicall':
+                raise
+            print(f"Warning: multicall failed ({e}); falling back to JSON-RPC batch")
+            return self.eth_call_batch(calls)
+
+    def read_balances(self, queries, mode='auto') -> dict:
+        """{query.key: {'raw': int, 'human': float}} (None for calls that failed)."""
+        queries = list(queries)
+        results = self.read([(q.to, q.data) for q in queries], mode)
+        out = {}
+        for q, data in zip(queries, results):
+            raw = _uint(data)
+            out[q.key] = None if raw is None else {'raw': raw, 'human': raw / (10 ** q.decimals)}
+        return out
+
+
+def wallet_balance_queries(wallets, token_ids=(), token: str = USDC_ADDRESS) -> list[BalanceQuery]:
+    """USDC balance plus one CTF position balance per token id, for every wallet."""
+    queries = []
+    for wallet in wallets:
+        wallet = normalize_address(wallet)
+        queries.append(erc20_balance_query(token, wallet, key=(wallet, 'usdc')))
+        queries.extend(ctf_balance_query(wallet, t) for t in token_ids)
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read USDC and CTF position balances for many wallets in one round trip.')
+    parser.add_argument('--wallets', default=os.getenv('POLYMARKET_PROXY_ADDRESS') or '', help='Comma separated wallet addresses')
+    parser.add_argument('--token-ids', default='', help='Comma separated CTF position token ids')
+    parser.add_argument('--mode', choices=READ_MODES, default='auto')
+    parser.add_argument('--rpc', default=None, help='Fixed RPC URL (default: the rpc_pool endpoints)')
+    args = parser.parse_args()
+
+    wallets = [w.strip() for w in args.wallets.split(',') if w.strip()]
+    if not wallets:
+        print("No wallets given (--wallets or POLYMARKET_PROXY_ADDRESS).")
+        sys.exit(1)
+    token_ids = [t.strip() for t in args.token_ids.split(',') if t.strip()]
+    balances = OnchainReader(args.rpc).read_balances(wallet_balance_queries(wallets, token_ids), args.mode)
+    out = {}
+    for (wallet, label), bal in balances.items():
+        out.setdefault(wallet, {})[label] = None if bal is None else bal['human']
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == '__main__':
+    main()
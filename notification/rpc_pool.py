@@ -0,0 +1,299 @@
+"""
+Polygon JSON-RPC endpoint pool with latency routing, hedging and circuit breakers.
+
+Endpoints come from POLYGON_RPCS (comma separated) or POLYGON_RPC plus a few public
+fallbacks. Every request goes to the endpoint with the best score (EWMA latency
+weighted by EWMA error rate). If it hasn't answered within its hedge delay (a multiple
+of its usual latency), the same request is sent to the next endpoint and the first
+answer wins. Transport errors fail over to the next endpoint. Only when every endpoint
+fails within the deadline is RpcError raised, so callers never confuse "no answer"
+with a zero balance.
+
+An endpoint that fails FAILURE_THRESHOLD times in a row is opened (skipped) for a
+cooldown that doubles on each repeated trip. After the cooldown a copy of the next
+request is sent to it as a single background trial (half-open), which closes the
+breaker on success. probe() measures every endpoint with eth_blockNumber and also trips
+endpoints lagging MAX_BLOCK_LAG blocks behind. The shared pool runs its first probe in
+the background, so a hanging endpoint never delays the first request.
+
+Usage:
+    python notification/rpc_pool.py            # probe endpoints and print their state
+"""
+
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PUBLIC_POLYGON_RPCS = [
+    "https://polygon-rpc.com",
+    "https://polygon-bor-rpc.publicnode.com",
+    "https://polygon.drpc.org",
+    "https://1rpc.io/matic",
+]
+REQUEST_TIMEOUT = 10
+DEADLINE = 15
+EWMA_ALPHA = 0.2
+DEFAULT_LATENCY = 0.5
+ERROR_PENALTY = 4
+HEDGE_FACTOR = 3
+HEDGE_MIN_DELAY = 0.2
+MAX_IN_FLIGHT = 2
+FAILURE_THRESHOLD = 3
+COOLDOWN = 30
+MAX_COOLDOWN = 300
+MAX_BLOCK_LAG = 20
+
+_thread_local = threading.local()
+
+
+def configured_rpcs() -> list[str]:
+    urls = [u.strip() for u in os.getenv("POLYGON_RPCS", "").split(',') if u.strip()]
+    if not urls:
+        primary = os.getenv("POLYGON_RPC")
+        urls = ([primary] if primary else []) + PUBLIC_POLYGON_RPCS
+    return list(dict.fromkeys(urls))
+
+
+class RpcError(RuntimeError):
+    """Every endpoint failed or the deadline passed."""
+
+
+class Endpoint:
+    """Latency / error statistics and circuit breaker state for one RPC URL."""
+
+    def __init__(self, url):
+        self.url = url
+        self.latency = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.cooldown = COOLDOWN
+        self.open_until = 0.0
+        self.trial_in_flight = False
+        self.block = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.open_until == 0.0:
+            return 'closed'
+        return 'open' if time.monotonic() < self.open_until else 'half-open'
+
+    def score(self) -> float:
+        latency = DEFAULT_LATENCY if self.latency is None else self.latency
+        return latency * (1 + ERROR_PENALTY * self.error_rate)
+
+    def hedge_delay(self) -> float:
+        latency = DEFAULT_LATENCY if self.latency is None else self.latency
+        return max(HEDGE_MIN_DELAY, latency * HEDGE_FACTOR)
+
+    def acquire(self) -> bool:
+        """May a request use this endpoint now? Half-open endpoints admit one trial at a time."""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self, latency):
+        with self._lock:
+            self.latency = latency if self.latency is None else \
+                EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+            self.error_rate *= 1 - EWMA_ALPHA
+            self.failures = 0
+            self.open_until = 0.0
+            self.cooldown = COOLDOWN
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_rate
+            self.failures += 1
+            was_trial = self.trial_in_flight
+            self.trial_in_flight = False
+            if was_trial or self.failures >= FAILURE_THRESHOLD:
+                if was_trial:
+                    self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+                self.open_until = time.monotonic() + self.cooldown
+
+    def trip(self):
+        with self._lock:
+            self.open_until = time.monotonic() + self.cooldown
+
+    def status(self) -> dict:
+        return {
+            'url': self.url,
+            'state': self.state,
+            'latency_ms': None if self.latency is None else int(self.latency * 1000),
+            'error_rate': round(self.error_rate, 3),
+            'block': self.block,
+        }
+
+
+def _session():
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        import requests
+        session = _thread_local.session = requests.Session()
+    return session
+
+
+class RpcPool:
+    """Thread-safe pool; post() returns the decoded JSON-RPC response (dict, or list for batches)."""
+
+    def __init__(self, urls=None, timeout=REQUEST_TIMEOUT, deadline=DEADLINE):
+        self.endpoints = [Endpoint(u) for u in (urls or configured_rpcs())]
+        if not self.endpoints:
+            raise ValueError("No RPC endpoints configured")
+        self.timeout = timeout
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=max(4, len(self.endpoints) * MAX_IN_FLIGHT),
+                                            thread_name_prefix='rpc')
+        self._probe_future = None
+
+    def ranked(self) -> list[Endpoint]:
+        closed = [e for e in self.endpoints if e.state == 'closed']
+        half_open = [e for e in self.endpoints if e.state == 'half-open']
+        return sorted(closed, key=Endpoint.score) + sorted(half_open, key=Endpoint.score)
+
+    def _send_trials(self, payload):
+        # Half-open endpoints get a copy of a live request; the caller doesn't wait on it
+        for endpoint in self.endpoints:
+            if endpoint.state == 'half-open' and endpoint.acquire():
+                future = self._executor.submit(self._attempt, endpoint, payload)
+                future.add_done_callback(lambda f: f.exception())
+
+    def _attempt(self, endpoint, payload):
+        started = time.perf_counter()
+        try:
+            r = _session().post(endpoint.url, json=payload, timeout=self.timeout)
+            r.raise_for_status()
+            out = r.json()
+        except Exception:
+            endpoint.record_failure()
+            raise
+        endpoint.record_success(time.perf_counter() - started)
+        return out
+
+    def post(self, payload, deadline=None):
+        """Send one JSON-RPC request or batch with hedging and failover.
+
+        JSON-RPC level errors (e.g. a reverted eth_call) are returned as-is: they are answers,
+        not endpoint failures.
+        """
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        candidates = iter(self.ranked())
+        pending = {}
+        errors = []
+
+        def launch() -> bool:
+            for endpoint in candidates:
+                if endpoint.acquire():
+                    pending[self._executor.submit(self._attempt, endpoint, payload)] = endpoint
+                    return True
+            return False
+
+        has_more = launch()
+        if any(e.state == 'closed' for e in pending.values()):
+            self._send_trials(payload)
+        while pending:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            can_hedge = has_more and len(pending) < MAX_IN_FLIGHT
+            wait_for = min(remaining, min(e.hedge_delay() for e in pending.values())) if can_hedge else remaining
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            if not done:
+                if can_hedge:
+                    has_more = launch()
+                continue
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(f"{endpoint.url}: {e}")
+            if not pending and has_more:
+                has_more = launch()
+        if pending:
+            errors.append(f"deadline exceeded waiting for {', '.join(e.url for e in pending.values())}")
+        raise RpcError("All RPC endpoints failed: " + ("; ".join(errors) or "no healthy endpoint"))
+
+    def call(self, method, params, deadline=None):
+        """Single JSON-RPC call; returns 'result' or raises RuntimeError with the RPC error."""
+        out = self.post({'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params}, deadline)
+        if 'error' in out:
+            raise RuntimeError(out['error'])
+        return out.get('result')
+
+    def probe(self, timeout=None):
+        """eth_blockNumber on every endpoint; records latency and trips failing or lagging ones."""
+        payload = {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_blockNumber', 'params': []}
+        futures = {self._executor.submit(self._attempt, e, payload): e for e in self.endpoints}
+        wait(futures, timeout=timeout or self.timeout)
+        for future, endpoint in futures.items():
+            if future.done() and future.exception() is None:
+                try:
+                    endpoint.block = int(future.result().get('result'), 16)
+                except (TypeError, ValueError):
+                    endpoint.block = None
+        best = max((e.block for e in self.endpoints if e.block is not None), default=None)
+        for endpoint in self.endpoints:
+            if best is not None and endpoint.block is not None and best - endpoint.block > MAX_BLOCK_LAG:
+                endpoint.trip()
+        return self.status()
+
+    def probe_in_background(self):
+        """Start probe() once without waiting (returns its future); until it finishes,
+        requests route on default scores and hedging covers a slow first choice."""
+        if self._probe_future is None:
+            self._probe_future = self._executor.submit(self.probe)
+        return self._probe_future
+
+    def status(self) -> list[dict]:
+        return [e.status() for e in self.ranked()] + \
+            [e.status() for e in self.endpoints if e.state == 'open']
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def get_pool(wait_probe=False) -> RpcPool:
+    """Process-wide pool over configured_rpcs(), probed in the background on first use.
+
+    The first request doesn't wait for the probe, so a hanging endpoint can't eat into
+    the caller's deadline. wait_probe=True waits for it (up to REQUEST_TIMEOUT), for
+    callers that pick one endpoint from ranked().
+    """
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = RpcPool()
+        pool = _default_pool
+    probe = pool.probe_in_background()
+    if wait_probe:
+        probe.result()
+    return pool
+
+
+def main():
+    pool = RpcPool()
+    print(f"{'state':<10}{'latency':>9}{'errors':>8}{'block':>12}  url")
+    for s in pool.probe():
+        latency = '-' if s['latency_ms'] is None else f"{s['latency_ms']}ms"
+        print(f"{s['state']:<10}{latency:>9}{s['error_rate']:>8}{str(s['block'] or '-'):>12}  {s['url']}")
+    if not any(s['state'] == 'closed' for s in pool.status()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
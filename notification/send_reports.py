@@ -5,7 +5,6 @@ from datetime import datetime, timedelta
 import calendar
 import argparse
 from zoneinfo import ZoneInfo
-import requests
 from dotenv import load_dotenv
 
 # Ensure project root (parent of this directory) is on sys.path for 'utils' and other modules
@@ -16,56 +15,55 @@ if PROJECT_ROOT not in sys.path:
 if CURRENT_DIR not in sys.path:
     sys.path.insert(0, CURRENT_DIR)
 
-from notification.fetch_notification_data import generate_summary  # noqa: E402
+# generate_summary / generate_report(s) are imported where used: they pull in the data
+# fetchers, requests and openpyxl, which --help and dry runs never need
+from export_data.exporters import EXPORTERS  # noqa: E402
+from notification.telegram_queue import get_queue, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID  # noqa: E402
 
 load_dotenv()
 
-TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# How long a send waits for delivery before leaving the item to the spool
+SEND_WAIT = 120
 EXPORT_DIR = os.path.join(os.path.dirname(__file__), '..', 'export_data')
-FILL_TEMPLATE_SCRIPT = os.path.join(EXPORT_DIR, 'fill_template.py')
 LAST_REPORT_META = os.path.join(EXPORT_DIR, 'last_report.json')
 DEFAULT_EPOCH_START_LOCAL = datetime(2025, 9, 24, 0, 0, 0, tzinfo=ZoneInfo('Asia/Bangkok'))  # 24/09/2025 00:00:00 GMT+7
 
 
-def send_telegram_message(text: str, parse_mode: str | None = None) -> bool:
+def send_telegram_message(text: str, parse_mode: str | None = None, fallback_text: str | None = None,
+                          wait: float = SEND_WAIT) -> bool:
+    """Spool a message and wait up to `wait` seconds for delivery.
+
+    Returns False if it is still queued; it stays in the spool and is retried by the next
+    run (or `python notification/telegram_queue.py`). With parse_mode, fallback_text is sent
+    instead if Telegram rejects the formatting.
+    """
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         print('Telegram credentials missing.')
         return False
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": text}
-    if parse_mode:
-        payload["parse_mode"] = parse_mode
-    try:
-        r = requests.post(url, data=payload, timeout=30)
-        if r.status_code == 200:
-            print('Sent message.')
-            return True
-        print(f'Failed to send message: {r.status_code} {r.text}')
-    except Exception as e:
-        print(f'Error sending message: {e}')
+    queue = get_queue()
+    item_id = queue.enqueue_message(text, parse_mode=parse_mode, fallback_text=fallback_text)
+    queue.flush(wait, ids=[item_id])
+    if queue.is_sent(item_id):
+        print('Sent message.')
+        return True
+    print('Message not delivered yet; left in the Telegram spool.')
     return False
 
 
-def send_telegram_document(file_path: str, caption: str) -> bool:
+def send_telegram_document(file_path: str, caption: str, wait: float = SEND_WAIT) -> bool:
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         print('Telegram credentials missing.')
         return False
     if not os.path.isfile(file_path):
         print(f'File not found: {file_path}')
         return False
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendDocument"
-    try:
-        with open(file_path, 'rb') as f:
-            files = {'document': (os.path.basename(file_path), f)}
-            data = {'chat_id': TELEGRAM_CHAT_ID, 'caption': caption}
-            r = requests.post(url, data=data, files=files, timeout=60)
-            if r.status_code == 200:
-                print('Sent document.')
-                return True
-            print(f'Failed to send document: {r.status_code} {r.text}')
-    except Exception as e:
-        print(f'Error sending document: {e}')
+    queue = get_queue()
+    item_id = queue.enqueue_document(file_path, caption)
+    queue.flush(wait, ids=[item_id])
+    if queue.is_sent(item_id):
+        print('Sent document.')
+        return True
+    print('Document not delivered yet; left in the Telegram spool.')
     return False
 
 
@@ -85,24 +83,36 @@ def build_summary_text(summary: dict) -> tuple[str, str]:
     arrow = ''
     if isinstance(profit_val, (int, float)):
         arrow = '🟢' if profit_val > 0 else ('🔻' if profit_val < 0 else '⚖️')
-    profit_str = profit_val
-    balance_str = balance_val
-    pending_str = pending_claimable_val
+    profit_str = 'n/a' if profit_val is None else profit_val
+    balance_str = 'n/a' if balance_val is None else balance_val
+    pending_str = 'n/a' if pending_claimable_val is None else pending_claimable_val
     retrieved = summary.get('retrieved_at')
+    # Partial summary: name the sources that failed or missed the deadline
+    missing = summary.get('missing') or {}
+    missing_str = ', '.join(f"{name} ({reason})" for name, reason in missing.items())
+    # 24h changes from the time-series store, when it has a sample from a day ago
+    balance_24h = summary.get('balance_24h')
+    profit_24h = summary.get('profit_24h')
+    balance_change = f" (24h {balance_24h:+})" if isinstance(balance_24h, (int, float)) else ''
+    profit_change = f" (24h {profit_24h:+})" if isinstance(profit_24h, (int, float)) else ''
     # HTML formatted message
     html = (
         f"<i>{retrieved}</i>\n"
-        f"<b>Balance:</b> <code>{balance_str}</code>\n"
-        f"<b>Profit:</b> <code>{profit_str}</code> {arrow}\n"
+        f"<b>Balance:</b> <code>{balance_str}</code>{balance_change}\n"
+        f"<b>Profit:</b> <code>{profit_str}</code> {arrow}{profit_change}\n"
         f"<b>Pending Claimable:</b> <code>{pending_str}</code>\n"
     )
+    if missing_str:
+        html += f"⚠️ <i>Missing: {missing_str}</i>\n"
     # Plain fallback text
     plain = (
         f"Time: {retrieved}\n"
-        f"Balance: {balance_str}\n"
-        f"Profit: {profit_str} {arrow}\n"
+        f"Balance: {balance_str}{balance_change}\n"
+        f"Profit: {profit_str} {arrow}{profit_change}\n"
         f"Pending Claimable: {pending_str}\n"
     )
+    if missing_str:
+        plain += f"Missing: {missing_str}\n"
     return html, plain
 
 
@@ -111,54 +121,31 @@ def is_last_day_of_month(dt: datetime) -> bool:
     return dt.day == last_day
 
 
-def generate_excel_with_range(from_ts: int, to_ts: int):
-    """Generate Excel by temporarily modifying FROM_TIME and TO_TIME in fill_template.py"""
-    if not os.path.isfile(FILL_TEMPLATE_SCRIPT):
-        print('fill_template.py not found, skipping excel generation.')
-        return False
-    
-    # Read the current file
+def generate_excel_with_range(from_ts: int, to_ts: int, fmt: str = 'xlsx') -> list[str]:
+    """Generate the report in-process; returns its file paths (empty on failure)."""
+    from export_data.fill_template import generate_report
     try:
-        with open(FILL_TEMPLATE_SCRIPT, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Store original values
-        import re
-        from_match = re.search(r"FROM_TIME='(\d+)'", content)
-        to_match = re.search(r"TO_TIME='(\d+)'", content)
-        original_from = from_match.group(1) if from_match else None
-        original_to = to_match.group(1) if to_match else None
-        
-        # Replace with new values
-        new_content = re.sub(r"FROM_TIME='(\d+)'", f"FROM_TIME='{from_ts}'", content)
-        new_content = re.sub(r"TO_TIME='(\d+)'", f"TO_TIME='{to_ts}'", new_content)
-        
-        # Write modified file
-        with open(FILL_TEMPLATE_SCRIPT, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        
-        # Run the script
-        cmd = f"python {FILL_TEMPLATE_SCRIPT}"
-        print(f'Running: {cmd}')
-        code = os.system(cmd)
-        
-        # Restore original values
-        if original_from and original_to:
-            restored_content = re.sub(r"FROM_TIME='(\d+)'", f"FROM_TIME='{original_from}'", new_content)
-            restored_content = re.sub(r"TO_TIME='(\d+)'", f"TO_TIME='{original_to}'", restored_content)
-            with open(FILL_TEMPLATE_SCRIPT, 'w', encoding='utf-8') as f:
-                f.write(restored_content)
-        
-        if code != 0:
-            print(f'Excel generation exited with code {code}')
-            return False
-        else:
-            print('Excel generation complete.')
-            return True
-            
+        meta = generate_report(from_ts, to_ts, fmt=fmt)
     except Exception as e:
-        print(f'Error generating Excel: {e}')
+        print(f'Error generating report: {e}')
+        return []
+    if not meta:
+        print('Report generation failed.')
+        return []
+    print('Report generation complete.')
+    return meta.get('files') or [meta['path']]
+
+
+def send_report_files(files: list[str], caption: str) -> bool:
+    """Send every file of a report; columnar formats produce rounds + activities files."""
+    existing = [p for p in files if p and os.path.isfile(p)]
+    if not existing:
+        print('Report file not found after generation attempt.')
         return False
+    ok = True
+    for path in existing:
+        ok = send_telegram_document(path, caption) and ok
+    return ok
 
 
 def _start_of_day(dt: datetime) -> datetime:
@@ -205,6 +192,10 @@ def compute_range(args, now_local: datetime) -> tuple[int,int,str]:
         to_dt = _end_of_day(now_local) + timedelta(seconds=1)
         label = f"all_time_to_{now_local.strftime('%d.%m.%Y')}"
         return _to_unix(from_dt), _to_unix(to_dt), label
+    return monthly_range(now_local)
+
+
+def monthly_range(now_local: datetime) -> tuple[int, int, str]:
     # default monthly (first day of month -> first day of current month exclusive) executed on first day current month
     # We want previous calendar month
     first_day_this_month = _start_of_day(now_local).replace(day=1)
@@ -216,6 +207,72 @@ def compute_range(args, now_local: datetime) -> tuple[int,int,str]:
     return _to_unix(from_dt), _to_unix(to_dt), label
 
 
+def compute_batch_ranges(args) -> list[tuple[int, int, str]]:
+    """Ranges for --batch-range (inclusive dates) and --backfill-months (YYYY-MM YYYY-MM)."""
+    tz = ZoneInfo('Asia/Bangkok')
+    ranges = []
+    for from_str, to_str in args.batch_range or []:
+        try:
+            from_date = datetime.strptime(from_str, '%Y-%m-%d').replace(tzinfo=tz)
+            to_date = datetime.strptime(to_str, '%Y-%m-%d').replace(tzinfo=tz)
+        except ValueError:
+            raise SystemExit('Invalid --batch-range values, use YYYY-MM-DD YYYY-MM-DD')
+        from_dt = _start_of_day(from_date)
+        to_dt = _end_of_day(to_date) + timedelta(seconds=1)  # exclusive end
+        ranges.append((_to_unix(from_dt), _to_unix(to_dt), f"{from_dt.strftime('%d.%m.%Y')}-{to_date.strftime('%d.%m.%Y')}"))
+    if args.backfill_months:
+        try:
+            month = datetime.strptime(args.backfill_months[0], '%Y-%m').replace(tzinfo=tz)
+            last = datetime.strptime(args.backfill_months[1], '%Y-%m').replace(tzinfo=tz)
+        except ValueError:
+            raise SystemExit('Invalid --backfill-months values, use YYYY-MM YYYY-MM')
+        while month <= last:
+            days = calendar.monthrange(month.year, month.month)[1]
+            next_month = month + timedelta(days=days)
+            ranges.append((_to_unix(month), _to_unix(next_month), f"monthly_{month.strftime('%m-%Y')}"))
+            month = next_month
+    return ranges
+
+
+def send_daily_summary(dry_run: bool = False) -> dict:
+    """Build the summary and send it (HTML with a plain-text fallback); returns the summary."""
+    from notification.fetch_notification_data import generate_summary
+    summary = generate_summary(record=not dry_run)
+    summary_html, summary_plain = build_summary_text(summary)
+    if dry_run:
+        print('[DRY] Would send daily summary (HTML):\n' + summary_html)
+    else:
+        send_telegram_message(summary_html, parse_mode='HTML', fallback_text=summary_plain)
+    return summary
+
+
+def send_monthly_report(now_local: datetime, fmt: str = 'xlsx', dry_run: bool = False, report_range=None) -> None:
+    """Generate and send the previous calendar month's report (or report_range's)."""
+    from_ts, to_ts, label = report_range or monthly_range(now_local)
+    if dry_run:
+        print(f"[DRY] Would generate monthly Excel: {label} -> {from_ts} .. {to_ts}")
+        return
+    print(f"Running monthly excel generation: {label}")
+    report_files = generate_excel_with_range(from_ts, to_ts, fmt)
+    send_report_files(report_files, f"Monthly Report {label}")
+
+
+def run_batch_reports(args) -> None:
+    """Generate every batch range from one shared fetch and send each report."""
+    ranges = compute_batch_ranges(args)
+    if not ranges:
+        return
+    if args.dry_run:
+        for from_ts, to_ts, label in ranges:
+            print(f"[DRY] Would generate Excel: {label} -> {from_ts} .. {to_ts}")
+        return
+    print(f"Running batch excel generation for {len(ranges)} ranges")
+    from export_data.fill_template import generate_reports
+    metas = generate_reports([(f, t) for f, t, _ in ranges], workers=args.workers, fmt=args.format)
+    for (_, _, label), meta in zip(ranges, metas):
+        send_report_files(meta.get('files') or [meta.get('path')], f"Report {label}")
+
+
 def main():
     parser = argparse.ArgumentParser(description='Send daily summary and monthly Excel via Telegram.')
     parser.add_argument('--summary-only', action='store_true', help='Send only daily summary (for 9pm GMT+7 schedule)')
@@ -226,6 +283,10 @@ def main():
     parser.add_argument('--from-last-report', action='store_true', help='Excel: from last report end date to now')
     parser.add_argument('--all-time', action='store_true', help='Excel: from default epoch (24/09/2025) to now')
     parser.add_argument('--custom-date', nargs=2, metavar=('FROM_DATE','TO_DATE'), help='Excel: custom inclusive date range YYYY-MM-DD YYYY-MM-DD')
+    parser.add_argument('--batch-range', nargs=2, action='append', metavar=('FROM_DATE','TO_DATE'), help='Excel batch: repeatable inclusive date range YYYY-MM-DD YYYY-MM-DD, all sharing one fetch')
+    parser.add_argument('--backfill-months', nargs=2, metavar=('FROM_MONTH','TO_MONTH'), help='Excel batch: one report per month YYYY-MM YYYY-MM, sharing one fetch')
+    parser.add_argument('--workers', type=int, default=None, help='Excel batch: worker processes for building workbooks')
+    parser.add_argument('--format', default='xlsx', choices=['xlsx'] + sorted(EXPORTERS), help='Report format to generate and send (default xlsx)')
     args = parser.parse_args()
 
     tz = ZoneInfo('Asia/Bangkok')
@@ -235,14 +296,7 @@ def main():
     if args.summary_only:
         # Daily summary at 9pm GMT+7
         print(f"Daily summary scheduled run at {now_local.strftime('%Y-%m-%d %H:%M:%S')} GMT+7")
-        summary = generate_summary()
-        summary_html, summary_plain = build_summary_text(summary)
-        if args.dry_run:
-            print('[DRY] Would send daily summary (HTML):\n' + summary_html)
-        else:
-            if not send_telegram_message(summary_html, parse_mode='HTML'):
-                print('Falling back to plain text summary...')
-                send_telegram_message(summary_plain)
+        send_daily_summary(args.dry_run)
         return
 
     if args.excel_only:
@@ -253,40 +307,22 @@ def main():
         
         print(f"Monthly Excel scheduled run at {now_local.strftime('%Y-%m-%d %H:%M:%S')} GMT+7")
         # Generate previous month's report
-        from_ts, to_ts, label = compute_range(args, now_local)
-        if args.dry_run:
-            print(f"[DRY] Would generate monthly Excel: {label} -> {from_ts} .. {to_ts}")
-        else:
-            print(f"Running monthly excel generation: {label}")
-            generate_excel_with_range(from_ts, to_ts)
-            
-            # Load and send the generated report
-            report_path = None
-            if os.path.isfile(LAST_REPORT_META):
-                try:
-                    with open(LAST_REPORT_META,'r',encoding='utf-8') as f:
-                        meta = json.load(f)
-                    report_path = meta.get('path')
-                except Exception as e:
-                    print(f'Warning: could not load metadata: {e}')
-
-            if report_path and os.path.isfile(report_path):
-                caption = f"Monthly Report {label}"
-                send_telegram_document(report_path, caption)
-            else:
-                print('Report file not found after generation attempt.')
+        send_monthly_report(now_local, args.format, args.dry_run, compute_range(args, now_local))
+        return
+
+    if args.batch_range or args.backfill_months:
+        run_batch_reports(args)
         return
 
     # Manual/interactive mode (original logic)
-    summary = generate_summary()
+    from notification.fetch_notification_data import generate_summary
+    summary = generate_summary(record=not args.dry_run)
     summary_html, summary_plain = build_summary_text(summary)
     if not args.skip_summary:
         if args.dry_run:
             print('[DRY] Would send summary (HTML):\n' + summary_html)
         else:
-            if not send_telegram_message(summary_html, parse_mode='HTML'):
-                print('Falling back to plain text summary...')
-                send_telegram_message(summary_plain)
+            send_telegram_message(summary_html, parse_mode='HTML', fallback_text=summary_plain)
 
     need_excel = False
     if args.force_excel or args.from_last_report or args.all_time or args.custom_date:
@@ -302,30 +338,27 @@ def main():
 
     # compute range
     from_ts, to_ts, label = compute_range(args, now_local)
+    report_files = []
     if args.dry_run:
-        print(f"[DRY] Would generate Excel: {label} -> {from_ts} .. {to_ts}")
+        print(f"[DRY] Would generate {args.format}: {label} -> {from_ts} .. {to_ts}")
     else:
-        print(f"Running excel generation: {label} -> {from_ts} .. {to_ts}")
-        generate_excel_with_range(from_ts, to_ts)
-    # Load metadata
-    report_path = None
-    if os.path.isfile(LAST_REPORT_META):
+        print(f"Running {args.format} generation: {label} -> {from_ts} .. {to_ts}")
+        report_files = generate_excel_with_range(from_ts, to_ts, args.format)
+    # Dry runs fall back to the last generated report
+    if not report_files and args.dry_run and os.path.isfile(LAST_REPORT_META):
         try:
             with open(LAST_REPORT_META,'r',encoding='utf-8') as f:
                 meta = json.load(f)
-            report_path = meta.get('path')
+            report_files = meta.get('files') or [meta.get('path')]
         except Exception as e:
             print(f'Warning: could not load metadata: {e}')
 
-    if not report_path or not os.path.isfile(report_path):
-        print('Report file not found after generation attempt.')
-        return
-
     caption = f"Report {label}"
     if args.dry_run:
-        print(f"[DRY] Would send excel: {report_path} caption='{caption}'")
+        for report_path in report_files:
+            print(f"[DRY] Would send report: {report_path} caption='{caption}'")
     else:
-        send_telegram_document(report_path, caption)
+        send_report_files(report_files, caption)
 
 
 if __name__ == '__main__':
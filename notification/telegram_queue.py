@@ -0,0 +1,401 @@
+"""
+Persistent Telegram delivery queue.
+
+Messages and documents are written to a SQLite spool (TELEGRAM_SPOOL_PATH) before any
+network call and delivered by deliver_one() / flush() (or the start() worker), so nothing
+is lost if the process dies: rows claimed by a crashed sender are released when their
+lease expires.
+
+- Coalescing: messages enqueued with a coalesce_key wait COALESCE_WINDOW seconds and
+  are sent as one message with every other pending message of the same chat/key
+  (up to Telegram's 4096 character limit).
+- Rate limits: at most 1 message per second and 20 per minute per chat, 30 per second
+  overall, shared by every process using the spool. A 429 pauses the chat for the
+  retry_after Telegram returns.
+- Retries: network errors and 5xx retry with exponential backoff and jitter up to
+  MAX_ATTEMPTS. A 400 for an HTML message is retried once as its plain fallback text;
+  other 4xx drop the message.
+
+TELEGRAM_API_URL points the queue at another Bot API server (e.g. a local fake).
+
+Usage:
+    python notification/telegram_queue.py            # deliver everything pending, then exit
+    python notification/telegram_queue.py --status
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
+TELEGRAM_SPOOL_PATH = os.getenv('TELEGRAM_SPOOL_PATH', os.path.join(os.path.dirname(__file__), 'telegram_spool.db'))
+
+MAX_MESSAGE_CHARS = 4096
+COALESCE_WINDOW = 30
+# (max sends, window seconds)
+CHAT_LIMITS = [(1, 1.0), (20, 60.0)]
+GLOBAL_LIMIT = (30, 1.0)
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 15 * 60
+LEASE_SECONDS = 120
+KEEP_SENT_SECONDS = 7 * 24 * 3600
+REQUEST_TIMEOUT = 30
+DOCUMENT_TIMEOUT = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    text TEXT,
+    parse_mode TEXT,
+    fallback_text TEXT,
+    file_path TEXT,
+    coalesce_key TEXT,
+    created REAL NOT NULL,
+    next_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    error TEXT,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_at);
+CREATE TABLE IF NOT EXISTS sends (
+    chat_id TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sends_chat ON sends(chat_id, ts);
+CREATE TABLE IF NOT EXISTS chat_pause (
+    chat_id TEXT PRIMARY KEY,
+    until REAL NOT NULL
+);
+"""
+
+
+def backoff_delay(attempts: int) -> float:
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempts - 1))) * random.uniform(0.8, 1.2)
+
+
+class TelegramQueue:
+    """Spool-backed sender; safe to share between threads and processes."""
+
+    def __init__(self, spool_path=TELEGRAM_SPOOL_PATH, token=TELEGRAM_BOT_TOKEN, chat_id=TELEGRAM_CHAT_ID,
+                 api_url=TELEGRAM_API_URL, coalesce_window=COALESCE_WINDOW):
+        self.spool_path = spool_path
+        self.token = token
+        self.chat_id = chat_id
+        self.api_url = api_url
+        self.coalesce_window = coalesce_window
+        self._conn = sqlite3.connect(spool_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._session = None
+        self._worker = None
+        self._stop = threading.Event()
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+    # --- enqueue ---
+    def enqueue_message(self, text, parse_mode=None, fallback_text=None, coalesce_key=None, chat_id=None) -> int:
+        """Spool a message; with coalesce_key it waits for the window and merges with its peers."""
+        now = time.time()
+        next_at = now + self.coalesce_window if coalesce_key else now
+        return self._insert(chat_id or self.chat_id, 'message', text, parse_mode, fallback_text, None,
+                            coalesce_key, now, next_at)
+
+    def enqueue_document(self, file_path, caption=None, chat_id=None) -> int:
+        now = time.time()
+        return self._insert(chat_id or self.chat_id, 'document', caption, None, None,
+                            os.path.abspath(file_path), None, now, now)
+
+    def _insert(self, *row) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO outbox (chat_id, kind, text, parse_mode, fallback_text, file_path, coalesce_key, "
+                "created, next_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            return cur.lastrowid
+
+    # --- rate limiting ---
+    def _rate_wait(self, chat_id, now) -> float:
+        """Seconds until chat_id may send again (0 when it may send now)."""
+        wait = 0.0
+        row = self._conn.execute("SELECT until FROM chat_pause WHERE chat_id = ?", (chat_id,)).fetchone()
+        if row and row[0] > now:
+            wait = row[0] - now
+        limits = [(chat_id, n, window) for n, window in CHAT_LIMITS] + [(None, *GLOBAL_LIMIT)]
+        for chat, n, window in limits:
+            if chat is None:
+                rows = self._conn.execute("SELECT ts FROM sends WHERE ts > ? ORDER BY ts DESC LIMIT ?",
+                                          (now - window, n)).fetchall()
+            else:
+                rows = self._conn.execute("SELECT ts FROM sends WHERE chat_id = ? AND ts > ? "
+                                          "ORDER BY ts DESC LIMIT ?", (chat, now - window, n)).fetchall()
+            if len(rows) >= n:
+                wait = max(wait, rows[-1][0] + window - now)
+        return wait
+
+    # --- claiming ---
+    def _claim(self, now):
+        """Lease the next deliverable item (plus coalesced peers). Returns (rows, wait_seconds)."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            candidates = self._conn.execute(
+                "SELECT id, chat_id, kind, text, parse_mode, fallback_text, file_path, coalesce_key, attempts "
+                "FROM outbox WHERE status = 'pending' AND next_at <= ? AND (lease_until IS NULL OR lease_until < ?) "
+                "ORDER BY next_at, id LIMIT 50", (now, now)).fetchall()
+            soonest = None
+            for row in candidates:
+                wait = self._rate_wait(row[1], now)
+                if wait > 0:
+                    soonest = wait if soonest is None else min(soonest, wait)
+                    continue
+                rows = [row]
+                if row[2] == 'message' and row[7]:
+                    peers = self._conn.execute(
+                        "SELECT id, chat_id, kind, text, parse_mode, fallback_text, file_path, coalesce_key, attempts "
+                        "FROM outbox WHERE status = 'pending' AND id != ? AND chat_id = ? AND coalesce_key = ? "
+                        "AND kind = 'message' AND parse_mode IS ? AND (lease_until IS NULL OR lease_until < ?) "
+                        "ORDER BY id", (row[0], row[1], row[7], row[4], now)).fetchall()
+                    size = len(row[3] or '')
+                    for peer in peers:
+                        size += len(peer[3] or '') + 2
+                        if size > MAX_MESSAGE_CHARS:
+                            break
+                        rows.append(peer)
+                self._conn.executemany("UPDATE outbox SET lease_until = ? WHERE id = ?",
+                                       [(now + LEASE_SECONDS, r[0]) for r in rows])
+                self._conn.execute("COMMIT")
+                return rows, 0.0
+            if soonest is None:
+                nxt = self._conn.execute("SELECT MIN(next_at) FROM outbox WHERE status = 'pending'").fetchone()[0]
+                soonest = None if nxt is None else max(0.0, nxt - now)
+            self._conn.execute("COMMIT")
+            return [], soonest
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    # --- delivery ---
+    def _post(self, method, data, files=None, timeout=REQUEST_TIMEOUT):
+        url = f"{self.api_url}/bot{self.token}/{method}"
+        if self._session is None:
+            # Imported here so enqueue-only callers (and --help) don't pay for requests
+            import requests
+            self._session = requests.Session()
+        return self._session.post(url, data=data, files=files, timeout=timeout)
+
+    def _send(self, rows):
+        first = rows[0]
+        chat_id, kind = first[1], first[2]
+        if kind == 'document':
+            with open(first[6], 'rb') as f:
+                data = {'chat_id': chat_id}
+                if first[3]:
+                    data['caption'] = first[3]
+                return self._post('sendDocument', data, {'document': (os.path.basename(first[6]), f)},
+                                  DOCUMENT_TIMEOUT)
+        text = '\n\n'.join(r[3] or '' for r in rows)
+        data = {'chat_id': chat_id, 'text': text[:MAX_MESSAGE_CHARS]}
+        if first[4]:
+            data['parse_mode'] = first[4]
+        return self._post('sendMessage', data)
+
+    def deliver_one(self):
+        """Try to deliver the next due item. Returns (delivered_ids, wait_seconds_until_next)."""
+        if not self.token:
+            raise RuntimeError('Telegram credentials missing.')
+        now = time.time()
+        with self._lock:
+            rows, wait = self._claim(now)
+        if not rows:
+            return [], wait
+        ids = [r[0] for r in rows]
+        chat_id = rows[0][1]
+        try:
+            resp = self._send(rows)
+            status, error = resp.status_code, resp.text[:500]
+        except FileNotFoundError as e:
+            status, error = None, f"file missing: {e}"
+            self._finish(ids, 'dropped', error)
+            print(f"Telegram: dropped {ids}: {error}")
+            return [], 0.0
+        except Exception as e:
+            status, error = None, str(e)
+
+        now = time.time()
+        if status == 200:
+            self._finish(ids, 'sent')
+            with self._lock:
+                self._conn.execute("INSERT INTO sends VALUES (?, ?)", (chat_id, now))
+            return ids, 0.0
+        if status == 429:
+            retry_after = 5
+            try:
+                retry_after = resp.json().get('parameters', {}).get('retry_after', retry_after)
+            except Exception:
+                pass
+            with self._lock:
+                self._conn.execute("INSERT OR REPLACE INTO chat_pause VALUES (?, ?)", (chat_id, now + retry_after))
+                self._release(ids, now + retry_after, count_attempt=False, error=error)
+            print(f"Telegram: rate limited, chat paused {retry_after}s")
+            return [], 0.0
+        if status == 400 and rows[0][4] and any(r[5] for r in rows):
+            # Usually an HTML entity problem: retry as the plain fallback text
+            with self._lock:
+                self._conn.executemany(
+                    "UPDATE outbox SET text = COALESCE(fallback_text, text), parse_mode = NULL, "
+                    "fallback_text = NULL, lease_until = NULL, next_at = ? WHERE id = ?",
+                    [(now, i) for i in ids])
+            print("Telegram: HTML rejected, retrying as plain text")
+            return [], 0.0
+        if status is not None and 400 <= status < 500:
+            self._finish(ids, 'dropped', error)
+            print(f"Telegram: dropped {ids}: {status} {error}")
+            return [], 0.0
+        attempts = max(r[8] for r in rows) + 1
+        if attempts >= MAX_ATTEMPTS:
+            self._finish(ids, 'dropped', error)
+            print(f"Telegram: giving up on {ids} after {attempts} attempts: {error}")
+            return [], 0.0
+        with self._lock:
+            self._release(ids, now + backoff_delay(attempts), count_attempt=True, error=error)
+        print(f"Telegram: send failed ({status or error}), retry #{attempts}")
+        return [], 0.0
+
+    def _release(self, ids, next_at, count_attempt, error):
+        # Caller holds self._lock
+        self._conn.executemany(
+            "UPDATE outbox SET lease_until = NULL, next_at = ?, error = ?, attempts = attempts + ? WHERE id = ?",
+            [(next_at, error, 1 if count_attempt else 0, i) for i in ids])
+
+    def _finish(self, ids, status, error=None):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET status = ?, error = ?, lease_until = NULL, sent_at = ? WHERE id = ?",
+                [(status, error, time.time(), i) for i in ids])
+
+    def flush(self, timeout=60.0, ids=None) -> bool:
+        """Deliver due items until the queue (or just `ids`) is done or timeout passes.
+
+        Returns True when nothing relevant is left pending.
+        """
+        deadline = time.time() + timeout
+        while True:
+            pending = self.pending_ids(ids)
+            if not pending:
+                return True
+            delivered, wait = self.deliver_one()
+            if delivered:
+                continue
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            if wait is None:
+                return not self.pending_ids(ids)
+            time.sleep(min(max(wait, 0.05), remaining, 1.0))
+
+    def pending_ids(self, ids=None) -> list[int]:
+        with self._lock:
+            if ids is None:
+                rows = self._conn.execute("SELECT id FROM outbox WHERE status = 'pending'").fetchall()
+            else:
+                marks = ','.join('?' * len(ids))
+                rows = self._conn.execute(f"SELECT id FROM outbox WHERE status = 'pending' AND id IN ({marks})",
+                                          list(ids)).fetchall()
+        return [r[0] for r in rows]
+
+    def is_sent(self, item_id) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM outbox WHERE id = ?", (item_id,)).fetchone()
+        return bool(row) and row[0] == 'sent'
+
+    def prune(self):
+        cutoff = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE status != 'pending' AND sent_at < ?",
+                               (cutoff - KEEP_SENT_SECONDS,))
+            self._conn.execute("DELETE FROM sends WHERE ts < ?", (cutoff - 3600,))
+            self._conn.execute("DELETE FROM chat_pause WHERE until < ?", (cutoff,))
+
+    # --- background worker (long-running processes) ---
+    def start(self):
+        if self._worker is None:
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name='telegram-queue', daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        if self._worker is not None:
+            self._stop.set()
+            self._worker.join(timeout=5)
+            self._worker = None
+
+    def _run(self):
+        self.prune()
+        while not self._stop.is_set():
+            try:
+                delivered, wait = self.deliver_one()
+            except Exception as e:
+                print(f"Telegram queue error: {e}")
+                delivered, wait = [], 5.0
+            if not delivered:
+                self._stop.wait(min(wait if wait is not None else 1.0, 1.0) or 0.05)
+
+    def status(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"))
+            oldest = self._conn.execute("SELECT MIN(created) FROM outbox WHERE status = 'pending'").fetchone()[0]
+        return {'pending': counts.get('pending', 0), 'sent': counts.get('sent', 0),
+                'dropped': counts.get('dropped', 0),
+                'oldest_pending_age': None if oldest is None else int(time.time() - oldest)}
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def get_queue() -> TelegramQueue:
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = TelegramQueue()
+        return _default_queue
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deliver spooled Telegram messages.')
+    parser.add_argument('--status', action='store_true', help='Show spool counts and exit')
+    parser.add_argument('--timeout', type=float, default=120, help='Stop after this many seconds')
+    args = parser.parse_args()
+    queue = get_queue()
+    if args.status:
+        print(queue.status())
+        return
+    if not queue.token:
+        print('Telegram credentials missing.')
+        sys.exit(1)
+    queue.prune()
+    done = queue.flush(args.timeout)
+    print(queue.status())
+    if not done:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""
+Append-only time-series store for balance / PnL samples (SQLite, delta encoded).
+
+Values are stored as integers (value * scale, cents by default). New samples go to a
+small `head` table; every CHUNK_SAMPLES samples of a series are compacted into one
+`chunks` row whose blob holds delta-of-delta timestamps and value deltas as zigzag
+varints. A steady one-minute sampler with an unchanged balance costs ~2 bytes per
+sample instead of a full row. Queries decode only the chunks overlapping the range
+and can downsample into fixed buckets (first/last/min/max/mean/count).
+
+Usage:
+    python notification/timeseries.py --series balance --hours 24 --step 3600
+    python notification/timeseries.py --stats
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from utils.common import r2  # noqa: E402
+
+TIMESERIES_PATH = os.getenv('TIMESERIES_PATH', os.path.join(CURRENT_DIR, 'timeseries.db'))
+CHUNK_SAMPLES = 240
+DEFAULT_SCALE = 100
+AGGREGATES = ('first', 'last', 'min', 'max', 'mean', 'count')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    name TEXT PRIMARY KEY,
+    scale INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    series TEXT NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (series, start_ts)
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_end ON chunks(series, end_ts);
+CREATE TABLE IF NOT EXISTS head (
+    series TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (series, ts)
+);
+"""
+
+
+# --- varint / zigzag codec ---
+def _zigzag(n: int) -> int:
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def _unzigzag(z: int) -> int:
+    return z >> 1 if not z & 1 else -((z + 1) >> 1)
+
+
+def _put_varint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def encode_chunk(samples) -> bytes:
+    """[(ts, int_value), ...] sorted by ts -> bytes (delta-of-delta ts, delta values)."""
+    out = bytearray()
+    prev_ts = prev_delta = prev_value = 0
+    for i, (ts, value) in enumerate(samples):
+        delta = ts - prev_ts
+        _put_varint(out, _zigzag(ts if i == 0 else delta - prev_delta))
+        _put_varint(out, _zigzag(value - prev_value))
+        prev_delta = 0 if i == 0 else delta
+        prev_ts, prev_value = ts, value
+    return bytes(out)
+
+
+def decode_chunk(data: bytes) -> list[tuple[int, int]]:
+    samples = []
+    pos, n = 0, len(data)
+    prev_ts = prev_delta = prev_value = 0
+    fields = []
+    while pos < n:
+        shift = z = 0
+        while True:
+            b = data[pos]
+            pos += 1
+            z |= (b & 0x7F) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        fields.append(_unzigzag(z))
+        if len(fields) == 2:
+            dod, dv = fields
+            fields = []
+            if samples:
+                prev_delta += dod
+                ts = prev_ts + prev_delta
+            else:
+                ts = dod
+            prev_ts, prev_value = ts, prev_value + dv
+            samples.append((ts, prev_value))
+    return samples
+
+
+class TimeSeriesStore:
+    """Thread-safe store; one writer (the monitor) and any number of readers (WAL)."""
+
+    def __init__(self, path: str = TIMESERIES_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._scales = dict(self._conn.execute("SELECT name, scale FROM series"))
+        # series -> [last ts, samples in head], loaded on first append
+        self._tails = {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _tail(self, series):
+        tail = self._tails.get(series)
+        if tail is None:
+            head_last, head_count = self._conn.execute(
+                "SELECT MAX(ts), COUNT(*) FROM head WHERE series = ?", (series,)).fetchone()
+            chunk_last = self._conn.execute(
+                "SELECT MAX(end_ts) FROM chunks WHERE series = ?", (series,)).fetchone()[0]
+            tail = self._tails[series] = [max(x for x in (head_last, chunk_last, -1) if x is not None), head_count]
+        return tail
+
+    def append(self, ts, values: dict, scale: int = DEFAULT_SCALE) -> int:
+        """Append one sample per series ({name: value}; None is skipped). Returns samples written.
+
+        The store is append-only: a sample not newer than the series' last one is ignored.
+        """
+        ts = int(ts)
+        written = 0
+        with self._lock, self._conn:
+            for series, value in values.items():
+                if value is None:
+                    continue
+                if series not in self._scales:
+                    self._conn.execute("INSERT OR IGNORE INTO series VALUES (?, ?)", (series, scale))
+                    self._scales[series] = scale
+                tail = self._tail(series)
+                if ts <= tail[0]:
+                    continue
+                self._conn.execute("INSERT INTO head VALUES (?, ?, ?)",
+                                   (series, ts, int(round(value * self._scales[series]))))
+                tail[0] = ts
+                tail[1] += 1
+                written += 1
+                if tail[1] >= CHUNK_SAMPLES:
+                    self._compact(series)
+                    tail[1] = 0
+        return written
+
+    def _compact(self, series):
+        # Caller holds the lock and the transaction
+        rows = self._conn.execute("SELECT ts, value FROM head WHERE series = ? ORDER BY ts", (series,)).fetchall()
+        if not rows:
+            return
+        self._conn.execute("INSERT INTO chunks VALUES (?, ?, ?, ?, ?)",
+                           (series, rows[0][0], rows[-1][0], len(rows), encode_chunk(rows)))
+        self._conn.execute("DELETE FROM head WHERE series = ?", (series,))
+
+    def _scale(self, series):
+        # Readers in other processes pick up series created after they opened the store
+        scale = self._scales.get(series)
+        if scale is None:
+            row = self._conn.execute("SELECT scale FROM series WHERE name = ?", (series,)).fetchone()
+            if row is not None:
+                scale = self._scales[series] = row[0]
+        return scale
+
+    def series(self) -> list[str]:
+        with self._lock:
+            self._scales.update(self._conn.execute("SELECT name, scale FROM series"))
+            return sorted(self._scales)
+
+    def samples(self, series, from_ts=None, to_ts=None) -> list[tuple[int, float]]:
+        """(ts, value) pairs with from_ts <= ts < to_ts, oldest first."""
+        lo = -1 if from_ts is None else int(from_ts)
+        hi = 1 << 62 if to_ts is None else int(to_ts)
+        with self._lock:
+            scale = self._scale(series)
+            if scale is None:
+                return []
+            blobs = self._conn.execute(
+                "SELECT data FROM chunks WHERE series = ? AND end_ts >= ? AND start_ts < ? ORDER BY start_ts",
+                (series, lo, hi)).fetchall()
+            head = self._conn.execute(
+                "SELECT ts, value FROM head WHERE series = ? AND ts >= ? AND ts < ? ORDER BY ts",
+                (series, lo, hi)).fetchall()
+        out = []
+        for (blob,) in blobs:
+            out.extend((ts, v / scale) for ts, v in decode_chunk(blob) if lo <= ts < hi)
+        out.extend((ts, v / scale) for ts, v in head)
+        return out
+
+    def downsample(self, series, from_ts, to_ts, step) -> dict:
+        """Columnar buckets of `step` seconds aligned to from_ts: {'t': [...], 'first': [...], ...}.
+
+        Empty buckets are left out.
+        """
+        step = max(1, int(step))
+        buckets = {}
+        for ts, v in self.samples(series, from_ts, to_ts):
+            b = buckets.get((ts - from_ts) // step)
+            if b is None:
+                buckets[(ts - from_ts) // step] = [v, v, v, v, v, 1]
+                continue
+            b[1] = v
+            b[2] = min(b[2], v)
+            b[3] = max(b[3], v)
+            b[4] += v
+            b[5] += 1
+        out = {'t': [], **{agg: [] for agg in AGGREGATES}}
+        for idx in sorted(buckets):
+            first, last, lo, hi, total, count = buckets[idx]
+            out['t'].append(int(from_ts + idx * step))
+            out['first'].append(first)
+            out['last'].append(last)
+            out['min'].append(lo)
+            out['max'].append(hi)
+            out['mean'].append(r2(total / count, 4))
+            out['count'].append(count)
+        return out
+
+    def latest(self, series, before=None):
+        """Most recent (ts, value), optionally strictly before a timestamp; None if empty."""
+        hi = 1 << 62 if before is None else int(before)
+        with self._lock:
+            scale = self._scale(series)
+            if scale is None:
+                return None
+            row = self._conn.execute("SELECT ts, value FROM head WHERE series = ? AND ts < ? "
+                                     "ORDER BY ts DESC LIMIT 1", (series, hi)).fetchone()
+            if row is not None:
+                return row[0], row[1] / scale
+            blob = self._conn.execute("SELECT data FROM chunks WHERE series = ? AND start_ts < ? "
+                                      "ORDER BY start_ts DESC LIMIT 1", (series, hi)).fetchone()
+        if blob is None:
+            return None
+        ts, value = [x for x in decode_chunk(blob[0]) if x[0] < hi][-1]
+        return ts, value / scale
+
+    def change(self, series, seconds, now=None):
+        """Latest value minus the last value at least `seconds` old; None without both."""
+        now = int(time.time()) if now is None else int(now)
+        current = self.latest(series)
+        past = self.latest(series, now - seconds + 1)
+        if current is None or past is None:
+            return None
+        return r2(current[1] - past[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {}
+            for series in self._scales:
+                chunks, chunk_samples, chunk_bytes = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(count), 0), COALESCE(SUM(LENGTH(data)), 0) "
+                    "FROM chunks WHERE series = ?", (series,)).fetchone()
+                head = self._conn.execute("SELECT COUNT(*) FROM head WHERE series = ?", (series,)).fetchone()[0]
+                out[series] = {'samples': chunk_samples + head, 'chunks': chunks, 'chunk_bytes': chunk_bytes,
+                               'bytes_per_sample': r2(chunk_bytes / chunk_samples) if chunk_samples else None}
+            return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the balance / PnL time-series store.')
+    parser.add_argument('--series', default='balance', help='Series name (balance, usdc, claimable, pnl)')
+    parser.add_argument('--hours', type=float, default=24, help='Look back this many hours')
+    parser.add_argument('--step', type=int, default=3600, help='Bucket size in seconds')
+    parser.add_argument('--stats', action='store_true', help='Show per-series sample counts and encoded size')
+    args = parser.parse_args()
+
+    store = TimeSeriesStore()
+    if args.stats:
+        for series, s in store.stats().items():
+            print(f"{series}: {s}")
+        return
+    now = int(time.time())
+    data = store.downsample(args.series, now - int(args.hours * 3600), now, args.step)
+    if not data['t']:
+        print(f"No samples for '{args.series}' (series: {', '.join(store.series()) or 'none'})")
+        return
+    print('time\tfirst\tlast\tmin\tmax\tcount')
+    for i, t in enumerate(data['t']):
+        label = datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:%M')
+        print(f"{label}\t{data['first'][i]}\t{data['last'][i]}\t{data['min'][i]}\t{data['max'][i]}\t{data['count'][i]}")
+
+
+if __name__ == '__main__':
+    main()
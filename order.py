@@ -4,13 +4,14 @@ import time
 import logging
 from typing import List, Dict
 import subprocess
+from importlib.util import find_spec
 
-# Handle missing dependencies gracefully
+# Handle missing dependencies gracefully. py_clob_client (and the eth stack behind it) is
+# only imported once a client or order is built, but its absence is still reported here.
 try:
     import dotenv
-    from py_clob_client.client import ClobClient
-    from py_clob_client.clob_types import OrderArgs, OrderType, PostOrdersArgs
-    from py_clob_client.order_builder.constants import BUY, SELL
+    if find_spec('py_clob_client') is None:
+        raise ImportError("No module named 'py_clob_client'")
 except ImportError as e:
     missing = str(e).split('No module named ')[-1].replace("'", "")
     raise ImportError(f"Required package '{missing}' is not installed. Please install all dependencies with 'pip install python-dotenv py-clob-client'.")
@@ -45,6 +46,7 @@ except ImportError:
 
 def prepare_client():
     """Prepare and return a ClobClient instance with credentials."""
+    from py_clob_client.client import ClobClient
     if SIGNATURE_TYPE == 1:
         client = ClobClient(
             HOST,
@@ -70,9 +72,11 @@ def prepare_client():
 def build_orders(client, token_ids, specs):
     """Build a list of PostOrdersArgs from specs and token IDs."""
     """specs is a list of dicts: price, size, side, order_type, outcome_index"""
+    from py_clob_client.clob_types import OrderArgs, OrderType, PostOrdersArgs
+    from py_clob_client.order_builder.constants import BUY, SELL
     orders = []
     for spec in specs[:MAX_ORDERS_PER_BATCH]:
-        token_id = token_ids[spec.get("outcome_index", 0)]
+        token_id = spec.get("token_id") or token_ids[spec.get("outcome_index", 0)]
         side_const = BUY if spec["side"].lower().startswith("b") else SELL
         order_args = OrderArgs(
             price=float(spec["price"]),
@@ -90,6 +94,37 @@ def build_orders(client, token_ids, specs):
     return orders
 
 
+def build_orders_from_batch(client, batch, start=0, stop=None):
+    """Build PostOrdersArgs for rows [start, stop) of a SpecBatch from generate_batch."""
+    from py_clob_client.clob_types import OrderArgs, OrderType, PostOrdersArgs
+    from py_clob_client.order_builder.constants import BUY, SELL
+    stop = len(batch) if stop is None else min(stop, len(batch))
+    side_const = BUY if batch.side.lower().startswith("b") else SELL
+    order_type = getattr(OrderType, batch.order_type)
+    orders = []
+    for i in range(start, stop):
+        order_args = OrderArgs(
+            price=batch.price[i],
+            size=int(batch.size[i]),
+            side=side_const,
+            token_id=batch.tokens[batch.token_idx[i]],
+            expiration=batch.expiration[i]
+        )
+        orders.append(PostOrdersArgs(order=client.create_order(order_args), orderType=order_type))
+    return orders
+
+
+def extract_order_ids(resp) -> List[str]:
+    """Order IDs from a post_orders response (a list of dicts/objects, or a single one)."""
+    # The response structure may vary; adjust as needed for your API/client
+    ids = []
+    for r in resp if isinstance(resp, list) else [resp]:
+        order_id = r.get("orderID") if isinstance(r, dict) else getattr(r, "orderID", None)
+        if order_id:
+            ids.append(str(order_id))
+    return ids
+
+
 def post_batch_orders(client, orders, order_ids_file="placed_order_ids.txt"):
     """
     Post a batch of orders and save their IDs for cancellation tracking.
@@ -100,23 +135,10 @@ def post_batch_orders(client, orders, order_ids_file="placed_order_ids.txt"):
     except Exception as e:
         logging.error(f"Error posting orders: {e}")
         return None
-    order_ids = set()
-    failed_orders = []
-    # The response structure may vary; adjust as needed for your API/client
-    if isinstance(resp, list):
-        for r in resp:
-            # Check for success field and log unsuccessful orders
-            if isinstance(r, dict):
-                if not r.get("success", True):
-                    failed_orders.append(r)
-                if "orderID" in r:
-                    order_ids.add(str(r["orderID"]))
-            elif hasattr(r, "orderID"):
-                order_ids.add(str(r.orderID))
-    elif isinstance(resp, dict) and "orderID" in resp:
-        order_ids.add(str(resp["orderID"]))
-    elif hasattr(resp, "orderID"):
-        order_ids.add(str(resp.orderID))
+    order_ids = set(extract_order_ids(resp))
+    # Check for success field and log unsuccessful orders
+    failed_orders = [r for r in resp if isinstance(r, dict) and not r.get("success", True)] \
+        if isinstance(resp, list) else []
     if failed_orders:
         for fail in failed_orders:
             logging.warning(f"Order not successful: {fail}")
@@ -2,10 +2,12 @@ import requests
 import json
 import os
 import logging
+import argparse
 from typing import List
-from order import prepare_client, build_orders, post_batch_orders
-from order_specs_generator import generate_specs
+from order import prepare_client, build_orders_from_batch, post_batch_orders, extract_order_ids, MAX_ORDERS_PER_BATCH
+from order_specs_generator import generate_batch, get_strategy, DEFAULT_STRATEGY
 from find_market_by_slug import find_market_by_slug
+from job_queue import schedule_redeem, schedule_take_profit
 import time
 
 # --- Persistent order count state ---
@@ -35,6 +37,11 @@ logging.basicConfig(
 # API endpoint for list of markets
 MARKET_LIST_API = "https://gamma-api.polymarket.com/events/pagination?limit=100&active=true&archived=false&tag_slug=15M&closed=false&order=volume24hr&ascending=false&offset=0"
 
+# Seconds between runs (3 hours and 1 minute)
+RUN_INTERVAL = 3 * 60 * 60 + 60
+# Ladder from order_specs_generator.STRATEGIES (linear, cong, thu)
+ORDER_STRATEGY = os.getenv("ORDER_STRATEGY", DEFAULT_STRATEGY)
+
 # Get list of market slugs from API
 
 def get_market_slugs() -> List[str]:
@@ -50,57 +57,57 @@ def get_market_slugs() -> List[str]:
             slugs.append(slug)
     return slugs
 
+def place_all_markets(client, strategy=None) -> int:
+    """Place the strategy's ladder on every listed market once; returns the number of orders posted.
+
+    Strategies with a take-profit also get a take_profit job per market, which sells each
+    filled entry at the take-profit price (job_queue.py runs it).
+    """
+    global total_orders
+    strat = get_strategy(strategy or ORDER_STRATEGY)
+    placed = 0
+    slugs = get_market_slugs()
+    logging.info(f"Found {len(slugs)} market slugs.")
+    for slug in slugs:
+        try:
+            market = find_market_by_slug(slug)
+            token_ids = json.loads(market["clobTokenIds"])
+            start_time_str = market["eventStartTime"]
+            logging.info(f"Placing {strat['name']} orders for market: {slug} | eventStartTime: {start_time_str}")
+            # Redeem once the round has resolved; the job survives restarts (job_queue.py runs it)
+            condition_id = market.get("conditionId") or market.get("condition_id")
+            if condition_id:
+                schedule_redeem(condition_id, slug)
+            batch = generate_batch([(token_ids, start_time_str)], strat["name"])
+            order_ids_dir = "order_ids"
+            os.makedirs(order_ids_dir, exist_ok=True)
+            # Only save order_ids_file for GTC orders (GTD ones expire on their own)
+            order_ids_file = os.path.join(order_ids_dir, f"placed_order_ids_{slug}.txt") \
+                if batch.order_type == "GTC" else None
+            entry_ids = []
+            for idx, start in enumerate(range(0, len(batch), MAX_ORDERS_PER_BATCH), 1):
+                orders = build_orders_from_batch(client, batch, start, start + MAX_ORDERS_PER_BATCH)
+                logging.info(f"Posting batch {idx} for {slug} with {len(orders)} orders...")
+                resp = post_batch_orders(client, orders, order_ids_file=order_ids_file)
+                entry_ids.extend(extract_order_ids(resp))
+                # Increment and save total_orders after each order is placed
+                total_orders += len(orders)
+                placed += len(orders)
+                save_order_count(total_orders)
+            if strat["take_profit"] and entry_ids:
+                schedule_take_profit(slug, entry_ids, strat["name"], start_time_str)
+        except Exception as e:
+            logging.error(f"Failed to place orders for market {slug}: {e}")
+    return placed
+
+
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Place ladder orders on every BTC 15m market, repeating.')
+    arg_parser.add_argument('--strategy', default=ORDER_STRATEGY,
+                            help=f'Strategy from order_specs_generator (default ORDER_STRATEGY={ORDER_STRATEGY})')
+    args = arg_parser.parse_args()
+    get_strategy(args.strategy)  # fail fast on an unknown name
     while True:
-        slugs = get_market_slugs()
-        logging.info(f"Found {len(slugs)} market slugs.")
-        client = prepare_client()
-        market_condition_ids_dir = "market_condition_ids"
-        os.makedirs(market_condition_ids_dir, exist_ok=True)
-        for slug in slugs:
-            try:
-                market = find_market_by_slug(slug)
-                token_ids = json.loads(market["clobTokenIds"])
-                start_time_str = market["eventStartTime"]
-                logging.info(f"Placing orders for market: {slug} | eventStartTime: {start_time_str}")
-                # Save conditionId for this market
-                # import time as _time
-                # condition_id = market.get("conditionId") or market.get("condition_id")
-                # if condition_id:
-                #     now = int(_time.time())
-                #     cid_path = os.path.join(market_condition_ids_dir, f"{slug}.txt")
-                #     with open(cid_path, "w") as f:
-                #         f.write(json.dumps({"condition_id": condition_id, "timestamp": now}))
-                #     # Schedule redeem_all.py to run 4 hours later for this specific file
-                #     import threading
-                #     import subprocess as _subprocess
-                #     import sys as _sys
-                #     def run_redeem(cid_path=cid_path):
-                #         _subprocess.Popen([_sys.executable, "redeem_all.py", cid_path])
-                #     t = threading.Timer(4 * 60 * 60, run_redeem)
-                #     t.daemon = True
-                #     t.start()
-                all_specs = generate_specs(start_time_str)
-                batches = [
-                    all_specs[i : i + 15]  # 15 is MAX_ORDERS_PER_BATCH
-                    for i in range(0, len(all_specs), 15)
-                ]
-                order_ids_dir = "order_ids"
-                os.makedirs(order_ids_dir, exist_ok=True)
-                for idx, specs_batch in enumerate(batches, 1):
-                    orders = build_orders(client, token_ids, specs_batch)
-                    logging.info(f"Posting batch {idx} for {slug} with {len(orders)} orders...")
-                    # Only save order_ids_file if at least one order in specs_batch is GTC
-                    if any(spec.get("order_type") == "GTC" for spec in specs_batch):
-                        order_ids_file = os.path.join(order_ids_dir, f"placed_order_ids_{slug}.txt")
-                        resp = post_batch_orders(client, orders, order_ids_file=order_ids_file)
-                    else:
-                        resp = post_batch_orders(client, orders, order_ids_file=None)
-                    # Increment and save total_orders after each order is placed
-                    total_orders += len(orders)
-                    save_order_count(total_orders)
-                    # logging.info(f"Response: {resp}")
-            except Exception as e:
-                logging.error(f"Failed to place orders for market {slug}: {e}")
+        place_all_markets(prepare_client(), args.strategy)
         logging.info("Sleeping for 3 hours and 1 minutes before next run...")
-        time.sleep(3 * 60 * 60 + 60)
+        time.sleep(RUN_INTERVAL)
@@ -2,11 +2,17 @@
 Tạo order_specs tự động cho cả 2 outcome:
 - Outcome 0 = Up
 - Outcome 1 = Down
-- 10 lệnh mỗi bên, giá 0.01→0.10, size 14→5
+- Mỗi strategy có ladder giá/size riêng, tính sẵn 1 lần khi import:
+  * linear: giá 0.05→0.01, size 10 (theo các hằng số bên dưới)
+  * cong:   mua 10-7-5, tiền chia 3-3-4, hủy sau 10'
+  * thu:    mua 25-20-15-10, tiền chia 1-2-3-4, hủy sau 10', khớp xong bán x2
+- Mỗi market chỉ cần gắn token + expiration vào template.
 """
 
-
+from array import array
 from datetime import timedelta
+from functools import lru_cache
+from typing import NamedTuple
 from dateutil import parser
 
 # --- CONFIGURABLE PARAMETERS ---
@@ -19,32 +25,153 @@ SIDE = "buy"         # "buy" or "sell"
 ORDER_TYPE = "GTD"   # "GTC" (hết hạn khi cancelled)  or "GTD" (hết hạn theo thời gian)
 CANCEL_MINUTES = 8
 
-def generate_specs(start_time_str: str):
-    """
-    Generate order specs for both outcomes using module-level config.
-    """
+DEFAULT_STRATEGY = "linear"
+RATIO_BUDGET = 20    # USDC mỗi bên cho các ladder chia theo tỷ lệ
+MIN_ORDER_SIZE = 5   # Size tối thiểu của CLOB
+MAX_TAKE_PROFIT_PRICE = 0.99
+
+
+def linear_ladder(price_start, price_step, size_start, size_step, num_orders):
+    """(prices, sizes) của ladder tuyến tính kiểu PRICE_START/PRICE_STEP."""
+    prices = [round(price_start + price_step * i, 2) for i in range(num_orders)]
+    sizes = [size_start + size_step * i for i in range(num_orders)]
+    return prices, sizes
+
+
+def ratio_ladder(prices, ratios, budget=RATIO_BUDGET):
+    """(prices, sizes) chia `budget` USDC theo tỷ lệ `ratios` cho từng mức giá (size nguyên)."""
+    total = sum(ratios)
+    sizes = [max(MIN_ORDER_SIZE, int(budget * w / total / p)) for p, w in zip(prices, ratios)]
+    return list(prices), sizes
+
+
+# name -> strategy dict với ladder tính sẵn
+STRATEGIES = {}
+
+
+def register_strategy(name, prices, sizes, cancel_minutes=CANCEL_MINUTES, side=SIDE,
+                      order_type=ORDER_TYPE, take_profit=None):
+    """Đăng ký strategy; template specs (không có expiration) được tính sẵn 1 lần ở đây."""
+    if len(prices) != len(sizes):
+        raise ValueError(f"Strategy '{name}': prices and sizes must have the same length")
+    templates = tuple(
+        {
+            "outcome_index": outcome_idx,
+            "price": p,
+            "size": s,
+            "side": side,
+            "order_type": order_type,
+        }
+        for outcome_idx in [0, 1]
+        for p, s in zip(prices, sizes)
+    )
+    STRATEGIES[name] = {
+        "name": name,
+        "prices": tuple(prices),
+        "sizes": tuple(sizes),
+        "cancel_minutes": cancel_minutes,
+        "side": side,
+        "order_type": order_type,
+        "take_profit": take_profit,
+        "templates": templates,
+        # Cột cho batch: lặp lại nguyên khối cho mỗi market
+        "outcome_col": array("b", (t["outcome_index"] for t in templates)),
+        "price_col": array("d", (t["price"] for t in templates)),
+        "size_col": array("d", (t["size"] for t in templates)),
+    }
+    return STRATEGIES[name]
+
+
+def get_strategy(name=None):
+    name = name or DEFAULT_STRATEGY
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown strategy '{name}'. Available: {', '.join(sorted(STRATEGIES))}")
+
+
+register_strategy("linear", *linear_ladder(PRICE_START, PRICE_STEP, SIZE_START, SIZE_STEP, NUM_ORDERS_PER_SIDE))
+register_strategy("cong", *ratio_ladder([0.10, 0.07, 0.05], [3, 3, 4]), cancel_minutes=10)
+register_strategy("thu", *ratio_ladder([0.25, 0.20, 0.15, 0.10], [1, 2, 3, 4]), cancel_minutes=10, take_profit=2.0)
+
+
+@lru_cache(maxsize=1024)
+def _expiration(start_time_str: str, cancel_minutes) -> int:
     start_time = parser.isoparse(start_time_str)
-    cancel_time = start_time + timedelta(minutes=CANCEL_MINUTES)
-    expiration = int(cancel_time.timestamp())  # epoch UTC giây
+    cancel_time = start_time + timedelta(minutes=cancel_minutes)
+    return int(cancel_time.timestamp())  # epoch UTC giây
 
-    prices = [round(PRICE_START + PRICE_STEP * i, 2) for i in range(NUM_ORDERS_PER_SIDE)]
-    sizes = [SIZE_START + SIZE_STEP * i for i in range(NUM_ORDERS_PER_SIDE)]
-    specs = []
 
-    for outcome_idx in [0, 1]:
-        for p, s in zip(prices, sizes):
-            specs.append({
-                "outcome_index": outcome_idx,
-                "price": p,
-                "size": s,
-                "side": SIDE,
-                "order_type": ORDER_TYPE,
-                "expiration": expiration
-            })
+def generate_specs(start_time_str: str, strategy=None, token_ids=None):
+    """
+    Generate order specs for both outcomes from a precomputed strategy ladder.
+    Only expiration (and token_id when token_ids is given) is stamped per market.
+    """
+    strat = get_strategy(strategy)
+    expiration = _expiration(start_time_str, strat["cancel_minutes"])
+    specs = []
+    for t in strat["templates"]:
+        spec = dict(t, expiration=expiration)
+        if token_ids is not None:
+            spec["token_id"] = token_ids[t["outcome_index"]]
+        specs.append(spec)
     return specs
 
+
+def take_profit_spec(outcome_index, entry_price, size, strategy=None):
+    """Lệnh bán chốt lời sau khi 1 lệnh mua khớp (None nếu strategy không có take-profit)."""
+    strat = get_strategy(strategy)
+    if not strat["take_profit"]:
+        return None
+    return {
+        "outcome_index": outcome_index,
+        "price": min(round(entry_price * strat["take_profit"], 2), MAX_TAKE_PROFIT_PRICE),
+        "size": size,
+        "side": "sell",
+        "order_type": "GTC",
+    }
+
+
+class SpecBatch(NamedTuple):
+    """Specs của nhiều market dạng cột; hàng i = 1 lệnh, token = tokens[token_idx[i]]."""
+    tokens: list        # token id (str) duy nhất
+    token_idx: array    # 'I' chỉ số vào tokens
+    price: array        # 'd'
+    size: array         # 'd'
+    expiration: array   # 'q'
+    side: str
+    order_type: str
+
+    def __len__(self):
+        return len(self.price)
+
+
+def generate_batch(markets, strategy=None) -> SpecBatch:
+    """
+    Specs cho nhiều market cùng lúc. markets: iterable of (token_ids, start_time_str).
+    Template của strategy được lặp nguyên khối, chỉ token và expiration thay đổi theo market.
+    """
+    strat = get_strategy(strategy)
+    rows = len(strat["templates"])
+    tokens = []
+    token_idx = array("I")
+    expiration = array("q")
+    n = 0
+    for token_ids, start_time_str in markets:
+        base = len(tokens)
+        tokens.extend(token_ids)
+        token_idx.extend(base + o for o in strat["outcome_col"])
+        expiration.extend([_expiration(start_time_str, strat["cancel_minutes"])] * rows)
+        n += 1
+    return SpecBatch(tokens, token_idx, strat["price_col"] * n, strat["size_col"] * n, expiration,
+                     strat["side"], strat["order_type"])
+
+
 if __name__ == "__main__":
     # test
     test_start = "2025-09-18T07:15:00Z"
     s = generate_specs(test_start)
-    print("First spec example:", s)
\ No newline at end of file
+    print("First spec example:", s)
+    for name, strat in STRATEGIES.items():
+        print(name, list(zip(strat["prices"], strat["sizes"])), f"cancel {strat['cancel_minutes']}'",
+              f"take-profit x{strat['take_profit']}" if strat["take_profit"] else "")
@@ -0,0 +1,338 @@
+"""
+Batch-redeem resolved Polymarket positions through the proxy wallet.
+
+Markets to redeem come from fetch_redeemable_positions (Data API positions cache),
+optionally narrowed to the conditionIds in market_condition_ids/*.txt files written at
+order time. Held balances are re-checked on-chain in one multicall (onchain_reader), so
+markets the Data API still lists after they were redeemed are not paid for twice.
+
+The CTF redeemPositions calls of up to REDEEM_BATCH_SIZE markets are bundled into one
+ProxyWalletFactory.proxy() transaction signed by KEY: one transaction, one nonce and
+one base cost per batch instead of per market. Each batch is simulated with eth_call
+first; a reverting batch is split in halves until the failing markets are isolated and
+skipped. Batches are sent with consecutive nonces and their receipts awaited together.
+
+Only Polymarket proxy wallets (SIGNATURE_TYPE=1) are supported. Gnosis Safe wallets
+(SIGNATURE_TYPE=2) need a signed Safe transaction, and negative-risk markets redeem
+through the NegRiskAdapter; both are reported and skipped.
+
+Usage:
+    python redeem_all.py --dry-run
+    python redeem_all.py                                    # redeem everything redeemable
+    python redeem_all.py market_condition_ids/some-slug.txt # only these markets
+    python redeem_all.py --every 3600                       # keep redeeming hourly
+    python redeem_all.py --rpc http://127.0.0.1:8545        # e.g. a local anvil fork
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import logging
+import argparse
+from importlib.util import find_spec
+
+# Handle missing dependencies gracefully. web3 is only imported once a Redeemer is built
+# (it dominates startup), but its absence is still reported here.
+try:
+    import dotenv
+    if find_spec('web3') is None:
+        raise ImportError("No module named 'web3'")
+except ImportError as e:
+    missing = str(e).split('No module named ')[-1].replace("'", "")
+    raise ImportError(f"Required package '{missing}' is not installed. Please install all dependencies with 'pip install python-dotenv web3'.")
+
+from fetch_redeemable_positions import fetch_redeemable_positions
+from export_data.fill_template import fetch_positions
+from notification.onchain_balance import USDC_ADDRESS
+from notification.onchain_reader import OnchainReader, ctf_balance_query, CTF_ADDRESS
+from notification.rpc_pool import get_pool
+
+# --- Logging setup ---
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s %(levelname)s %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+
+dotenv.load_dotenv()
+
+CHAIN_ID = int(os.getenv("CHAIN_ID", "137"))
+KEY = os.getenv("KEY")
+POLYMARKET_PROXY_ADDRESS = os.getenv("POLYMARKET_PROXY_ADDRESS")
+SIGNATURE_TYPE = int(os.getenv("SIGNATURE_TYPE", "1"))
+PROXY_FACTORY_ADDRESS = "0xaB45c5A4B0c941a2F231C04C3f49182e1A254052"
+CONDITION_IDS_DIR = "market_condition_ids"
+REDEEM_BATCH_SIZE = int(os.getenv("REDEEM_BATCH_SIZE", "20"))
+REDEEM_INTERVAL = int(os.getenv("REDEEM_INTERVAL", "3600"))
+GAS_MULTIPLIER = 1.25
+MIN_PRIORITY_FEE = 30 * 10**9   # 30 gwei; Polygon rejects tips below ~25-30 gwei
+RECEIPT_TIMEOUT = 300
+PARENT_COLLECTION_ID = b'\x00' * 32
+BINARY_INDEX_SETS = [1, 2]
+CALL_TYPE_CALL = 1
+NOTHING_HELD = 'nothing held on-chain'
+LOST = 'every held outcome lost'
+NO_POSITION = 'no position held'
+
+CTF_ABI = [{
+    "name": "redeemPositions", "type": "function", "stateMutability": "nonpayable",
+    "inputs": [
+        {"name": "collateralToken", "type": "address"},
+        {"name": "parentCollectionId", "type": "bytes32"},
+        {"name": "conditionId", "type": "bytes32"},
+        {"name": "indexSets", "type": "uint256[]"},
+    ],
+    "outputs": [],
+}]
+PROXY_FACTORY_ABI = [{
+    "name": "proxy", "type": "function", "stateMutability": "payable",
+    "inputs": [{
+        "name": "calls", "type": "tuple[]",
+        "components": [
+            {"name": "typeCode", "type": "uint8"},
+            {"name": "to", "type": "address"},
+            {"name": "value", "type": "uint256"},
+            {"name": "data", "type": "bytes"},
+        ],
+    }],
+    "outputs": [{"name": "returnValues", "type": "bytes[]"}],
+}]
+
+
+def read_condition_id_files(paths) -> dict:
+    """{condition_id: path} from market_condition_ids files ({"condition_id": ..., "timestamp": ...})."""
+    out = {}
+    for path in paths:
+        try:
+            with open(path) as f:
+                cid = json.load(f).get('condition_id')
+        except (OSError, ValueError) as e:
+            logging.warning(f"Skipping {path}: {e}")
+            continue
+        if cid:
+            out[cid.lower()] = path
+    return out
+
+
+def _encode(contract, fn_name, args) -> bytes:
+    # web3 >= 7 renamed encodeABI to encode_abi
+    if hasattr(contract, 'encode_abi'):
+        data = contract.encode_abi(fn_name, args=args)
+    else:
+        data = contract.encodeABI(fn_name=fn_name, args=args)
+    return bytes.fromhex(data[2:])
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class Redeemer:
+    """Builds, simulates and sends batched redeem transactions for one proxy wallet."""
+
+    def __init__(self, rpc_url=None, key=KEY, proxy_address=POLYMARKET_PROXY_ADDRESS,
+                 batch_size=REDEEM_BATCH_SIZE):
+        if SIGNATURE_TYPE != 1:
+            raise ValueError("Only Polymarket proxy wallets (SIGNATURE_TYPE=1) can be redeemed by this script")
+        if not key or not proxy_address:
+            raise ValueError("KEY and POLYMARKET_PROXY_ADDRESS must be set")
+        from web3 import Web3
+        # Writes go to one endpoint: the fastest healthy one of the RPC pool unless given
+        self.rpc_url = rpc_url or get_pool(wait_probe=True).ranked()[0].url
+        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url, request_kwargs={'timeout': 30}))
+        self.account = self.w3.eth.account.from_key(key)
+        self.proxy_address = Web3.to_checksum_address(proxy_address)
+        self.batch_size = max(1, batch_size)
+        self.ctf = self.w3.eth.contract(address=Web3.to_checksum_address(CTF_ADDRESS), abi=CTF_ABI)
+        self.factory = self.w3.eth.contract(address=PROXY_FACTORY_ADDRESS, abi=PROXY_FACTORY_ABI)
+        self.collateral = Web3.to_checksum_address(USDC_ADDRESS)
+        self.reader = OnchainReader(rpc_url)
+
+    def _calls(self, markets):
+        return [(CALL_TYPE_CALL, self.ctf.address, 0,
+                 _encode(self.ctf, 'redeemPositions',
+                         [self.collateral, PARENT_COLLECTION_ID, bytes.fromhex(m['condition_id'][2:]), BINARY_INDEX_SETS]))
+                for m in markets]
+
+    def held(self, markets) -> list[dict]:
+        """Markets whose outcome tokens the proxy still holds on-chain (one multicall for all)."""
+        queries = [ctf_balance_query(self.proxy_address, asset, ctf=self.ctf.address, key=(m['condition_id'], asset))
+                   for m in markets for asset in m['assets']]
+        if not queries:
+            return markets
+        try:
+            balances = self.reader.read_balances(queries)
+        except Exception as e:
+            logging.warning(f"On-chain balance check failed ({e}); using Data API positions as-is")
+            return markets
+        held = {}
+        for (cid, _), bal in balances.items():
+            # A failed read counts as held: the simulation still guards the transaction
+            held[cid] = held.get(cid, False) or bal is None or bal['raw'] > 0
+        return [m for m in markets if held.get(m['condition_id'], True)]
+
+    def simulate(self, markets):
+        """(ok, failed) where failed is [(market, reason)]; reverting batches are bisected."""
+        from web3.exceptions import ContractLogicError
+        try:
+            self.factory.functions.proxy(self._calls(markets)).call({'from': self.account.address})
+            return list(markets), []
+        except ContractLogicError as e:
+            if len(markets) == 1:
+                return [], [(markets[0], str(e))]
+        mid = len(markets) // 2
+        ok1, failed1 = self.simulate(markets[:mid])
+        ok2, failed2 = self.simulate(markets[mid:])
+        return ok1 + ok2, failed1 + failed2
+
+    def _fees(self) -> dict:
+        # Fees come from eth_feeHistory, so no POA block decoding (Polygon) is needed
+        history = self.w3.eth.fee_history(1, 'latest')
+        base_fee = history['baseFeePerGas'][-1]
+        tip = max(self.w3.eth.max_priority_fee, MIN_PRIORITY_FEE)
+        return {'maxPriorityFeePerGas': tip, 'maxFeePerGas': 2 * base_fee + tip}
+
+    def send(self, batches) -> list[dict]:
+        """Sign and send every batch with consecutive nonces, then wait for all receipts."""
+        address = self.account.address
+        nonce = self.w3.eth.get_transaction_count(address, 'pending')
+        fees = self._fees()
+        sent = []
+        for markets in batches:
+            fn = self.factory.functions.proxy(self._calls(markets))
+            gas = int(fn.estimate_gas({'from': address}) * GAS_MULTIPLIER)
+            tx = fn.build_transaction({'from': address, 'nonce': nonce, 'chainId': CHAIN_ID, 'gas': gas, **fees})
+            signed = self.account.sign_transaction(tx)
+            raw = getattr(signed, 'raw_transaction', None) or signed.rawTransaction
+            tx_hash = self.w3.eth.send_raw_transaction(raw)
+            logging.info(f"Sent redeem tx {self.w3.to_hex(tx_hash)} for {len(markets)} markets (nonce {nonce}, gas {gas})")
+            sent.append({'tx': self.w3.to_hex(tx_hash), 'markets': markets})
+            nonce += 1
+        for item in sent:
+            receipt = self.w3.eth.wait_for_transaction_receipt(item['tx'], timeout=RECEIPT_TIMEOUT)
+            item['status'] = receipt['status']
+            item['gas_used'] = receipt['gasUsed']
+            level = logging.INFO if receipt['status'] == 1 else logging.ERROR
+            logging.log(level, f"Redeem tx {item['tx']} status={receipt['status']} gasUsed={receipt['gasUsed']}")
+        return sent
+
+    def redeem(self, markets, dry_run=False) -> dict:
+        """Redeem the given markets; returns {'redeemed', 'skipped', 'failed', 'txs'}."""
+        result = {'redeemed': [], 'skipped': [], 'failed': [], 'txs': []}
+        for m in markets:
+            if m['negative_risk']:
+                result['skipped'].append((m, 'negative-risk market'))
+        markets = [m for m in markets if not m['negative_risk']]
+        held = self.held(markets)
+        held_ids = {m['condition_id'] for m in held}
+        result['skipped'].extend((m, NOTHING_HELD) for m in markets if m['condition_id'] not in held_ids)
+
+        batches = []
+        for chunk in _chunks(held, self.batch_size):
+            ok, failed = self.simulate(chunk)
+            result['failed'].extend(failed)
+            if ok:
+                batches.append(ok)
+        if dry_run:
+            for markets in batches:
+                gas = self.factory.functions.proxy(self._calls(markets)).estimate_gas({'from': self.account.address})
+                logging.info(f"[DRY] Would redeem {len(markets)} markets in one tx (gas ~{gas}): "
+                             f"{', '.join(m['title'] or m['condition_id'] for m in markets)}")
+                result['redeemed'].extend(markets)
+            return result
+        if batches:
+            result['txs'] = self.send(batches)
+            for item in result['txs']:
+                if item['status'] == 1:
+                    result['redeemed'].extend(item['markets'])
+                else:
+                    result['failed'].extend((m, f"tx {item['tx']} reverted") for m in item['markets'])
+        return result
+
+
+def run_once(paths=None, dry_run=False, rpc_url=None, batch_size=REDEEM_BATCH_SIZE, condition_ids=None) -> dict:
+    """Redeem everything redeemable, or only the given markets (condition id files and/or ids).
+
+    Returns {'redeemed', 'skipped', 'failed', 'txs', 'pending'}; 'pending' lists the requested
+    condition ids that are held but not redeemable yet. Requested markets the wallet holds no
+    position in (no order filled, or already redeemed) are skipped as NO_POSITION.
+    """
+    # Always read fresh positions: a stale cache would re-list markets just redeemed
+    markets = fetch_redeemable_positions(POLYMARKET_PROXY_ADDRESS, max_age=0, include_worthless=True)
+    files = read_condition_id_files(paths) if paths is not None else {}
+    pending, unheld = [], []
+    if paths is not None or condition_ids is not None:
+        wanted = set(files) | {c.lower() for c in condition_ids or ()}
+        markets = [m for m in markets if m['condition_id'].lower() in wanted]
+        pending = sorted(wanted - {m['condition_id'].lower() for m in markets})
+        if pending:
+            # fetch_redeemable_positions just refreshed the positions cache
+            held = {str(p.get('conditionId') or '').lower() for p in fetch_positions(POLYMARKET_PROXY_ADDRESS)}
+            unheld = [c for c in pending if c not in held]
+            pending = [c for c in pending if c in held]
+            if unheld:
+                logging.info(f"{len(unheld)} markets hold no position: {', '.join(files.get(c, c) for c in unheld)}")
+        if pending:
+            logging.info(f"{len(pending)} markets not redeemable yet: {', '.join(files.get(c, c) for c in pending)}")
+    lost = [m for m in markets if m['value'] <= 0]
+    markets = [m for m in markets if m['value'] > 0]
+    result = {'redeemed': [], 'skipped': [(m, LOST) for m in lost], 'failed': [], 'txs': [], 'pending': pending}
+    result['skipped'].extend(({'condition_id': c, 'title': None, 'value': 0.0}, NO_POSITION) for c in unheld)
+    if not markets:
+        logging.info("Nothing to redeem.")
+    else:
+        logging.info(f"{len(markets)} redeemable markets, {round(sum(m['value'] for m in markets), 2)} USDC")
+        out = Redeemer(rpc_url, batch_size=batch_size).redeem(markets, dry_run=dry_run)
+        result.update(redeemed=out['redeemed'], failed=out['failed'], txs=out['txs'])
+        result['skipped'].extend(out['skipped'])
+        for m, reason in out['skipped']:
+            logging.info(f"Skipped {m['title'] or m['condition_id']}: {reason}")
+        for m, reason in out['failed']:
+            logging.error(f"Failed {m['title'] or m['condition_id']}: {reason}")
+        value = round(sum(m['value'] for m in result['redeemed']), 2)
+        if dry_run:
+            logging.info(f"[DRY] Would redeem {len(result['redeemed'])} markets, {value} USDC")
+        else:
+            logging.info(f"Redeemed {len(result['redeemed'])} markets in {len(result['txs'])} txs, {value} USDC")
+    if not dry_run:
+        # Condition id files are done once their market is redeemed or nothing is left to redeem
+        done = {m['condition_id'].lower() for m in result['redeemed']} | \
+               {m['condition_id'].lower() for m, reason in result['skipped'] if reason in (NOTHING_HELD, LOST, NO_POSITION)}
+        for cid in done & set(files):
+            os.remove(files[cid])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch-redeem resolved Polymarket positions through the proxy wallet.')
+    parser.add_argument('paths', nargs='*', help='market_condition_ids files to redeem (default: every redeemable market)')
+    parser.add_argument('--all-files', action='store_true', help=f'Use every file in {CONDITION_IDS_DIR}/')
+    parser.add_argument('--dry-run', action='store_true', help='Simulate and estimate gas without sending')
+    parser.add_argument('--rpc', default=None, help='RPC URL for reads and the transaction (default: the rpc_pool endpoints)')
+    parser.add_argument('--batch-size', type=int, default=REDEEM_BATCH_SIZE, help='Markets per transaction')
+    parser.add_argument('--every', type=int, default=0, metavar='SECONDS',
+                        help=f'Repeat every SECONDS (e.g. {REDEEM_INTERVAL}) instead of running once')
+    args = parser.parse_args()
+
+    while True:
+        paths = args.paths or (glob.glob(os.path.join(CONDITION_IDS_DIR, '*.txt')) if args.all_files else None)
+        started = time.time()
+        try:
+            run_once(paths, args.dry_run, args.rpc, args.batch_size)
+        except Exception as e:
+            logging.error(f"Redeem run failed: {e}")
+            if not args.every:
+                sys.exit(1)
+        if not args.every:
+            return
+        time.sleep(max(0.0, args.every - (time.time() - started)))
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
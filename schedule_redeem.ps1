@@ -0,0 +1,39 @@
+# Schedule batch redeem of resolved positions every N minutes
+# Run this script as Administrator to set up the scheduled task
+
+param(
+    [int]$EveryMinutes = 60   # Default to hourly
+)
+
+$TaskName = "PolymarketRedeem"
+$WorkingDir = Get-Location
+$PythonScript = "redeem_all.py"
+$Arguments = ""
+
+Write-Host "Setting up redeem task: $TaskName"
+Write-Host "Schedule: every $EveryMinutes minutes"
+Write-Host "Working directory: $WorkingDir"
+Write-Host "Command: python $PythonScript $Arguments"
+
+# Check if task already exists and delete it
+$ExistingTask = Get-ScheduledTask -TaskName $TaskName -ErrorAction SilentlyContinue
+if ($ExistingTask) {
+    Write-Host "Task $TaskName already exists. Removing..."
+    Unregister-ScheduledTask -TaskName $TaskName -Confirm:$false
+}
+
+# Create the scheduled task - repeats from now on, indefinitely
+$Action = New-ScheduledTaskAction -Execute "python" -Argument "$PythonScript $Arguments" -WorkingDirectory $WorkingDir
+$Trigger = New-ScheduledTaskTrigger -Once -At (Get-Date) -RepetitionInterval (New-TimeSpan -Minutes $EveryMinutes)
+$Settings = New-ScheduledTaskSettingsSet -AllowStartIfOnBatteries -DontStopIfGoingOnBatteries -StartWhenAvailable -MultipleInstances IgnoreNew
+
+# Register the task
+Register-ScheduledTask -TaskName $TaskName -Action $Action -Trigger $Trigger -Settings $Settings -Description "Batch-redeem resolved Polymarket positions every $EveryMinutes minutes"
+
+Write-Host "Task $TaskName has been scheduled successfully!"
+Write-Host ""
+Write-Host "Usage examples:"
+Write-Host "  Hourly: Run as-is"
+Write-Host "  Every 4 hours: powershell -ExecutionPolicy Bypass -File schedule_redeem.ps1 -EveryMinutes 240"
+Write-Host ""
+Write-Host "To test manually: python $PythonScript --dry-run"
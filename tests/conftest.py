@@ -0,0 +1,71 @@
+"""
+Shared fixtures: the project root on sys.path and a local HTTP server that stands in
+for the external APIs (Telegram Bot API, Polygon JSON-RPC).
+
+Run from the project root:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+class FakeServer:
+    """Answers every POST with handler(path, body_bytes, headers) -> (status, body).
+
+    body may be bytes or anything JSON-serializable. Requests are kept in `requests`
+    as (path, body_bytes, headers).
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                fake.requests.append((self.path, body, dict(self.headers)))
+                status, payload = fake.handler(self.path, body, self.headers)
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def fake_server():
+    """Factory: fake_server(handler) starts a FakeServer that is shut down after the test."""
+    servers = []
+
+    def start(handler):
+        server = FakeServer(handler)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
@@ -0,0 +1,169 @@
+"""OnchainReader against a stub Polygon JSON-RPC server: aggregate3 codec, batching, fallback."""
+
+import json
+
+import pytest
+
+from notification import onchain_reader
+from notification.onchain_reader import (
+    OnchainReader, MULTICALL3_ADDRESS, CTF_ADDRESS, AGGREGATE3,
+    encode_aggregate3, decode_aggregate3, wallet_balance_queries,
+)
+from notification.onchain_balance import USDC_ADDRESS
+
+WALLET_A = '0x' + 'a1' * 20
+WALLET_B = '0x' + 'b2' * 20
+TOKEN_ID = 1234
+
+
+def _word(value):
+    return value.to_bytes(32, 'big')
+
+
+def parse_aggregate3(calldata_hex):
+    """[(target, allow_failure, data_hex), ...] from aggregate3 calldata (the stub's decoder)."""
+    assert calldata_hex[:8] == AGGREGATE3
+    buf = bytes.fromhex(calldata_hex[8:])
+    base = int.from_bytes(buf[0:32], 'big')
+    n = int.from_bytes(buf[base:base + 32], 'big')
+    items = base + 32
+    calls = []
+    for i in range(n):
+        pos = items + int.from_bytes(buf[items + 32 * i:items + 32 * i + 32], 'big')
+        target = '0x' + buf[pos + 12:pos + 32].hex()
+        allow_failure = buf[pos + 63] == 1
+        data_pos = pos + int.from_bytes(buf[pos + 64:pos + 96], 'big')
+        size = int.from_bytes(buf[data_pos:data_pos + 32], 'big')
+        calls.append((target, allow_failure, buf[data_pos + 32:data_pos + 32 + size].hex()))
+    return calls
+
+
+def encode_results(results):
+    """ABI-encode aggregate3's (bool success, bytes returnData)[] from [(success, bytes), ...]."""
+    tails = []
+    for success, data in results:
+        padded = data + b'\0' * (-len(data) % 32)
+        tails.append(_word(1 if success else 0) + _word(64) + _word(len(data)) + padded)
+    heads, offset = [], 32 * len(results)
+    for tail in tails:
+        heads.append(_word(offset))
+        offset += len(tail)
+    return '0x' + (_word(32) + _word(len(results)) + b''.join(heads) + b''.join(tails)).hex()
+
+
+class StubChain:
+    """JSON-RPC eth_call over a {(to, calldata_hex): balance} map; unknown calls revert."""
+
+    def __init__(self, fake_server, balances, multicall=True):
+        self.balances = balances
+        self.multicall = multicall
+        self.batch_sizes = []
+        self.server = fake_server(self.handle)
+
+    def _call(self, to, data):
+        if to == MULTICALL3_ADDRESS:
+            if not self.multicall:
+                return '0x'  # no code at the address
+            results = []
+            for target, _, sub in parse_aggregate3(data):
+                value = self.balances.get((target, sub))
+                results.append((False, b'') if value is None else (True, _word(value)))
+            return encode_results(results)
+        value = self.balances.get((to, data))
+        return None if value is None else '0x' + _word(value).hex()
+
+    def _answer(self, request):
+        to = request['params'][0]['to']
+        result = self._call(to, request['params'][0]['data'][2:])
+        if result is None:
+            return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32000, 'message': 'execution reverted'}}
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': result}
+
+    def handle(self, path, body, headers):
+        payload = json.loads(body)
+        if isinstance(payload, list):
+            self.batch_sizes.append(len(payload))
+            # Answer out of order, as some RPCs do
+            return 200, [self._answer(r) for r in reversed(payload)]
+        self.batch_sizes.append(None)
+        return 200, self._answer(payload)
+
+
+@pytest.fixture
+def chain(fake_server):
+    balances = {}
+    for wallet, usdc, position in ((WALLET_A, 12_500_000, 5_000_000), (WALLET_B, 0, 7_250_000)):
+        for q in wallet_balance_queries([wallet], [TOKEN_ID]):
+            balances[(q.to, q.data)] = usdc if q.key[1] == 'usdc' else position
+    return lambda **kwargs: StubChain(fake_server, balances, **kwargs)
+
+
+def test_encode_aggregate3_round_trips():
+    calls = [(USDC_ADDRESS.lower(), 'aa' * 36), (CTF_ADDRESS, 'bb' * 68), (WALLET_A, '')]
+    data = encode_aggregate3(calls)
+    assert parse_aggregate3(data) == [(to, True, d) for to, d in calls]
+    assert [c[1] for c in parse_aggregate3(encode_aggregate3(calls, allow_failure=False))] == [False] * 3
+
+
+def test_encode_aggregate3_matches_eth_abi():
+    eth_abi = pytest.importorskip('eth_abi')
+    calls = [(USDC_ADDRESS.lower(), 'aa' * 36), (CTF_ADDRESS, 'bb' * 68)]
+    expected = eth_abi.encode(['(address,bool,bytes)[]'], [[(to, True, bytes.fromhex(d)) for to, d in calls]])
+    assert encode_aggregate3(calls) == AGGREGATE3 + expected.hex()
+
+
+def test_decode_aggregate3_marks_failed_calls():
+    results = [(True, _word(7)), (False, b'\x08\xc3\x79\xa0' + b'\0' * 40), (True, b''), (True, _word(2 ** 255))]
+    decoded = decode_aggregate3(encode_results(results))
+    assert decoded == [_word(7), None, b'', _word(2 ** 255)]
+    assert decode_aggregate3(encode_results([])) == []
+
+
+def test_read_balances_multicall(chain):
+    stub = chain()
+    queries = wallet_balance_queries([WALLET_A, WALLET_B], [TOKEN_ID, 999])
+    balances = OnchainReader(stub.server.url).read_balances(queries, mode='multicall')
+    assert stub.batch_sizes == [None]  # one eth_call for all six reads
+    assert balances[(WALLET_A, 'usdc')] == {'raw': 12_500_000, 'human': 12.5}
+    assert balances[(WALLET_B, str(TOKEN_ID))]['human'] == 7.25
+    assert balances[(WALLET_B, 'usdc')]['raw'] == 0
+    assert balances[(WALLET_A, '999')] is None  # reverted sub-call
+
+
+def test_multicall_is_chunked(chain, monkeypatch):
+    monkeypatch.setattr(onchain_reader, 'MULTICALL_CHUNK', 4)
+    stub = chain()
+    queries = wallet_balance_queries([WALLET_A, WALLET_B], [TOKEN_ID, 1, 2])
+    balances = OnchainReader(stub.server.url).read_balances(queries, mode='multicall')
+    assert stub.batch_sizes == [None, None]
+    assert balances[(WALLET_B, str(TOKEN_ID))]['raw'] == 7_250_000
+
+
+def test_eth_call_batch_is_chunked(chain, monkeypatch):
+    monkeypatch.setattr(onchain_reader, 'BATCH_CHUNK', 3)
+    stub = chain()
+    queries = wallet_balance_queries([WALLET_A, WALLET_B], [TOKEN_ID, 1, 2])
+    reader = OnchainReader(stub.server.url)
+    results = reader.eth_call_batch([(q.to, q.data) for q in queries])
+    assert stub.batch_sizes == [3, 3, 2]
+    by_key = dict(zip((q.key for q in queries), results))
+    assert by_key[(WALLET_A, 'usdc')] == _word(12_500_000)
+    assert by_key[(WALLET_B, str(TOKEN_ID))] == _word(7_250_000)
+    assert by_key[(WALLET_A, '1')] is None  # per-call error
+
+
+def test_auto_falls_back_to_batch_without_multicall(chain):
+    stub = chain(multicall=False)
+    queries = wallet_balance_queries([WALLET_A, WALLET_B], [TOKEN_ID])
+    reader = OnchainReader(stub.server.url)
+    balances = reader.read_balances(queries)
+    assert stub.batch_sizes == [None, 4]
+    assert balances[(WALLET_A, 'usdc')]['human'] == 12.5
+    assert balances[(WALLET_B, str(TOKEN_ID))]['human'] == 7.25
+    with pytest.raises(RuntimeError, match='Multicall3'):
+        reader.read_balances(queries, mode='multicall')
+
+
+def test_unknown_mode_is_rejected(chain):
+    with pytest.raises(ValueError):
+        OnchainReader(chain().server.url).read([], mode='fast')
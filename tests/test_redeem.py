@@ -0,0 +1,218 @@
+"""Redeem flow: grouping positions, on-chain held check, simulation bisection and run_once.
+
+Redeemer talks to a stub JSON-RPC server that reverts any proxy() batch containing a bad
+market, so the bisection runs through web3 exactly as against Polygon. run_once gets the
+positions and the Redeemer patched in. The web3 tests are skipped when web3 isn't installed.
+"""
+
+import json
+
+import pytest
+
+from fetch_redeemable_positions import group_redeemable
+
+PROXY = '0x' + '5a' * 20
+# Any valid secp256k1 key; nothing is signed or sent in these tests
+KEY = '0x' + '11' * 32
+
+
+def cid(n):
+    return '0x' + format(n, '064x')
+
+
+def position(n, value, asset=None, redeemable=True, **extra):
+    return {'conditionId': cid(n), 'title': f"market {n}", 'slug': f"m-{n}", 'redeemable': redeemable,
+            'size': value, 'currentValue': value, 'asset': asset or str(1000 + n), 'outcome': 'Up', **extra}
+
+
+def market(n, value=1.0, assets=None, negative_risk=False):
+    return {'condition_id': cid(n), 'title': f"market {n}", 'slug': f"m-{n}", 'negative_risk': negative_risk,
+            'size': value, 'value': value, 'assets': assets or [str(1000 + n)], 'outcomes': ['Up']}
+
+
+def test_group_redeemable_merges_outcomes_and_drops_worthless():
+    positions = [position(1, 2.0, asset='11'), position(1, 0.0, asset='12'), position(2, 0.0),
+                 position(3, 5.0), position(4, 9.0, redeemable=False), position(5, 1.0, negativeRisk=True)]
+    markets = group_redeemable(positions)
+    assert [m['condition_id'] for m in markets] == [cid(3), cid(1), cid(5)]
+    assert markets[1]['assets'] == ['11', '12'] and markets[1]['value'] == 2.0
+    assert markets[2]['negative_risk'] is True
+    everything = group_redeemable(positions, include_worthless=True)
+    assert {m['condition_id'] for m in everything} == {cid(1), cid(2), cid(3), cid(5)}
+
+
+# --- Redeemer (web3) ---
+@pytest.fixture
+def redeem_all():
+    pytest.importorskip('web3')
+    import redeem_all
+    return redeem_all
+
+
+class StubPolygon:
+    """eth_call for ProxyWalletFactory.proxy(): reverts when a batch redeems a market in `bad`."""
+
+    def __init__(self, fake_server, bad=()):
+        from eth_abi import decode
+        self._decode = decode
+        self.bad = set(bad)
+        self.batches = []
+        self.server = fake_server(self.handle)
+
+    def _condition_ids(self, calldata):
+        calls = self._decode(['(uint8,address,uint256,bytes)[]'], calldata[4:])[0]
+        # redeemPositions(address collateral, bytes32 parent, bytes32 conditionId, uint256[] indexSets)
+        return ['0x' + data[4 + 64:4 + 96].hex() for _, _, _, data in calls]
+
+    def handle(self, path, body, headers):
+        from eth_abi import encode
+        request = json.loads(body)
+        reply = {'jsonrpc': '2.0', 'id': request['id']}
+        if request['method'] == 'eth_chainId':
+            return 200, dict(reply, result='0x89')
+        if request['method'] != 'eth_call':
+            return 200, dict(reply, error={'code': -32601, 'message': 'method not found'})
+        ids = self._condition_ids(bytes.fromhex(request['params'][0]['data'][2:]))
+        self.batches.append(ids)
+        if self.bad & set(ids):
+            revert = '0x08c379a0' + encode(['string'], ['condition not resolved']).hex()
+            return 200, dict(reply, error={'code': 3, 'message': 'execution reverted: condition not resolved',
+                                           'data': revert})
+        return 200, dict(reply, result='0x' + encode(['bytes[]'], [[b''] * len(ids)]).hex())
+
+
+def test_simulate_bisects_to_the_reverting_markets(redeem_all, fake_server):
+    chain = StubPolygon(fake_server, bad={cid(3), cid(6)})
+    redeemer = redeem_all.Redeemer(chain.server.url, key=KEY, proxy_address=PROXY)
+    markets = [market(n) for n in range(8)]
+
+    ok, failed = redeemer.simulate(markets)
+
+    assert [m['condition_id'] for m in ok] == [cid(n) for n in (0, 1, 2, 4, 5, 7)]
+    assert [m['condition_id'] for m, _ in failed] == [cid(3), cid(6)]
+    assert all('condition not resolved' in reason for _, reason in failed)
+    assert chain.batches[0] == [cid(n) for n in range(8)]
+    # 8 -> 4+4 -> 2+2 per half -> singles only where a pair reverted
+    assert len(chain.batches) == 1 + 2 + 4 + 4
+
+
+def test_simulate_passes_a_clean_batch_in_one_call(redeem_all, fake_server):
+    chain = StubPolygon(fake_server)
+    redeemer = redeem_all.Redeemer(chain.server.url, key=KEY, proxy_address=PROXY)
+    ok, failed = redeemer.simulate([market(n) for n in range(5)])
+    assert len(ok) == 5 and failed == [] and len(chain.batches) == 1
+
+
+class FakeReader:
+    def __init__(self, balances=None, error=None):
+        self.balances = balances or {}
+        self.error = error
+        self.queries = []
+
+    def read_balances(self, queries, mode='auto'):
+        if self.error:
+            raise self.error
+        self.queries = list(queries)
+        return {q.key: self.balances.get(q.key, {'raw': 0, 'human': 0.0}) for q in queries}
+
+
+def test_held_keeps_markets_with_any_balance(redeem_all, fake_server):
+    redeemer = redeem_all.Redeemer(StubPolygon(fake_server).server.url, key=KEY, proxy_address=PROXY)
+    markets = [market(1, assets=['11', '12']), market(2, assets=['21']), market(3, assets=['31']),
+               market(4, assets=['41', '42'])]
+    redeemer.reader = FakeReader({
+        (cid(1), '12'): {'raw': 5, 'human': 0.000005},
+        (cid(3), '31'): None,                          # failed read counts as held
+        (cid(4), '41'): {'raw': 0, 'human': 0.0},
+    })
+
+    held = redeemer.held(markets)
+
+    assert [m['condition_id'] for m in held] == [cid(1), cid(3)]
+    assert len(redeemer.reader.queries) == 6  # one multicall over every asset
+
+
+def test_held_trusts_the_data_api_when_the_read_fails(redeem_all, fake_server):
+    redeemer = redeem_all.Redeemer(StubPolygon(fake_server).server.url, key=KEY, proxy_address=PROXY)
+    redeemer.reader = FakeReader(error=RuntimeError('rpc down'))
+    markets = [market(1), market(2)]
+    assert redeemer.held(markets) == markets
+    assert redeemer.held([]) == []
+
+
+# --- run_once ---
+class FakeRedeemer:
+    """Stands in for Redeemer: redeems everything but `skip` (NOTHING_HELD) and `fail`."""
+
+    instances = []
+
+    def __init__(self, rpc_url=None, batch_size=None, skip=(), fail=()):
+        self.skip, self.fail = set(skip), set(fail)
+        self.markets = None
+        FakeRedeemer.instances.append(self)
+
+    def redeem(self, markets, dry_run=False):
+        from redeem_all import NOTHING_HELD
+        self.markets = markets
+        ok = [m for m in markets if m['condition_id'] not in self.skip | self.fail]
+        return {'redeemed': ok, 'txs': [{'tx': '0xabc', 'markets': ok, 'status': 1}] if ok else [],
+                'skipped': [(m, NOTHING_HELD) for m in markets if m['condition_id'] in self.skip],
+                'failed': [(m, 'reverted') for m in markets if m['condition_id'] in self.fail]}
+
+
+@pytest.fixture
+def patched(redeem_all, monkeypatch, tmp_path):
+    """run_once with Data API positions and the Redeemer replaced; returns a setup function."""
+    FakeRedeemer.instances = []
+
+    def setup(redeemable, held_positions, skip=(), fail=()):
+        monkeypatch.setattr(redeem_all, 'fetch_redeemable_positions', lambda *a, **k: list(redeemable))
+        monkeypatch.setattr(redeem_all, 'fetch_positions', lambda *a, **k: list(held_positions))
+        monkeypatch.setattr(redeem_all, 'Redeemer', lambda *a, **k: FakeRedeemer(*a, skip=skip, fail=fail, **k))
+
+    return setup
+
+
+def write_cid_files(tmp_path, numbers):
+    paths = {}
+    for n in numbers:
+        path = tmp_path / f"m-{n}.txt"
+        path.write_text(json.dumps({'condition_id': cid(n).upper().replace('0X', '0x'), 'timestamp': 0}))
+        paths[n] = path
+    return paths
+
+
+def test_run_once_sorts_requested_markets(redeem_all, patched, tmp_path):
+    # 1 redeemable, 2 lost, 3 held but unresolved, 4 no position at all, 5 not held on-chain, 6 reverts
+    patched([market(1, 3.0), market(2, 0.0), market(5, 1.0), market(6, 2.0)],
+            [{'conditionId': cid(n)} for n in (1, 2, 3, 5, 6)], skip={cid(5)}, fail={cid(6)})
+    files = write_cid_files(tmp_path, [1, 2, 3, 4, 5, 6])
+
+    result = redeem_all.run_once(paths=[str(p) for p in files.values()], condition_ids=[cid(7)])
+
+    reasons = {m['condition_id'].lower(): reason for m, reason in result['skipped']}
+    assert result['pending'] == [cid(3)]
+    assert reasons == {cid(2): redeem_all.LOST, cid(4): redeem_all.NO_POSITION, cid(7): redeem_all.NO_POSITION,
+                       cid(5): redeem_all.NOTHING_HELD}
+    assert [m['condition_id'] for m in result['redeemed']] == [cid(1)]
+    assert [m['condition_id'] for m, _ in result['failed']] == [cid(6)]
+    # Only markets with value reach the Redeemer
+    assert [m['condition_id'] for m in FakeRedeemer.instances[0].markets] == [cid(1), cid(5), cid(6)]
+    # Files of finished markets are removed; pending and failed ones are kept for the next run
+    assert sorted(n for n, p in files.items() if p.exists()) == [3, 6]
+
+
+def test_run_once_dry_run_keeps_files(redeem_all, patched, tmp_path):
+    patched([market(1, 3.0)], [{'conditionId': cid(1)}])
+    files = write_cid_files(tmp_path, [1, 4])
+    result = redeem_all.run_once(paths=[str(p) for p in files.values()], dry_run=True)
+    assert [m['condition_id'] for m in result['redeemed']] == [cid(1)]
+    assert all(p.exists() for p in files.values())
+
+
+def test_run_once_without_anything_redeemable(redeem_all, patched):
+    patched([market(2, 0.0)], [])
+    result = redeem_all.run_once(condition_ids=[cid(2), cid(9)])
+    assert FakeRedeemer.instances == []
+    assert result['pending'] == [] and result['redeemed'] == []
+    assert sorted(reason for _, reason in result['skipped']) == [redeem_all.LOST, redeem_all.NO_POSITION]
@@ -0,0 +1,113 @@
+"""TelegramQueue against a fake Bot API server: coalescing, 429 pauses, 4xx drops, retries."""
+
+import time
+from urllib.parse import parse_qs
+
+import pytest
+
+from notification import telegram_queue
+from notification.telegram_queue import TelegramQueue
+
+
+class BotApi:
+    """Fake Bot API: answers sendMessage with the scripted (status, body) replies, then 200."""
+
+    def __init__(self, fake_server, replies=()):
+        self.replies = list(replies)
+        self.server = fake_server(self.handle)
+
+    def handle(self, path, body, headers):
+        if self.replies:
+            return self.replies.pop(0)
+        return 200, {'ok': True, 'result': {}}
+
+    @property
+    def messages(self):
+        out = []
+        for path, body, _ in self.server.requests:
+            fields = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+            out.append((path.rsplit('/', 1)[-1], fields))
+        return out
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(api, **kwargs):
+        queue = TelegramQueue(spool_path=str(tmp_path / 'spool.db'), token='TOKEN', chat_id='42',
+                              api_url=api.server.url, **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+def test_coalesced_messages_are_sent_as_one(fake_server, make_queue):
+    api = BotApi(fake_server)
+    queue = make_queue(api, coalesce_window=0.2)
+    ids = [queue.enqueue_message(f"alert {i}", coalesce_key='alerts') for i in range(3)]
+    ids.append(queue.enqueue_message('other chat', coalesce_key='alerts', chat_id='7'))
+
+    delivered, wait = queue.deliver_one()
+    assert delivered == [] and 0 < wait <= 0.2  # still inside the coalesce window
+
+    assert queue.flush(timeout=5)
+    assert all(queue.is_sent(i) for i in ids)
+    texts = sorted((m['chat_id'], m['text']) for _, m in api.messages)
+    assert texts == [('42', 'alert 0\n\nalert 1\n\nalert 2'), ('7', 'other chat')]
+
+
+def test_429_pauses_the_chat_without_counting_an_attempt(fake_server, make_queue):
+    api = BotApi(fake_server, [(429, {'ok': False, 'parameters': {'retry_after': 1}})])
+    queue = make_queue(api)
+    item = queue.enqueue_message('hello')
+
+    assert queue.deliver_one() == ([], 0.0)
+    delivered, wait = queue.deliver_one()
+    assert delivered == [] and 0.5 < wait <= 1.0
+    assert len(api.messages) == 1  # paused: nothing sent while waiting
+
+    started = time.time()
+    assert queue.flush(timeout=5)
+    assert time.time() - started >= 0.5
+    assert queue.is_sent(item) and len(api.messages) == 2
+    attempts = queue._conn.execute("SELECT attempts FROM outbox WHERE id = ?", (item,)).fetchone()[0]
+    assert attempts == 0
+
+
+def test_4xx_drops_the_message(fake_server, make_queue):
+    api = BotApi(fake_server, [(403, {'ok': False, 'description': 'bot was blocked by the user'})])
+    queue = make_queue(api)
+    item = queue.enqueue_message('hello')
+
+    assert queue.flush(timeout=5)
+    assert not queue.is_sent(item)
+    assert queue.status()['dropped'] == 1
+    assert len(api.messages) == 1
+
+
+def test_html_400_is_retried_as_plain_text(fake_server, make_queue):
+    api = BotApi(fake_server, [(400, {'ok': False, 'description': "can't parse entities"})])
+    queue = make_queue(api)
+    item = queue.enqueue_message('<b>PnL</b> 5 < 6', parse_mode='HTML', fallback_text='PnL 5 < 6')
+
+    assert queue.flush(timeout=5)
+    assert queue.is_sent(item)
+    (_, first), (_, second) = api.messages
+    assert first['parse_mode'] == 'HTML'
+    assert 'parse_mode' not in second and second['text'] == 'PnL 5 < 6'
+
+
+def test_5xx_retries_with_backoff(fake_server, make_queue, monkeypatch):
+    monkeypatch.setattr(telegram_queue, 'BACKOFF_BASE', 0.05)
+    api = BotApi(fake_server, [(502, b'bad gateway'), (500, b'oops')])
+    queue = make_queue(api)
+    item = queue.enqueue_message('hello')
+
+    assert queue.flush(timeout=5)
+    assert queue.is_sent(item) and len(api.messages) == 3
+    attempts = queue._conn.execute("SELECT attempts FROM outbox WHERE id = ?", (item,)).fetchone()[0]
+    assert attempts == 2
@@ -1,4 +1,7 @@
-from datetime import datetime, timezone
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
 
@@ -12,19 +15,74 @@ def r2(val, ndigits: int = 2):
         return val
 
 
+@contextmanager
+def file_lock(path: str):
+    """Hold an exclusive lock on `path` (created if missing) across processes; blocks until free."""
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after ~10s; keep waiting like flock does
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
 # --- DateTime Utility Functions ---
 
 # Timezone constants
 GMT7_TZ = 'Asia/Bangkok'
 ET_TZ = 'US/Eastern'
 
+ET_TIME_FORMAT = '%I:%M %p'
+
+
+@lru_cache(maxsize=None)
+def get_zone(tz_name: str) -> ZoneInfo:
+    """Return a cached ZoneInfo for tz_name."""
+    return ZoneInfo(tz_name)
+
+
+@lru_cache(maxsize=65536)
+def _format_ts(ts: int, target_tz: str, format_str: str) -> str:
+    return datetime.fromtimestamp(ts, tz=get_zone(target_tz)).strftime(format_str)
+
+
 def timestamp_to_timezone(ts: int, target_tz: str, format_str: str) -> str:
-    """Convert Unix timestamp to formatted string in target timezone."""
+    """Convert Unix timestamp to formatted string in target timezone (memoized per timestamp)."""
     if not ts:
         return ''
-    utc_dt = datetime.fromtimestamp(ts, tz=timezone.utc)
-    target_zone = ZoneInfo(target_tz)
-    return utc_dt.astimezone(target_zone).strftime(format_str)
+    return _format_ts(ts, target_tz, format_str)
+
+
+def format_timestamps(timestamps, target_tz: str, format_str: str) -> list[str]:
+    """Format many timestamps in one pass; each distinct timestamp is converted once."""
+    zone = get_zone(target_tz)
+    seen = {}
+    out = []
+    for ts in timestamps:
+        if not ts:
+            out.append('')
+            continue
+        text = seen.get(ts)
+        if text is None:
+            text = seen[ts] = datetime.fromtimestamp(ts, tz=zone).strftime(format_str)
+        out.append(text)
+    return out
 
 def to_et_time(ts: int) -> str:
     """Convert timestamp to Eastern Time format."""
@@ -40,8 +98,8 @@ def to_gmt7_datetime(ts: int) -> str:
 
 def extract_time_part(ts: int) -> str:
     """Extract time part (HH:MM AM/PM) from timestamp in ET."""
-    if not ts:
-        return ''
-    full_time = to_et_time(ts)
-    parts = full_time.split(' ')
-    return f"{parts[1]} {parts[2]}" if len(parts) >= 3 else ''
+    return timestamp_to_timezone(ts, ET_TZ, ET_TIME_FORMAT)
+
+def extract_time_parts(timestamps) -> list[str]:
+    """Batch version of extract_time_part for a whole column of timestamps."""
+    return format_timestamps(timestamps, ET_TZ, ET_TIME_FORMAT)